@@ -1,112 +1,133 @@
+import argparse
+
 import tkinter as tk
 from tkinter import messagebox
 
+from tictactoe_engine import Board, O, solver_for
+
+SYMBOLS = ("X", "O")
+COMPUTER_TIME = 1.0  # seconds the computer may think on boards too big to solve outright
+
+
 class TicTacToe:
-    def __init__(self, root):
+    def __init__(self, root, size=3, k=3):
         self.root = root
         self.root.title("Tic-Tac-Toe")
-        self.current_player = "X"
-        self.board = [["" for _ in range(3)] for _ in range(3)]
+        self.size = size
+        self.k = k
+        self.board = Board(size, k)
+        self.solver = solver_for(size, k)
         self.buttons = {}
         self.create_gui()
-        
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+
+    @property
+    def current_player(self):
+        return SYMBOLS[self.board.turn]
+
     def create_gui(self):
-        """Create the 3x3 grid and control buttons."""
-        self.root.geometry("300x350")
+        """Create the grid and control buttons."""
+        self.root.geometry("%dx%d" % (max(300, 100 * self.size), 100 * self.size + 80))
         self.grid_frame = tk.Frame(self.root)
         self.grid_frame.pack(pady=10)
-        
-        # Create 3x3 grid of buttons
-        for i in range(3):
-            for j in range(3):
+
+        # Create the grid of buttons
+        for i in range(self.size):
+            for j in range(self.size):
                 btn = tk.Button(
                     self.grid_frame, text="", font=("Arial", 24), width=5, height=2,
                     command=lambda r=i, c=j: self.make_move(r, c)
                 )
                 btn.grid(row=i, column=j, padx=2, pady=2)
                 self.buttons[(i, j)] = btn
-        
+
         # Status label
         self.status_var = tk.StringVar(value="X's turn")
         tk.Label(self.root, textvariable=self.status_var, font=("Arial", 14)).pack(pady=5)
-        
+
+        controls = tk.Frame(self.root)
+        controls.pack(pady=5)
         # New game button
-        tk.Button(self.root, text="New Game", font=("Arial", 12), command=self.reset_game).pack(pady=5)
-    
+        tk.Button(controls, text="New Game", font=("Arial", 12), command=self.reset_game).pack(side=tk.LEFT, padx=5)
+        self.computer_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(controls, text="Computer plays O", font=("Arial", 12), variable=self.computer_var,
+                       command=self.computer_turn).pack(side=tk.LEFT, padx=5)
+
     def make_move(self, row, col):
         """Handle a player's move."""
-        if self.board[row][col] == "" and not self.check_winner():
-            self.board[row][col] = self.current_player
-            self.buttons[(row, col)].config(text=self.current_player, bg="lightblue" if self.current_player == "X" else "lightgreen")
-            
-            if self.check_winner():
-                self.status_var.set(f"{self.current_player} wins!")
-                messagebox.showinfo("Tic-Tac-Toe", f"{self.current_player} wins!")
-                self.highlight_winner()
-            elif self.is_board_full():
-                self.status_var.set("Draw!")
-                messagebox.showinfo("Tic-Tac-Toe", "It's a draw!")
-            else:
-                self.current_player = "O" if self.current_player == "X" else "X"
-                self.status_var.set(f"{self.current_player}'s turn")
-    
+        if self.board.at(row, col) is not None or self.board.is_over():
+            return
+        if self.computer_var.get() and self.board.turn == O:
+            return
+        self.play(row, col)
+        self.computer_turn()
+
+    def play(self, row, col):
+        player = self.current_player
+        won = self.board.play(row * self.size + col)
+        self.buttons[(row, col)].config(text=player, bg="lightblue" if player == "X" else "lightgreen")
+
+        if won:
+            self.status_var.set(f"{player} wins!")
+            messagebox.showinfo("Tic-Tac-Toe", f"{player} wins!")
+            self.highlight_winner()
+        elif self.is_board_full():
+            self.status_var.set("Draw!")
+            messagebox.showinfo("Tic-Tac-Toe", "It's a draw!")
+        else:
+            self.status_var.set(f"{self.current_player}'s turn")
+
+    def computer_turn(self):
+        """Let the computer answer when it is O's turn."""
+        if self.computer_var.get() and self.board.turn == O and not self.board.is_over():
+            self.status_var.set("Computer is thinking...")
+            # let the last move show before searching
+            self.root.after(1, self.computer_move)
+
+    def computer_move(self):
+        if self.board.is_over() or self.board.turn != O:
+            return
+        move, _ = self.solver.best_move(self.board, time_limit=COMPUTER_TIME)
+        self.play(*divmod(move, self.size))
+
     def check_winner(self):
         """Check for a winner."""
-        # Check rows
-        for i in range(3):
-            if self.board[i][0] == self.board[i][1] == self.board[i][2] != "":
-                return True
-        # Check columns
-        for j in range(3):
-            if self.board[0][j] == self.board[1][j] == self.board[2][j] != "":
-                return True
-        # Check diagonals
-        if self.board[0][0] == self.board[1][1] == self.board[2][2] != "":
-            return True
-        if self.board[0][2] == self.board[1][1] == self.board[2][0] != "":
-            return True
-        return False
-    
+        return self.board.winner is not None
+
     def highlight_winner(self):
         """Highlight the winning line."""
-        # Highlight rows
-        for i in range(3):
-            if self.board[i][0] == self.board[i][1] == self.board[i][2] != "":
-                for j in range(3):
-                    self.buttons[(i, j)].config(bg="yellow")
-                return
-        # Highlight columns
-        for j in range(3):
-            if self.board[0][j] == self.board[1][j] == self.board[2][j] != "":
-                for i in range(3):
-                    self.buttons[(i, j)].config(bg="yellow")
-                return
-        # Highlight diagonals
-        if self.board[0][0] == self.board[1][1] == self.board[2][2] != "":
-            for i in range(3):
-                self.buttons[(i, i)].config(bg="yellow")
-            return
-        if self.board[0][2] == self.board[1][1] == self.board[2][0] != "":
-            for i in range(3):
-                self.buttons[(i, 2-i)].config(bg="yellow")
-    
+        for cell in self.board.cells_of(self.board.winning_line):
+            self.buttons[cell].config(bg="yellow")
+
     def is_board_full(self):
         """Check if the board is full."""
-        return all(self.board[i][j] != "" for i in range(3) for j in range(3))
-    
+        return self.board.is_full()
+
     def reset_game(self):
         """Start a new game."""
-        self.current_player = "X"
-        self.board = [["" for _ in range(3)] for _ in range(3)]
+        self.board = Board(self.size, self.k)
         self.status_var.set("X's turn")
-        for i in range(3):
-            for j in range(3):
+        for i in range(self.size):
+            for j in range(self.size):
                 self.buttons[(i, j)].config(text="", bg="SystemButtonFace")
 
+    def close(self):
+        """Keep what the computer learned for the next session, then quit."""
+        try:
+            self.solver.save()
+        except OSError as e:
+            print(f"Could not save the computer's table: {e}")
+        self.root.destroy()
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tic-Tac-Toe")
+    parser.add_argument('--size', type=int, default=3, help="rows and columns of the board")
+    parser.add_argument('--k', type=int, default=3, help="stones in a row needed to win")
+    args = parser.parse_args()
     try:
         root = tk.Tk()
-        game = TicTacToe(root)
+        game = TicTacToe(root, args.size, args.k)
         root.mainloop()
     except ImportError as e:
         print("Error: Tkinter is not installed or not working. Please ensure you have Tkinter available.")
@@ -0,0 +1,219 @@
+"""Run many headless arenas in parallel for bot tuning and balance testing.
+
+Every arena is a ``World`` with its own seed, map and wave settings, played
+by a simple bot until the player dies or ``--max-ticks`` runs out. Arenas are
+spread over a ``multiprocessing`` pool. Each map is compiled to the
+``.zsmap`` format once and copied into a shared memory block, and workers
+read it there through ``map_compiler.load_buffer()`` instead of receiving a
+pickled copy; only the grid cells an arena visits become dicts in that
+worker. Results stream back as arenas finish, go to an optional JSON-lines
+file and are summed up per setting::
+
+    python arena_runner.py --arenas 1000 --maps random custom-map.json --spawn-interval 1000 500
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool, shared_memory
+
+import map_compiler
+from zombie_survival import TICK_MS, World
+
+MAX_TICKS = 60 * 60 * 10  # ten minutes of game time
+KITE_DISTANCE = 250
+RANDOM_MAP = 'random'
+
+# compiled maps attached by each worker, keyed by map path
+_maps = {}
+_blocks = []
+
+
+def share_maps(paths):
+    """Copy each map's compiled form into shared memory; return {path: SharedMemory}."""
+    blocks = {}
+    for path in paths:
+        if path == RANDOM_MAP or path in blocks:
+            continue
+        compiled = path
+        if not path.endswith(map_compiler.EXTENSION):
+            compiled = map_compiler.compiled_path(path)
+            if not map_compiler.is_fresh(path, compiled):
+                map_compiler.compile_map(path, compiled)
+        with open(compiled, 'rb') as f:
+            data = f.read()
+        shm = shared_memory.SharedMemory(create=True, size=len(data))
+        shm.buf[:len(data)] = data
+        blocks[path] = shm
+    return blocks
+
+
+def _init_worker(names):
+    for path, name in names.items():
+        # pool workers share the parent's resource tracker, so attaching does not take ownership
+        shm = shared_memory.SharedMemory(name=name)
+        _blocks.append(shm)
+        _maps[path] = map_compiler.load_buffer(shm.buf, path)
+
+
+def bot_inputs(world, kite=KITE_DISTANCE):
+    """Aim at the nearest zombie, fire, and back away from it when it is within kite."""
+    player = world.player
+    px, py = player['x'], player['y']
+    nearest = None
+    best = math.inf
+    for e in world.enemies:
+        d = math.hypot(e['x'] - px, e['y'] - py)
+        if d < best:
+            nearest, best = e, d
+    if nearest is None:
+        return {'angle': player['angle']}
+    dx = nearest['x'] - px
+    dy = nearest['y'] - py
+    inputs = {'fire': True, 'angle': math.atan2(dy, dx)}
+    if best < kite:
+        inputs.update(left=dx > 0, right=dx < 0, up=dy > 0, down=dy < 0)
+    return inputs
+
+
+def run_arena(spec):
+    """Play one arena to game over or its tick limit; return the spec plus results."""
+    rng = random.Random(spec['seed'])
+    path = spec.get('map', RANDOM_MAP)
+    if path == RANDOM_MAP:
+        world = World.from_map(None, rng=rng)
+    else:
+        world = World(*_maps[path], rng=rng)
+    world.spawn_interval = spec.get('spawn_interval', world.spawn_interval)
+    for _ in range(spec.get('wave', 1) - 1):
+        world.advance_wave()
+    kite = spec.get('kite', KITE_DISTANCE)
+    max_ticks = spec.get('max_ticks', MAX_TICKS)
+
+    t0 = time.perf_counter()
+    ticks = 0
+    while ticks < max_ticks and not world.game_over:
+        world.step(TICK_MS, bot_inputs(world, kite))
+        ticks += 1
+    seconds = time.perf_counter() - t0
+    return dict(spec, ticks=ticks, survived=ticks * TICK_MS / 1000, died=world.game_over,
+                wave_reached=world.wave, score=world.score, ticks_per_sec=ticks / max(seconds, 1e-9),
+                worker=os.getpid())
+
+
+def _percentile(values, rank):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(rank / 100 * len(ordered)))]
+
+
+class Report:
+    """Aggregates arena results per (map, wave, spawn interval, kite) setting."""
+
+    def __init__(self):
+        self.groups = {}
+        self.count = 0
+        self.ticks = 0
+
+    def add(self, result):
+        key = (result.get('map', RANDOM_MAP), result.get('wave', 1),
+               result.get('spawn_interval'), result.get('kite', KITE_DISTANCE))
+        self.groups.setdefault(key, []).append(result)
+        self.count += 1
+        self.ticks += result['ticks']
+
+    def lines(self):
+        lines = [f"{'map':>16} {'wave':>4} {'spawn':>6} {'kite':>5} {'arenas':>6} {'died':>5} "
+                 f"{'survived p50/p90 s':>19} {'wave p50/max':>12} {'score mean':>10} {'ticks/s':>8}"]
+        for key in sorted(self.groups, key=repr):
+            results = self.groups[key]
+            survived = [r['survived'] for r in results]
+            waves = [r['wave_reached'] for r in results]
+            name, wave, spawn, kite = key
+            lines.append(
+                f"{os.path.basename(name)[-16:]:>16} {wave:>4} {spawn or '-':>6} {kite:>5} {len(results):>6} "
+                f"{sum(r['died'] for r in results):>5} "
+                f"{_percentile(survived, 50):>9.1f}/{_percentile(survived, 90):<9.1f} "
+                f"{_percentile(waves, 50):>5}/{max(waves):<6} "
+                f"{sum(r['score'] for r in results) / len(results):>10.1f} "
+                f"{sum(r['ticks_per_sec'] for r in results) / len(results):>8.0f}")
+        return lines
+
+
+def make_specs(arenas, maps, waves, spawn_intervals, kites, seed, max_ticks):
+    """Spread arenas seeds round-robin over every combination of the settings."""
+    settings = list(itertools.product(maps, waves, spawn_intervals, kites))
+    specs = []
+    for n in range(arenas):
+        path, wave, spawn, kite = settings[n % len(settings)]
+        specs.append({'id': n, 'seed': seed + n, 'map': path, 'wave': wave, 'spawn_interval': spawn,
+                      'kite': kite, 'max_ticks': max_ticks})
+    return specs
+
+
+def run_batch(specs, processes=None, on_result=None):
+    """Run specs on a process pool; return a Report, calling on_result(result) as each finishes."""
+    blocks = share_maps({spec.get('map', RANDOM_MAP) for spec in specs})
+    report = Report()
+    try:
+        names = {path: shm.name for path, shm in blocks.items()}
+        with Pool(processes, initializer=_init_worker, initargs=(names,)) as pool:
+            # one arena per task keeps the load even, since arenas end at very different times
+            for result in pool.imap_unordered(run_arena, specs, chunksize=1):
+                report.add(result)
+                if on_result:
+                    on_result(result)
+    finally:
+        for shm in blocks.values():
+            shm.close()
+            shm.unlink()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless arenas on every core")
+    parser.add_argument('--arenas', type=int, default=100)
+    parser.add_argument('--maps', nargs='+', default=[RANDOM_MAP],
+                        help="JSON or .zsmap maps; 'random' generates one per seed")
+    parser.add_argument('--wave', type=int, nargs='+', default=[1], help="starting waves")
+    parser.add_argument('--spawn-interval', type=int, nargs='+', default=[1000],
+                        help="milliseconds between zombie spawns in the first wave")
+    parser.add_argument('--kite', type=float, nargs='+', default=[KITE_DISTANCE],
+                        help="distance at which the bot backs away from a zombie")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--max-ticks', type=int, default=MAX_TICKS)
+    parser.add_argument('--processes', type=int, help="worker processes (default: one per core)")
+    parser.add_argument('--out', help="write one JSON line per arena here as they finish")
+    args = parser.parse_args()
+
+    specs = make_specs(args.arenas, args.maps, args.wave, args.spawn_interval, args.kite,
+                       args.seed, args.max_ticks)
+    out = open(args.out, 'w') if args.out else None
+    done = [0]
+
+    def on_result(result):
+        done[0] += 1
+        if out:
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+        if done[0] % max(1, len(specs) // 20) == 0:
+            print(f"{done[0]}/{len(specs)} arenas", file=sys.stderr)
+
+    t0 = time.perf_counter()
+    try:
+        report = run_batch(specs, args.processes, on_result)
+    finally:
+        if out:
+            out.close()
+    seconds = time.perf_counter() - t0
+    print("\n".join(report.lines()))
+    print(f"{report.count} arenas, {report.ticks} ticks in {seconds:.1f} s: "
+          f"{report.count / seconds:.1f} arenas/s, {report.ticks / seconds:.0f} ticks/s "
+          f"on {args.processes or os.cpu_count()} processes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Compare JSON and binary delta world snapshots.
+
+Steps a headless World with a fixed horde and encodes one server ``world``
+snapshot per tick, reporting bytes per tick and encode/decode time.
+
+    python benchmarks/codec_bench.py --ticks 200
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import state_codec  # noqa: E402
+from zombie_survival import World  # noqa: E402
+
+
+def make_world(zombies, seed):
+    world = World(rng=random.Random(seed))
+    rng = random.Random(seed)
+    px, py = world.player['x'], world.player['y']
+    for _ in range(zombies):
+        angle = rng.random() * 2 * math.pi
+        dist = 300 + rng.random() * 1500
+        world.add_enemy({'x': px + math.cos(angle) * dist, 'y': py + math.sin(angle) * dist,
+                         'radius': 25, 'speed': 1.0, 'hp': 50})
+    return world
+
+
+def run(zombies, ticks, seed):
+    world = make_world(zombies, seed)
+    server = state_codec.DeltaCodec()
+    client = state_codec.DeltaCodec()
+    json_bytes = binary_bytes = 0
+    json_encode = binary_encode = binary_decode = 0.0
+    for tick in range(ticks):
+        world.step(50, {'fire': True, 'angle': tick * 0.1})
+        snapshot = {'players': {'1': world.player}, 'zombies': world.enemies, 'bullets': world.bullets}
+
+        t0 = time.perf_counter()
+        text = json.dumps({'type': 'world', 'id': 1, 'world': snapshot}).encode()
+        t1 = time.perf_counter()
+        data = state_codec.encode_world(server, 1, snapshot)
+        t2 = time.perf_counter()
+        state_codec.decode_message(client, data)
+        t3 = time.perf_counter()
+        # the client acknowledges every snapshot it decodes
+        server.peer_ack = client.ack
+
+        json_bytes += len(text)
+        binary_bytes += len(data)
+        json_encode += t1 - t0
+        binary_encode += t2 - t1
+        binary_decode += t3 - t2
+    return {
+        'zombies': zombies,
+        'json_bytes': json_bytes / ticks,
+        'binary_bytes': binary_bytes / ticks,
+        'json_encode_us': json_encode / ticks * 1e6,
+        'binary_encode_us': binary_encode / ticks * 1e6,
+        'binary_decode_us': binary_decode / ticks * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ticks', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--zombies', type=int, nargs='+', default=[10, 100, 1000])
+    args = parser.parse_args()
+
+    print(f"{'zombies':>8} {'json B/tick':>12} {'binary B/tick':>14} {'json enc us':>12} "
+          f"{'bin enc us':>11} {'bin dec us':>11}")
+    for count in args.zombies:
+        r = run(count, args.ticks, args.seed)
+        print(f"{r['zombies']:>8} {r['json_bytes']:>12.0f} {r['binary_bytes']:>14.0f} "
+              f"{r['json_encode_us']:>12.1f} {r['binary_encode_us']:>11.1f} {r['binary_decode_us']:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
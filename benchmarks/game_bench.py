@@ -0,0 +1,256 @@
+"""Deterministic benchmarks of the game loop's update and render paths.
+
+Every scenario is built from a fixed seed and driven with the same inputs, so
+two runs simulate exactly the same game; a digest of the final state is
+printed to show it. For each scenario the suite reports simulation ticks per
+second, p50/p95/p99 frame times (update plus draw) and the memory allocated
+per tick. Rendering uses SDL's dummy video driver, so no window is needed.
+
+    python benchmarks/game_bench.py                      # run every scenario
+    python benchmarks/game_bench.py --save-baseline      # record this machine's numbers
+    python benchmarks/game_bench.py --check              # fail if slower than the baseline
+
+A calibration loop is timed alongside the scenarios and baselines are scaled
+by it, so a baseline taken on a faster or slower machine still compares
+fairly.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import zombie_survival  # noqa: E402
+from frame_profiler import RollingHistogram  # noqa: E402
+from zombie_survival import (TICK_MS, WORLD_HEIGHT, WORLD_WIDTH, World,  # noqa: E402
+                             spawn_world_objects)
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'game_baseline.json')
+TOLERANCE = 0.25  # fractional slowdown allowed before --check fails
+BURST = 8  # bullets fired per tick in the horde scenarios
+ALLOC_TICKS = 20
+SEED = 1
+
+# name: (ticks, zombies)
+SCENARIOS = {
+    'empty': (600, 0),
+    'default': (600, 0),
+    'dense': (600, 0),
+    'horde100': (300, 100),
+    'horde1k': (200, 1000),
+    'horde10k': (60, 10000),
+}
+
+
+def dense_map(rng, count=50000):
+    """Return rocks, walls and trees for a map packed with count obstacles."""
+    cx, cy = WORLD_WIDTH / 2, WORLD_HEIGHT / 2
+
+    def spot():
+        while True:
+            x, y = rng.random() * WORLD_WIDTH, rng.random() * WORLD_HEIGHT
+            # keep the player's start clear
+            if math.hypot(x - cx, y - cy) > 300:
+                return x, y
+    rocks = [dict(zip(('x', 'y'), spot()), hp=8) for _ in range(count * 6 // 10)]
+    walls = [dict(zip(('x', 'y'), spot()), width=40, height=rng.choice((40, 200))) for _ in range(count // 10)]
+    trees = [dict(zip(('x', 'y'), spot()), radius=120, hp=5)
+             for _ in range(count - len(rocks) - len(walls))]
+    return rocks, walls, trees
+
+
+def add_horde(world, rng, zombies):
+    px, py = world.player['x'], world.player['y']
+    for _ in range(zombies):
+        angle = rng.random() * 2 * math.pi
+        dist = 400 + rng.random() * 1600
+        world.add_enemy({'x': px + math.cos(angle) * dist, 'y': py + math.sin(angle) * dist,
+                         'radius': 25, 'speed': 1.0, 'hp': 20})
+
+
+def build(scenario, world_cls=World):
+    """Return (world, burst) for a scenario name."""
+    rng = random.Random(SEED)
+    if scenario == 'empty':
+        world = world_cls(rng=rng)
+    elif scenario == 'dense':
+        world = world_cls(*dense_map(rng), rng=rng)
+    else:
+        world = world_cls(*spawn_world_objects(rng), rng=rng)
+    burst = 0
+    if scenario.startswith('horde'):
+        add_horde(world, rng, SCENARIOS[scenario][1])
+        burst = BURST
+    # the benchmark measures the loop, not how long the player survives
+    world.player['hp'] = float('inf')
+    return world, burst
+
+
+def inputs_for(tick):
+    """The scripted input for a tick: walk a square while firing in a circle."""
+    side = tick // 120 % 4
+    return {'up': side == 0, 'right': side == 1, 'down': side == 2, 'left': side == 3,
+            'fire': True, 'angle': tick * 0.05}
+
+
+def spray(world, tick, burst):
+    player = world.player
+    for n in range(burst):
+        angle = tick * 0.05 + n * 2 * math.pi / burst
+        world.add_bullet({'x': player['x'] + math.cos(angle) * 35, 'y': player['y'] + math.sin(angle) * 35,
+                          'dx': math.cos(angle) * zombie_survival.BULLET_SPEED,
+                          'dy': math.sin(angle) * zombie_survival.BULLET_SPEED})
+
+
+def state_digest(world):
+    state = (world.score, world.wave, round(world.player['x'], 3), round(world.player['y'], 3),
+             len(world.bullets), len(world.obstacles.rocks), len(world.obstacles.trees),
+             sorted((round(e['x'], 3), round(e['y'], 3)) for e in world.enemies))
+    return hashlib.sha1(repr(state).encode()).hexdigest()[:12]
+
+
+def run_scenario(scenario, ticks=None, renderer_cls=None, world_cls=World):
+    """Run one scenario; return its measurements as a dict."""
+    world, burst = build(scenario, world_cls)
+    ticks = ticks or SCENARIOS[scenario][0]
+    renderer = renderer_cls(screen(), world) if renderer_cls else None
+    frames = RollingHistogram(ticks)
+    update = 0.0
+    for tick in range(ticks):
+        t0 = time.perf_counter()
+        spray(world, tick, burst)
+        world.step(TICK_MS, inputs_for(tick))
+        t1 = time.perf_counter()
+        if renderer:
+            renderer.draw()
+        frames.add((time.perf_counter() - t0) * 1000)
+        update += t1 - t0
+    digest = state_digest(world)
+
+    # allocations are traced on extra ticks so tracing does not skew the timings
+    tracemalloc.start()
+    allocated = 0
+    for tick in range(ticks, ticks + ALLOC_TICKS):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        spray(world, tick, burst)
+        world.step(TICK_MS, inputs_for(tick))
+        if renderer:
+            renderer.draw()
+        allocated += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+
+    p50, p95, p99 = frames.percentiles()
+    return {'scenario': scenario, 'ticks': ticks, 'ticks_per_sec': ticks / update,
+            'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99,
+            'alloc_kb_per_tick': allocated / ALLOC_TICKS / 1024,
+            'zombies': len(world.enemies), 'bullets': len(world.bullets), 'state': digest}
+
+
+_screen = None
+
+
+def screen():
+    global _screen
+    if _screen is None:
+        pygame = zombie_survival.pygame
+        pygame.init()
+        _screen = pygame.display.set_mode((zombie_survival.SCREEN_WIDTH, zombie_survival.SCREEN_HEIGHT))
+    return _screen
+
+
+def calibrate():
+    """Best-of-three seconds for a fixed pure-Python workload."""
+    best = float('inf')
+    for _ in range(3):
+        t0 = time.perf_counter()
+        total = 0.0
+        for i in range(300000):
+            total += math.hypot(i % 97, i % 89)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def compare(results, baseline, calibration, tolerance=TOLERANCE):
+    """Return messages for every scenario slower than its scaled baseline."""
+    # a machine that runs the calibration loop k times slower is expected k times slower
+    scale = baseline['calibration'] / calibration
+    failures = []
+    for r in results:
+        base = baseline['scenarios'].get(r['scenario'])
+        if base is None:
+            continue
+        expected = base['ticks_per_sec'] * scale
+        if r['ticks_per_sec'] < expected * (1 - tolerance):
+            failures.append("%s: %.0f ticks/s, baseline %.0f" % (r['scenario'], r['ticks_per_sec'], expected))
+        expected = base['p95_ms'] / scale
+        if r['p95_ms'] > expected * (1 + tolerance):
+            failures.append("%s: p95 %.2f ms, baseline %.2f ms" % (r['scenario'], r['p95_ms'], expected))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--ticks', type=int, help="override every scenario's tick count")
+    parser.add_argument('--no-render', action='store_true', help="time the simulation only")
+    parser.add_argument('--numpy', action='store_true', help="benchmark entity_store.ArrayWorld")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true', help="exit 1 on a regression against the baseline")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    world_cls = World
+    if args.numpy:
+        from entity_store import ArrayWorld
+        world_cls = ArrayWorld
+    renderer_cls = None
+    if not args.no_render:
+        if zombie_survival.pygame is None:
+            parser.error("rendering needs pygame; pass --no-render")
+        renderer_cls = zombie_survival.Renderer
+
+    calibration = calibrate()
+    print(f"{'scenario':>9} {'ticks/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'alloc KB':>9} {'zombies':>8} {'bullets':>8} {'state':>13}")
+    results = []
+    for scenario in args.scenario:
+        r = run_scenario(scenario, args.ticks, renderer_cls, world_cls)
+        results.append(r)
+        print(f"{scenario:>9} {r['ticks_per_sec']:>9.0f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+              f"{r['p99_ms']:>8.2f} {r['alloc_kb_per_tick']:>9.1f} {r['zombies']:>8} {r['bullets']:>8} "
+              f"{r['state']:>13}")
+
+    if args.save_baseline:
+        data = {'calibration': calibration, 'render': not args.no_render, 'world': world_cls.__name__,
+                'scenarios': {r['scenario']: r for r in results}}
+        with open(args.baseline, 'w') as f:
+            json.dump(data, f, indent=1, sort_keys=True)
+        print("baseline written to", args.baseline)
+    if args.check:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['render'] == args.no_render or baseline['world'] != world_cls.__name__:
+            parser.error("the baseline was recorded with different --no-render/--numpy settings")
+        for r in results:
+            base = baseline['scenarios'].get(r['scenario'])
+            if base and base['ticks'] == r['ticks'] and base['state'] != r['state']:
+                print("note: %s simulates a different game than the baseline" % r['scenario'])
+        failures = compare(results, baseline, calibration, args.tolerance)
+        for message in failures:
+            print("REGRESSION", message)
+        return 1 if failures else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
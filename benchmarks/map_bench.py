@@ -0,0 +1,95 @@
+"""Compare cold load time and memory of JSON and compiled maps.
+
+Writes a seeded JSON map with the given number of objects, compiles it with
+map_compiler.py, then loads each form in a fresh interpreter: ``load_map()``,
+building the ``World`` and one collision query around the player start.
+
+    python benchmarks/map_bench.py --objects 100000
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import map_compiler  # noqa: E402
+
+LOAD = """
+import json, os, random, resource, sys, time
+sys.path.insert(0, {root!r})
+
+def rss_kb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+import zombie_survival
+base = rss_kb()
+t0 = time.perf_counter()
+world = zombie_survival.World.from_map({path!r}, rng=random.Random(1))
+world.obstacles.blocks(world.player['x'], world.player['y'], world.player['radius'])
+t1 = time.perf_counter()
+print(json.dumps({{'seconds': t1 - t0, 'rss_kb': rss_kb() - base}}))
+"""
+
+
+def write_map(path, objects, seed):
+    rng = random.Random(seed)
+    size = 20000
+    rocks = objects * 6 // 10
+    walls = objects * 2 // 10
+    trees = objects - rocks - walls
+    data = {
+        'playerStart': {'x': size // 2, 'y': size // 2},
+        'rocks': [{'x': rng.uniform(0, size), 'y': rng.uniform(0, size), 'hp': 8} for _ in range(rocks)],
+        'walls': [{'x': rng.uniform(0, size), 'y': rng.uniform(0, size),
+                   'width': rng.choice((40, 200)), 'height': rng.choice((40, 200))} for _ in range(walls)],
+        'trees': [{'x': rng.uniform(0, size), 'y': rng.uniform(0, size), 'radius': 240, 'hp': 5}
+                  for _ in range(trees)],
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def measure(path, repeat):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', LOAD.format(root=ROOT, path=path)],
+                             check=True, capture_output=True, text=True).stdout
+        runs.append(json.loads(out.strip().splitlines()[-1]))
+    return min(r['seconds'] for r in runs), min(r['rss_kb'] for r in runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--objects', type=int, nargs='+', default=[100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'objects':>8} {'format':>8} {'file KB':>9} {'load ms':>9} {'RSS KB':>9} {'compile ms':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for objects in args.objects:
+            source = os.path.join(tmp, f'map{objects}.json')
+            write_map(source, objects, args.seed)
+            seconds, rss = measure(source, args.repeat)
+            print(f"{objects:>8} {'json':>8} {os.path.getsize(source) // 1024:>9} "
+                  f"{seconds * 1000:>9.1f} {rss:>9}")
+            t0 = time.perf_counter()
+            compiled = map_compiler.compile_map(source)
+            compile_ms = (time.perf_counter() - t0) * 1000
+            seconds, rss = measure(source, args.repeat)
+            print(f"{objects:>8} {'zsmap':>8} {os.path.getsize(compiled) // 1024:>9} "
+                  f"{seconds * 1000:>9.1f} {rss:>9} {compile_ms:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+"""Load-test server.js with a swarm of bot clients and plot its capacity.
+
+For each client count, starts a fresh ``node server.js`` on a free local
+port and connects that many bots. Each bot is a ``WebSocketClient``, driven
+from one asyncio loop, that sends a ``state`` message (a walking player plus
+a few zombies and bullets) at ``--send-rate``. Every broadcast frame that
+arrives is timestamped. After a warm-up, each step reports:
+
+- broadcast inter-arrival times and their jitter (the server ticks every 50 ms)
+- payload sizes
+- broadcasts that never arrived (gaps of two or more intervals)
+- frames left half-received
+- the server's CPU use, read from /proc
+- the swarm's own CPU use; near 100% means the generator, not the server, is the limit
+
+    python benchmarks/swarm_bench.py --clients 10 50 100 200 400 --seconds 5
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import state_codec  # noqa: E402
+from zombie_survival import OP_BINARY, WebSocketClient  # noqa: E402
+
+BROADCAST_INTERVAL = 50  # milliseconds, server.js's setInterval(broadcast, 50)
+SPREAD = 3000  # bots start within this many units of the world centre
+
+
+class Bot:
+    """One WebSocketClient sending synthetic player state and timing every broadcast."""
+
+    def __init__(self, n, rng, port, binary=False, zombies=5, bullets=3):
+        self.client = WebSocketClient("127.0.0.1", port, binary=binary)
+        self.rng = rng
+        self.fd = None
+        self.base_id = (n + 1) << 20
+        cx = cy = 10000
+        self.player = {'x': cx + rng.uniform(-SPREAD, SPREAD), 'y': cy + rng.uniform(-SPREAD, SPREAD),
+                       'radius': 20, 'hp': 100, 'angle': 0.0}
+        self.heading = rng.uniform(0, 2 * math.pi)
+        self.zombies = [{'id': self.base_id + k, 'x': 0.0, 'y': 0.0, 'radius': 25, 'speed': 1.0, 'hp': 1}
+                        for k in range(zombies)]
+        self.bullets = [{'id': self.base_id + zombies + k, 'x': 0.0, 'y': 0.0, 'dx': 0.0, 'dy': 0.0}
+                        for k in range(bullets)]
+        self.clock = 0.0
+        self.reset()
+
+    def reset(self):
+        self.arrivals = []
+        self.sizes = []
+
+    def attach(self, loop):
+        self.fd = self.client.sock.fileno()
+        loop.add_reader(self.fd, self.on_readable, loop)
+
+    def detach(self, loop):
+        if self.fd is not None:
+            loop.remove_reader(self.fd)
+            self.fd = None
+        self.client.close()
+
+    @property
+    def connected(self):
+        return self.client.sock is not None
+
+    def on_readable(self, loop):
+        client = self.client
+        messages = client.recv_messages()
+        now = time.perf_counter()
+        for opcode, payload in messages:
+            self.arrivals.append(now)
+            self.sizes.append(len(payload))
+            if opcode == OP_BINARY and client.codec:
+                # decoding keeps our acks current so the server can keep sending deltas
+                state_codec.decode_message(client.codec, payload)
+        if not self.connected:
+            loop.remove_reader(self.fd)
+            self.fd = None
+
+    def state(self, dt):
+        """Advance the synthetic player, zombies and bullets by dt seconds; return a state message."""
+        self.clock += dt
+        p = self.player
+        self.heading += self.rng.uniform(-0.3, 0.3)
+        p['x'] += math.cos(self.heading) * 120 * dt
+        p['y'] += math.sin(self.heading) * 120 * dt
+        p['angle'] = self.clock % (2 * math.pi)
+        for k, z in enumerate(self.zombies):
+            a = self.clock * 0.5 + k * 2 * math.pi / len(self.zombies)
+            z['x'] = p['x'] + math.cos(a) * 300
+            z['y'] = p['y'] + math.sin(a) * 300
+        for k, b in enumerate(self.bullets):
+            a = p['angle'] + k
+            reach = (self.clock * 300 + k * 100) % 600
+            b.update(x=p['x'] + math.cos(a) * reach, y=p['y'] + math.sin(a) * reach,
+                     dx=math.cos(a) * 5, dy=math.sin(a) * 5)
+        return {'type': 'state', 'player': p, 'zombies': self.zombies, 'bullets': self.bullets}
+
+    async def send_loop(self, rate):
+        interval = 1 / rate
+        # spread the bots' sends over the interval like independent players
+        await asyncio.sleep(self.rng.random() * interval)
+        next_send = time.perf_counter()
+        while self.connected:
+            self.client.send(self.state(interval))
+            next_send += interval
+            await asyncio.sleep(max(0.0, next_send - time.perf_counter()))
+
+    def partial_frames(self):
+        """1 if a frame was left half-received or a message half-reassembled."""
+        return int(bool(self.client.buffer) or self.client.fragments is not None)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, aoi=None):
+    env = dict(os.environ, PORT=str(port))
+    if aoi is not None:
+        env['AOI_RADIUS'] = str(aoi)
+    server = subprocess.Popen(['node', 'server.js'], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError("server.js did not start listening on port %d" % port)
+
+
+def cpu_seconds(pid):
+    """User plus system CPU seconds used by pid, or None where /proc is unavailable."""
+    try:
+        with open('/proc/%d/stat' % pid) as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def _percentile(values, rank):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(rank / 100 * len(ordered)))] if ordered else 0.0
+
+
+def summarize(bots, seconds):
+    """Merge the bots' arrivals into one capacity-curve point."""
+    gaps = []
+    dropped = 0
+    for bot in bots:
+        for a, b in zip(bot.arrivals, bot.arrivals[1:]):
+            gap = (b - a) * 1000
+            gaps.append(gap)
+            dropped += max(0, round(gap / BROADCAST_INTERVAL) - 1)
+    sizes = [s for bot in bots for s in bot.sizes]
+    return {
+        'received_per_sec': len(sizes) / seconds,
+        'payload_bytes': statistics.fmean(sizes) if sizes else 0.0,
+        'gap_p50_ms': _percentile(gaps, 50),
+        'gap_p95_ms': _percentile(gaps, 95),
+        'gap_p99_ms': _percentile(gaps, 99),
+        'jitter_ms': statistics.pstdev(gaps) if len(gaps) > 1 else 0.0,
+        'dropped': dropped,
+        'partial': sum(bot.partial_frames() for bot in bots),
+        'disconnected': sum(not bot.connected for bot in bots),
+    }
+
+
+async def run_step(clients, args):
+    """Run one client count against a fresh server; return its measurements."""
+    port = free_port()
+    server = start_server(port, args.aoi)
+    loop = asyncio.get_running_loop()
+    rng = random.Random(args.seed)
+    bots = []
+    tasks = []
+    try:
+        failed = 0
+        for n in range(clients):
+            bot = Bot(n, rng, port, args.binary, args.zombies, args.bullets)
+            try:
+                # the blocking handshake runs off the loop so connected bots keep being served
+                await loop.run_in_executor(None, bot.client.connect)
+            except OSError:
+                failed += 1
+                continue
+            bot.attach(loop)
+            bots.append(bot)
+            tasks.append(asyncio.create_task(bot.send_loop(args.send_rate)))
+        await asyncio.sleep(args.warmup)
+
+        for bot in bots:
+            bot.reset()
+        server_cpu = cpu_seconds(server.pid)
+        own_cpu = time.process_time()
+        t0 = time.perf_counter()
+        await asyncio.sleep(args.seconds)
+        elapsed = time.perf_counter() - t0
+        result = summarize(bots, elapsed)
+        if server_cpu is not None:
+            result['server_cpu'] = (cpu_seconds(server.pid) - server_cpu) / elapsed * 100
+        result['swarm_cpu'] = (time.process_time() - own_cpu) / elapsed * 100
+        result.update(clients=clients, connected=len(bots), failed=failed)
+        return result
+    finally:
+        for task in tasks:
+            task.cancel()
+        for bot in bots:
+            bot.detach(loop)
+        server.terminate()
+        server.wait()
+
+
+async def run(args):
+    results = []
+    print(f"{'clients':>7} {'recv/s':>8} {'bytes':>8} {'gap p50':>8} {'p95':>7} {'p99':>7} "
+          f"{'jitter':>7} {'dropped':>7} {'partial':>7} {'server%':>7} {'swarm%':>7}")
+    for clients in args.clients:
+        r = await run_step(clients, args)
+        results.append(r)
+        server_cpu = "%.0f" % r['server_cpu'] if 'server_cpu' in r else "n/a"
+        print(f"{r['connected']:>7} {r['received_per_sec']:>8.0f} {r['payload_bytes']:>8.0f} "
+              f"{r['gap_p50_ms']:>8.1f} {r['gap_p95_ms']:>7.1f} {r['gap_p99_ms']:>7.1f} "
+              f"{r['jitter_ms']:>7.1f} {r['dropped']:>7} {r['partial']:>7} {server_cpu:>7} "
+              f"{r['swarm_cpu']:>7.0f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 50, 100, 200])
+    parser.add_argument('--seconds', type=float, default=5.0, help="measured time per step")
+    parser.add_argument('--warmup', type=float, default=1.0)
+    parser.add_argument('--send-rate', type=float, default=20, help="state messages per bot per second")
+    parser.add_argument('--zombies', type=int, default=5, help="zombies each bot reports")
+    parser.add_argument('--bullets', type=int, default=3, help="bullets each bot reports")
+    parser.add_argument('--binary', action='store_true', help="offer the zs-binary-1 protocol")
+    parser.add_argument('--aoi', type=float, help="AOI_RADIUS for the server (0 sends everything)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help="write the capacity curve as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump({'args': vars(args), 'steps': results}, f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
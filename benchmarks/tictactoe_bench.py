@@ -0,0 +1,99 @@
+"""Headless self-play benchmark of the Tic-Tac-Toe solver.
+
+For each board the solver plays itself a number of games, with one
+transposition table shared by both sides and every game, and reports the
+positions searched per second, the time per move and how the games ended.
+The first game starts from an empty table; the rest show what the shared
+table saves. Boards too big to solve are searched for ``--move-time``
+seconds per move, with a few random opening moves so the games differ::
+
+    python benchmarks/tictactoe_bench.py
+    python benchmarks/tictactoe_bench.py --boards 3:3 4:4 6:4 --games 5 --move-time 0.2
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from tictactoe_engine import Board, Solver, WIN  # noqa: E402
+
+OPENING_MOVES = 2  # random moves before the solver takes over on unsolvable boards
+
+
+def play(solver, rng, move_time, random_moves=0):
+    """Play one self-play game; return (winner or None, moves, seconds spent searching)."""
+    board = Board(solver.size, solver.k)
+    searching = 0.0
+    while not board.is_over():
+        if len(board.history) < random_moves:
+            board.play(rng.choice(board.moves()))
+            continue
+        t0 = time.perf_counter()
+        move, _ = solver.best_move(board, time_limit=move_time)
+        searching += time.perf_counter() - t0
+        board.play(move)
+    return board.winner, len(board.history), searching
+
+
+def run_board(size, k, games, move_time, seed):
+    """Self-play games on one board; return its measurements."""
+    solver = Solver(size, k)
+    rng = random.Random(seed)
+    # a board is solvable if the empty position can be searched to the end in the time allowed
+    t0 = time.perf_counter()
+    _, value = solver.best_move(Board(size, k), time_limit=move_time * 10)
+    # no entry for the empty position means the first iteration did not finish
+    entry = solver.table.get((0, 0))
+    solved = (entry is not None and entry[0] == size * size) or abs(value) > WIN // 2
+    first_seconds = time.perf_counter() - t0
+    first_nodes = solver.nodes
+    solver.nodes = 0
+    random_moves = 0 if solved else OPENING_MOVES
+
+    results = {'X': 0, 'O': 0, 'draw': 0}
+    moves = 0
+    seconds = 0.0
+    for _ in range(games):
+        winner, length, spent = play(solver, rng, move_time, random_moves)
+        results['draw' if winner is None else 'XO'[winner]] += 1
+        moves += length - random_moves
+        seconds += spent
+    return {
+        'board': "%dx%d k=%d" % (size, size, k), 'solved': solved,
+        'first_ms': first_seconds * 1000, 'first_nodes': first_nodes,
+        'positions_per_sec': solver.nodes / max(seconds, 1e-9),
+        'ms_per_move': seconds / max(moves, 1) * 1000,
+        'table': len(solver.table), 'results': results,
+    }
+
+
+def parse_board(text):
+    size, _, k = text.partition(':')
+    return int(size), int(k or size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--boards', nargs='+', type=parse_board, default=[(3, 3), (4, 3), (4, 4), (5, 4)],
+                        help="boards as size:k")
+    parser.add_argument('--games', type=int, default=10)
+    parser.add_argument('--move-time', type=float, default=0.1, help="seconds per move on unsolvable boards")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'board':>10} {'solved':>6} {'empty board ms':>14} {'nodes':>8} "
+          f"{'positions/s':>11} {'ms/move':>8} {'table':>8}  results")
+    for size, k in args.boards:
+        r = run_board(size, k, args.games, args.move_time, args.seed)
+        results = " ".join("%s %d" % item for item in r['results'].items())
+        print(f"{r['board']:>10} {'yes' if r['solved'] else 'no':>6} {r['first_ms']:>14.1f} "
+              f"{r['first_nodes']:>8} {r['positions_per_sec']:>11.0f} {r['ms_per_move']:>8.2f} "
+              f"{r['table']:>8}  {results}")
+
+
+if __name__ == '__main__':
+    main()
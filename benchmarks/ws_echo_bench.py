@@ -0,0 +1,128 @@
+"""Measure WebSocketClient receive throughput and snapshot staleness.
+
+Starts a local WebSocket echo server, streams ``world`` snapshots through it
+at a fixed rate and drains them with ``WebSocketClient.recv_all()`` once per
+simulated 60 Hz frame.
+
+    python benchmarks/ws_echo_bench.py --rate 200 --zombies 100 --seconds 3
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from zombie_survival import WebSocketClient, encode_frame, parse_frame  # noqa: E402
+
+GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def serve_echo(listener):
+    conn, _ = listener.accept()
+    request = b""
+    while b"\r\n\r\n" not in request:
+        request += conn.recv(1024)
+    key = [line.split(b":", 1)[1].strip() for line in request.split(b"\r\n")
+           if line.lower().startswith(b"sec-websocket-key")][0]
+    accept = base64.b64encode(hashlib.sha1(key + GUID.encode()).digest())
+    conn.sendall(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                 b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+    buf = bytearray()
+    while True:
+        try:
+            data = conn.recv(65536)
+        except OSError:
+            break
+        if not data:
+            break
+        buf += data
+        pos = 0
+        out = []
+        while True:
+            frame = parse_frame(buf, pos)
+            if frame is None:
+                break
+            _, opcode, payload, pos = frame
+            out.append(encode_frame(payload, opcode))
+        del buf[:pos]
+        if out:
+            conn.sendall(b"".join(out))
+    conn.close()
+
+
+def snapshot(zombies, seq):
+    return {
+        "type": "world",
+        "seq": seq,
+        "sent": time.perf_counter(),
+        "world": {
+            "players": {"1": {"x": 0, "y": 0, "angle": 0, "hp": 100}},
+            "bullets": [],
+            "zombies": [{"x": i * 3.5, "y": i * 1.5, "radius": 25, "speed": 1.0, "hp": 1}
+                        for i in range(zombies)],
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rate", type=float, default=200, help="snapshots sent per second")
+    parser.add_argument("--zombies", type=int, default=100, help="zombies per snapshot")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    listener = socket.socket()
+    listener.bind(("localhost", 0))
+    listener.listen(1)
+    threading.Thread(target=serve_echo, args=(listener,), daemon=True).start()
+
+    client = WebSocketClient("localhost", listener.getsockname()[1])
+    client.connect()
+
+    interval = 1.0 / args.rate
+    frame_time = 1.0 / 60
+    start = time.perf_counter()
+    next_send = start
+    next_frame = start
+    seq = 0
+    staleness = []
+    drain_times = []
+    while time.perf_counter() - start < args.seconds:
+        now = time.perf_counter()
+        while next_send <= now:
+            client.send(snapshot(args.zombies, seq))
+            seq += 1
+            next_send += interval
+        if now >= next_frame:
+            t0 = time.perf_counter()
+            messages = client.recv_all()
+            drain_times.append(time.perf_counter() - t0)
+            for msg in messages:
+                staleness.append((time.perf_counter() - msg["sent"]) * 1000)
+            next_frame += frame_time
+        time.sleep(0.0005)
+    elapsed = time.perf_counter() - start
+    client.close()
+
+    stats = client.stats
+    print(f"sent {seq} snapshots of {args.zombies} zombies in {elapsed:.2f}s")
+    print(f"received {stats['messages']} messages, {stats['bytes'] / elapsed / 1e6:.2f} MB/s, "
+          f"{stats['messages'] / elapsed:.0f} msg/s")
+    print(f"stale snapshots skipped: {stats['stale_snapshots']}")
+    if staleness:
+        print(f"newest snapshot age ms: p50 {statistics.median(staleness):.2f} "
+              f"max {max(staleness):.2f}")
+    if drain_times:
+        print(f"recv_all ms: mean {statistics.mean(drain_times) * 1000:.3f} "
+              f"max {max(drain_times) * 1000:.3f}")
+
+
+if __name__ == "__main__":
+    main()
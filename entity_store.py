@@ -0,0 +1,461 @@
+"""NumPy structure-of-arrays backend for bullets and zombies.
+
+``ArrayWorld`` plays by the same rules as ``zombie_survival.World`` but keeps
+bullets and enemies in contiguous float arrays and updates them in batches,
+which lets the simulation keep up with thousands of zombies and bullets.
+"""
+from collections.abc import MutableMapping, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # the array backend is optional
+    np = None
+
+from zombie_survival import World, ROCK_RADIUS, SCREEN_WIDTH, SCREEN_HEIGHT
+
+BULLET_FIELDS = ('id', 'x', 'y', 'dx', 'dy')
+ENEMY_FIELDS = ('id', 'x', 'y', 'radius', 'speed', 'hp')
+
+_CELL_OFFSET = 1 << 20
+_CELL_SPAN = 1 << 21
+
+
+class EntityArrays:
+    """Contiguous float columns for one entity type, kept in insertion order."""
+
+    def __init__(self, fields, capacity=64):
+        if np is None:
+            raise ImportError("EntityArrays requires NumPy: pip install numpy")
+        self.fields = fields
+        self.count = 0
+        # ids are integers and may be missing from entities received over the network
+        self.columns = {f: np.zeros(capacity, dtype=np.int64 if f == 'id' else float) for f in fields}
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, field):
+        """Return a writable view of the live part of a column."""
+        return self.columns[field][:self.count]
+
+    def _reserve(self, count):
+        capacity = len(self.columns[self.fields[0]])
+        if count <= capacity:
+            return
+        while capacity < count:
+            capacity *= 2
+        for f, col in self.columns.items():
+            grown = np.zeros(capacity, dtype=col.dtype)
+            grown[:self.count] = col[:self.count]
+            self.columns[f] = grown
+
+    def append(self, item):
+        self._reserve(self.count + 1)
+        for f in self.fields:
+            self.columns[f][self.count] = item.get(f, 0) if f == 'id' else item[f]
+        self.count += 1
+
+    def load(self, items, new_id):
+        """Replace the contents with a list of entity dicts; ``new_id()`` numbers those without an id."""
+        # read everything first: items may be rows of this very store
+        values = {f: [item['id'] if 'id' in item else new_id() for item in items] if f == 'id'
+                  else [item[f] for item in items] for f in self.fields}
+        self.count = 0
+        self._reserve(len(items))
+        for f, column in values.items():
+            self.columns[f][:len(items)] = column
+        self.count = len(items)
+
+    def to_dicts(self):
+        cols = [self[f].tolist() for f in self.fields]
+        return [dict(zip(self.fields, row)) for row in zip(*cols)]
+
+    def remove_mask(self, mask):
+        """Drop the entities where mask is True, keeping the others in order.
+
+        World's rules depend on the order: each zombie takes the earliest
+        bullet touching it that no earlier zombie has used.
+        """
+        if not mask.any():
+            return
+        keep = np.flatnonzero(~mask)
+        for col in self.columns.values():
+            col[:len(keep)] = col[keep]
+        self.count = len(keep)
+
+
+class EntityRow(MutableMapping):
+    """A dict-like view of one entity in an EntityArrays; writes go to the columns.
+
+    The row is addressed by position, so it only stays valid until entities
+    are removed from the store.
+    """
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def __getitem__(self, field):
+        return self.store.columns[field][self.index].item()
+
+    def __setitem__(self, field, value):
+        self.store.columns[field][self.index] = value
+
+    def __delitem__(self, field):
+        raise TypeError("entity fields cannot be deleted")
+
+    def __iter__(self):
+        return iter(self.store.fields)
+
+    def __len__(self):
+        return len(self.store.fields)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class EntityList(Sequence):
+    """The list-like face of an EntityArrays: rows read and write the columns in place.
+
+    ``append()`` goes through ``add`` (ArrayWorld.add_bullet or add_enemy) so
+    new entities are numbered the way World numbers them.
+    """
+
+    def __init__(self, store, add):
+        self.store = store
+        self.add = add
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [EntityRow(self.store, i) for i in range(*index.indices(len(self.store)))]
+        if index < 0:
+            index += len(self.store)
+        if not 0 <= index < len(self.store):
+            raise IndexError("entity index out of range")
+        return EntityRow(self.store, index)
+
+    def __eq__(self, other):
+        if isinstance(other, (EntityList, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self.store.to_dicts())
+
+    def append(self, item):
+        self.add(item)
+
+    def extend(self, items):
+        for item in items:
+            self.add(item)
+
+    def remove(self, item):
+        """Remove the entity with the item's id."""
+        mask = self.store['id'] == item['id']
+        if not mask.any():
+            raise ValueError("entity not in list")
+        mask[np.flatnonzero(mask)[1:]] = False
+        self.store.remove_mask(mask)
+
+    def clear(self):
+        self.store.count = 0
+
+
+def cell_groups(x, y, size):
+    """Yield (cx, cy, indices) for every grid cell of the given size holding a point."""
+    cx = np.floor_divide(x, size).astype(np.int64)
+    cy = np.floor_divide(y, size).astype(np.int64)
+    keys = (cx + _CELL_OFFSET) * _CELL_SPAN + (cy + _CELL_OFFSET)
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    ends = np.r_[starts[1:], len(order)]
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        idx = order[s:e]
+        yield int(cx[idx[0]]), int(cy[idx[0]]), idx
+
+
+def candidate_pairs(ax, ay, bx, by, size):
+    """Return index arrays (a, b) of points in the same or adjacent cells.
+
+    Points from ``b`` are hashed into a uniform grid of ``size`` cells, so any
+    pair closer than ``size`` is guaranteed to appear in the result.
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    if not len(ax) or not len(bx):
+        return empty, empty
+    bkeys = ((np.floor_divide(bx, size).astype(np.int64) + _CELL_OFFSET) * _CELL_SPAN +
+             np.floor_divide(by, size).astype(np.int64) + _CELL_OFFSET)
+    order = np.argsort(bkeys, kind='stable')
+    sorted_keys = bkeys[order]
+    akeys = ((np.floor_divide(ax, size).astype(np.int64) + _CELL_OFFSET) * _CELL_SPAN +
+             np.floor_divide(ay, size).astype(np.int64) + _CELL_OFFSET)
+    # searching with sorted needles keeps searchsorted cache friendly
+    a_order = np.argsort(akeys)
+    akeys = akeys[a_order]
+    a_idx = []
+    lo_all = []
+    counts = []
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            keys = akeys + (ox * _CELL_SPAN + oy)
+            lo = np.searchsorted(sorted_keys, keys, 'left')
+            hi = np.searchsorted(sorted_keys, keys, 'right')
+            a_idx.append(a_order)
+            lo_all.append(lo)
+            counts.append(hi - lo)
+    a_idx = np.concatenate(a_idx)
+    lo_all = np.concatenate(lo_all)
+    counts = np.concatenate(counts)
+    total = int(counts.sum())
+    if not total:
+        return empty, empty
+    run_starts = np.cumsum(counts) - counts
+    within = np.arange(total) - np.repeat(run_starts, counts)
+    b_pos = np.repeat(lo_all, counts) + within
+    return np.repeat(a_idx, counts), order[b_pos]
+
+
+def flow_waypoints(field, x, y):
+    """Vectorized FlowField.waypoint(): (wx, wy, found) arrays for points x, y."""
+    size = field.cell_size
+    x0, y0 = field.origin
+    stride = field.stride
+    cx = np.floor_divide(x, size).astype(np.int64) - x0
+    cy = np.floor_divide(y, size).astype(np.int64) - y0
+    inside = (cx > 0) & (cx < stride - 1) & (cy > 0) & (cy < stride - 1)
+    cells, inverse = np.unique(np.where(inside, cy * stride + cx, -1), return_inverse=True)
+    # one lookup per occupied cell rather than per zombie
+    waypoints = [field._waypoint(k) if k >= 0 else None for k in cells.tolist()]
+    table = np.array([w or (np.nan, np.nan) for w in waypoints], dtype=float).reshape(-1, 2)
+    wx = table[inverse, 0]
+    wy = table[inverse, 1]
+    return wx, wy, ~np.isnan(wx)
+
+
+class ArrayWorld(World):
+    """World whose bullets and enemies live in EntityArrays.
+
+    ``bullets`` and ``enemies`` read as EntityLists over the stores
+    (``bullet_store`` and ``enemy_store``), so code written against World's
+    lists of dicts keeps working and its edits land in the arrays; assigning a
+    list of dicts replaces a store's contents.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.bullet_store = EntityArrays(BULLET_FIELDS)
+        self.enemy_store = EntityArrays(ENEMY_FIELDS)
+        super().__init__(*args, **kwargs)
+
+    @property
+    def bullets(self):
+        return EntityList(self.bullet_store, self.add_bullet)
+
+    @bullets.setter
+    def bullets(self, items):
+        self.bullet_store.load(items, self.new_id)
+
+    @property
+    def enemies(self):
+        return EntityList(self.enemy_store, self.add_enemy)
+
+    @enemies.setter
+    def enemies(self, items):
+        self.enemy_store.load(items, self.new_id)
+
+    def add_bullet(self, b):
+        if 'id' not in b:
+            b['id'] = self.new_id()
+        self.bullet_store.append(b)
+
+    def add_enemy(self, e):
+        if 'id' not in e:
+            e['id'] = self.new_id()
+        self.enemy_store.append(e)
+
+    def positions(self, kind):
+        store = self.bullet_store if kind == 'bullets' else self.enemy_store
+        return store['id'].copy(), store['x'].copy(), store['y'].copy()
+
+    def on_screen(self, kind, previous, alpha, camera_x, camera_y):
+        store = self.bullet_store if kind == 'bullets' else self.enemy_store
+        x, y = store['x'], store['y']
+        if previous is not None and len(previous[0]) and len(x):
+            before_id, before_x, before_y = previous
+            order = np.argsort(before_id, kind='stable')
+            slot = np.minimum(np.searchsorted(before_id, store['id'], sorter=order), len(order) - 1)
+            slot = order[slot]
+            known = before_id[slot] == store['id']
+            x = np.where(known, before_x[slot] + (x - before_x[slot]) * alpha, x)
+            y = np.where(known, before_y[slot] + (y - before_y[slot]) * alpha, y)
+        r = store['radius'] if kind == 'enemies' else 4
+        seen = ((x >= camera_x - r) & (x <= camera_x + SCREEN_WIDTH + r) &
+                (y >= camera_y - r) & (y <= camera_y + SCREEN_HEIGHT + r))
+        for i in np.flatnonzero(seen).tolist():
+            yield EntityRow(store, i), float(x[i]), float(y[i])
+
+    def update_bullets(self):
+        store = self.bullet_store
+        if not len(store):
+            return
+        x, y = store['x'], store['y']
+        x += store['dx'] * self.motion
+        y += store['dy'] * self.motion
+        x0, y0, x1, y1 = self.bullet_area()
+        dead = (x < x0) | (x > x1) | (y < y0) | (y > y1)
+        self._hit_obstacles(x, y, dead, self.obstacles.rocks, lambda r: ROCK_RADIUS + 4)
+        self._hit_obstacles(x, y, dead, self.obstacles.trees, lambda t: t['radius'] + 4)
+        store.remove_mask(dead)
+
+    def _hit_obstacles(self, x, y, dead, grid, reach):
+        """Damage the first obstacle each live bullet touches and mark the bullet dead."""
+        size = grid.cell_size
+        destroyed = set()
+        for cx, cy, idx in cell_groups(x, y, size):
+            candidates = grid.query((cx + 0.5) * size, (cy + 0.5) * size, size / 2 + 4)
+            if not candidates:
+                continue
+            idx = idx[~dead[idx]]
+            if not len(idx):
+                continue
+            ox = np.array([o['x'] for o in candidates])
+            oy = np.array([o['y'] for o in candidates])
+            oreach = np.array([reach(o) for o in candidates])
+            d = np.hypot(x[idx, None] - ox[None, :], y[idx, None] - oy[None, :])
+            touching = d < oreach[None, :]
+            rows = np.flatnonzero(touching.any(axis=1))
+            for row in rows.tolist():
+                for col in np.flatnonzero(touching[row]).tolist():
+                    o = candidates[col]
+                    if id(o) in destroyed:
+                        continue
+                    dead[idx[row]] = True
+                    if self.obstacles.damage(grid, o):
+                        destroyed.add(id(o))
+                    break
+
+    def _blocked(self, x, y, radius):
+        """Boolean mask of enemies overlapping a rock or wall."""
+        blocked = np.zeros(len(x), dtype=bool)
+        if not len(x):
+            return blocked
+        obstacles = self.obstacles
+        size = obstacles.rocks.cell_size
+        for cx, cy, idx in cell_groups(x, y, size):
+            reach = size / 2 + radius[idx].max()
+            center_x = (cx + 0.5) * size
+            center_y = (cy + 0.5) * size
+            ex, ey, er = x[idx, None], y[idx, None], radius[idx, None]
+            rocks = obstacles.rocks.query(center_x, center_y, reach)
+            if rocks:
+                rx = np.array([r['x'] for r in rocks])
+                ry = np.array([r['y'] for r in rocks])
+                hit = np.hypot(ex - rx[None, :], ey - ry[None, :]) < er + ROCK_RADIUS
+                blocked[idx] |= hit.any(axis=1)
+            walls = obstacles.walls.query(center_x, center_y, reach)
+            if walls:
+                wx = np.array([w['x'] for w in walls])[None, :]
+                wy = np.array([w['y'] for w in walls])[None, :]
+                ww = np.array([w['width'] for w in walls])[None, :]
+                wh = np.array([w['height'] for w in walls])[None, :]
+                hit = ((ex + er > wx) & (ex - er < wx + ww) &
+                       (ey + er > wy) & (ey - er < wy + wh))
+                blocked[idx] |= hit.any(axis=1)
+        return blocked
+
+    def _move_enemies(self, x, y, nx, ny, radius, moving):
+        """Vectorized World.move_enemy() for the zombies in the moving mask."""
+        free = moving & ~self._blocked(nx, ny, radius)
+        rest = np.flatnonzero(moving & ~free)
+        slide_x = slide_y = rest[:0]
+        if len(rest):
+            stuck = self._blocked(x[rest], y[rest], radius[rest])
+            free[rest[stuck]] = True
+            rest = rest[~stuck]
+            can_x = ~self._blocked(nx[rest], y[rest], radius[rest])
+            slide_x = rest[can_x]
+            rest = rest[~can_x]
+            slide_y = rest[~self._blocked(x[rest], ny[rest], radius[rest])]
+        x[free] = nx[free]
+        y[free] = ny[free]
+        x[slide_x] = nx[slide_x]
+        y[slide_y] = ny[slide_y]
+
+    def _targets(self):
+        """Return (players, index into players of the one each zombie chases) from target_for()."""
+        count = len(self.enemy_store)
+        if type(self).target_for is World.target_for:
+            # everyone chases the one player; no need to ask per zombie
+            return [self.player], np.zeros(count, dtype=np.int64)
+        players = []
+        index = {}
+        chasing = np.empty(count, dtype=np.int64)
+        for i, e in enumerate(self.enemies):
+            player = self.target_for(e)
+            n = index.get(id(player))
+            if n is None:
+                n = index[id(player)] = len(players)
+                players.append(player)
+            chasing[i] = n
+        return players, chasing
+
+    def update_enemies(self):
+        store = self.enemy_store
+        if not len(store):
+            return
+        x, y = store['x'], store['y']
+        radius, speed, hp = store['radius'], store['speed'], store['hp']
+        players, chasing = self._targets()
+        px = np.array([p['x'] for p in players])[chasing]
+        py = np.array([p['y'] for p in players])[chasing]
+
+        dx = px - x
+        dy = py - y
+        dist = np.hypot(dx, dy)
+        moving = dist > 0
+        wx = np.empty_like(x)
+        wy = np.empty_like(y)
+        found = np.zeros(len(x), dtype=bool)
+        for n, player in enumerate(players):
+            group = np.flatnonzero(chasing == n)
+            wx[group], wy[group], found[group] = flow_waypoints(self.flow_field(player), x[group], y[group])
+        # without a waypoint, or standing right on it, head straight for the player
+        found &= (wx != x) | (wy != y)
+        sx = np.where(found, wx - x, dx)
+        sy = np.where(found, wy - y, dy)
+        reach = np.where(found, np.hypot(sx, sy), dist)
+        step = np.divide(speed * self.motion, reach, out=np.zeros_like(reach), where=moving)
+        self._move_enemies(x, y, x + sx * step, y + sy * step, radius, moving)
+
+        dead = dist < radius + np.array([p['radius'] for p in players])[chasing]
+        for i in np.flatnonzero(dead).tolist():
+            self.hurt_player(players[chasing[i]])
+
+        bullets = self.bullet_store
+        if len(bullets):
+            bx, by = bullets['x'], bullets['y']
+            live = np.flatnonzero(~dead)
+            a, b = candidate_pairs(x[live], y[live], bx, by, float(radius[live].max(initial=0)) + 4)
+            a = live[a]
+            touching = np.hypot(x[a] - bx[b], y[a] - by[b]) < radius[a] + 4
+            a, b = a[touching], b[touching]
+            if len(a):
+                order = np.lexsort((b, a))
+                spent = np.zeros(len(bullets), dtype=bool)
+                shot = []
+                for ai, bi in zip(a[order].tolist(), b[order].tolist()):
+                    if spent[bi] or (shot and shot[-1] == ai):
+                        continue
+                    spent[bi] = True
+                    shot.append(ai)
+                shot = np.array(shot, dtype=np.int64)
+                hp[shot] -= 1
+                for ai in shot[hp[shot] <= 0].tolist():
+                    dead[ai] = True
+                    self.kill_enemy()
+                bullets.remove_mask(spent)
+        store.remove_mask(dead)
@@ -0,0 +1,205 @@
+"""Per-phase frame timing for the game loop.
+
+``main()`` calls ``FrameProfiler.start_frame()`` at the top of every frame and
+``lap(phase)`` after each phase, so every millisecond of a frame is charged
+to exactly one phase. Methods registered with ``watch()`` are timed as
+nested phases while profiling is on (bullet and zombie updates inside the
+simulation step). Frame totals, phase times and entity counts feed rolling
+windows that report p50/p95/p99. Records can be written out for later
+inspection::
+
+    python zombie_survival.py --profile frames.json
+    python zombie_survival.py --profile frames.trace.json --profile-format chrome
+
+The Chrome format loads in chrome://tracing or https://ui.perfetto.dev. While
+the profiler is disabled, ``lap()`` and ``count()`` return straight away and
+no methods are wrapped.
+"""
+import json
+import time
+from collections import deque
+
+FRAME_WINDOW = 300  # frames kept for the rolling percentiles
+PERCENTILES = (50, 95, 99)
+FORMATS = ('json', 'chrome')
+
+
+class RollingHistogram:
+    """The last ``size`` samples of one measurement."""
+
+    def __init__(self, size=FRAME_WINDOW):
+        self.samples = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add(self, value):
+        self.samples.append(value)
+
+    def percentiles(self, ranks=PERCENTILES):
+        """Return the nearest-rank percentiles of the window, or zeros if it is empty."""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return tuple(0 for _ in ranks)
+        last = len(ordered) - 1
+        return tuple(ordered[min(last, int(rank / 100 * len(ordered)))] for rank in ranks)
+
+
+class FrameProfiler:
+    """Splits each frame into timed phases and keeps rolling statistics.
+
+    With ``record`` set every finished frame is also kept for ``dump()``.
+    """
+
+    def __init__(self, window=FRAME_WINDOW, record=False, clock=time.perf_counter):
+        self.window = window
+        self.clock = clock
+        self.enabled = False
+        self.frames = [] if record else None
+        self.histograms = {}
+        self.watched = []
+        self.epoch = clock()
+        self.frame_index = 0
+        self.frame_start = None
+        self.last = 0.0
+        self.spans = []
+        self.phases = {}
+        self.counts = {}
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.frame_start = None
+        for obj, name, phase in self.watched:
+            setattr(obj, name, self._timed(phase, getattr(obj, name)))
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for obj, name, _ in self.watched:
+            # drop the instance wrapper so the class method shows through again
+            vars(obj).pop(name, None)
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def watch(self, obj, name, phase):
+        """Time obj.name() as a nested phase whenever profiling is on."""
+        self.watched.append((obj, name, phase))
+        if self.enabled:
+            setattr(obj, name, self._timed(phase, getattr(obj, name)))
+
+    def _timed(self, phase, fn):
+        clock = self.clock
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._add(phase, start, clock())
+        return timed
+
+    def _add(self, phase, start, end):
+        self.spans.append((phase, start, end))
+        self.phases[phase] = self.phases.get(phase, 0.0) + (end - start) * 1000
+
+    def start_frame(self):
+        """Finish the previous frame's record and start timing a new one."""
+        if not self.enabled:
+            return
+        now = self.clock()
+        if self.frame_start is not None:
+            self._finish(now)
+        self.frame_start = self.last = now
+        self.spans = []
+        self.phases = {}
+        self.counts = {}
+
+    def lap(self, phase):
+        """Charge the time since the previous lap to phase."""
+        if not self.enabled:
+            return
+        now = self.clock()
+        self._add(phase, self.last, now)
+        self.last = now
+
+    def count(self, name, value):
+        """Record an entity count for the current frame."""
+        if not self.enabled:
+            return
+        self.counts[name] = value
+
+    def _histogram(self, name):
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = RollingHistogram(self.window)
+        return hist
+
+    def _finish(self, now):
+        total = (now - self.frame_start) * 1000
+        self._histogram('frame').add(total)
+        for phase, ms in self.phases.items():
+            self._histogram(phase).add(ms)
+        for name, value in self.counts.items():
+            self._histogram('count.' + name).add(value)
+        if self.frames is not None:
+            self.frames.append({
+                'frame': self.frame_index,
+                'start': (self.frame_start - self.epoch) * 1000,
+                'total': total,
+                'phases': self.phases,
+                'counts': self.counts,
+                'spans': [(phase, (start - self.epoch) * 1000, (end - start) * 1000)
+                          for phase, start, end in self.spans],
+            })
+        self.frame_index += 1
+
+    def summary(self):
+        """Return {name: (p50, p95, p99)} for frame, phase times and counts."""
+        return {name: hist.percentiles() for name, hist in self.histograms.items()}
+
+    def report_lines(self):
+        """Return the overlay text: one line per frame/phase time, then counts."""
+        stats = self.summary()
+        lines = ["%-18s %6s %6s %6s" % ("ms", "p50", "p95", "p99")]
+        counts = []
+        for name in sorted(stats, key=lambda n: (n != 'frame', n)):
+            p50, p95, p99 = stats[name]
+            if name.startswith('count.'):
+                counts.append("%s %d/%d/%d" % (name[6:], p50, p95, p99))
+            else:
+                lines.append("%-18s %6.2f %6.2f %6.2f" % (name, p50, p95, p99))
+        if counts:
+            lines.append("  ".join(counts))
+        return lines
+
+    def dump(self, path, fmt='json'):
+        """Write the recorded frames as plain JSON or as a Chrome trace."""
+        frames = self.frames or []
+        if fmt == 'chrome':
+            events = []
+            for f in frames:
+                events.append({'name': 'frame', 'ph': 'X', 'pid': 1, 'tid': 1,
+                               'ts': f['start'] * 1000, 'dur': f['total'] * 1000,
+                               'args': {'frame': f['frame']}})
+                for phase, start, dur in f['spans']:
+                    events.append({'name': phase, 'ph': 'X', 'pid': 1, 'tid': 1,
+                                   'ts': start * 1000, 'dur': dur * 1000})
+                if f['counts']:
+                    events.append({'name': 'entities', 'ph': 'C', 'pid': 1,
+                                   'ts': f['start'] * 1000, 'args': f['counts']})
+            data = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+        elif fmt == 'json':
+            data = {'frames': [{k: v for k, v in f.items() if k != 'spans'} for f in frames],
+                    'summary': {name: dict(zip(('p50', 'p95', 'p99'), values))
+                                for name, values in self.summary().items()}}
+        else:
+            raise ValueError("unknown profile format %r" % fmt)
+        with open(path, 'w') as f:
+            json.dump(data, f)
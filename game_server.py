@@ -0,0 +1,443 @@
+"""Authoritative asyncio game server.
+
+Every room runs one shared ``zombie_survival.World`` simulation at a fixed
+tick rate. Clients only send their inputs; the server moves the players,
+bullets and zombies and broadcasts snapshots at a fixed rate. It speaks the
+same WebSocket handshake, framing and ``zs-binary-1`` codec as
+``WebSocketClient``, and the URL path picks the room, so one process hosts
+many independent rooms::
+
+    python game_server.py --port 8765
+    python zombie_survival.py --authoritative --room arena1
+
+Clients send ``{"type": "input", "seq": n, "up": ..., "down": ..., "left": ...,
+"right": ..., "fire": ..., "angle": ...}`` whenever their input changes or at
+their send rate; the latest input is held until the next one arrives.
+Predicting clients instead send ``"commands": [[seq, buttons, angle], ...]``,
+one per client tick, which are queued and applied one per server tick. Each
+snapshot carries the ``seq`` of the client's last input applied, so the
+client can replay the ones after it on top of the server's position.
+
+A client's first message is ``{"type": "room", "id": ..., "map": ...,
+"seed": ..., "endless": ..., "obstacles": [[x, y, hp], ...]}``: the map path
+or terrain seed to build the same world from, and the rocks and trees
+damaged so far. Later damage follows as ``{"type": "obstacles", "changes":
+[[x, y, hp], ...]}`` with the snapshot after it, in a message of its own so
+that clients skipping stale snapshots do not lose it.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import struct
+import time
+from collections import deque
+
+import state_codec
+from zombie_survival import (World, TICK_MS, OP_BINARY, OP_CLOSE, OP_TEXT, encode_frame, parse_frame,
+                             unpack_inputs)
+
+GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+PORT = 8765
+TICK_RATE = 60
+SNAPSHOT_RATE = 20
+RESTART_DELAY = 3000  # milliseconds between a room's game over and its restart
+MAX_WRITE_BUFFER = 256 * 1024  # skip snapshots for clients that stop reading
+MAX_FRAME_SIZE = 64 * 1024  # clients only send inputs; anything bigger is refused
+CLOSE_TOO_BIG = 1009
+INPUT_KEYS = ('up', 'down', 'left', 'right', 'fire', 'angle')
+MAX_QUEUED_COMMANDS = 30  # a client whose clock runs fast would otherwise fall further behind
+SEAT_FIELDS = ('player', 'last_shot', 'bullets_fired', 'is_reloading', 'reload_timer')
+
+
+class Seat:
+    """One player's avatar, gun state and held input inside a RoomWorld."""
+
+    def __init__(self, start):
+        self.player = {'x': start['x'], 'y': start['y'], 'radius': 20, 'hp': 100, 'angle': 0}
+        self.last_shot = 0
+        self.bullets_fired = 0
+        self.is_reloading = False
+        self.reload_timer = 0
+        self.inputs = {}
+        self.input_seq = 0
+        self.commands = deque()
+        self.queued_seq = 0
+
+    def queue(self, commands):
+        """Queue [seq, buttons, angle] commands not seen before, to be applied one per tick."""
+        for seq, bits, angle in commands:
+            if seq > self.queued_seq:
+                self.commands.append((seq, unpack_inputs(bits, angle)))
+                self.queued_seq = seq
+        while len(self.commands) > MAX_QUEUED_COMMANDS:
+            self.commands.popleft()
+
+    def next_input(self):
+        """The input for this tick: the next queued command, or the latest input held."""
+        if self.commands:
+            self.input_seq, self.inputs = self.commands.popleft()
+        elif self.queued_seq:
+            # each command is applied exactly once, so replays on the client land where we do
+            return {'angle': self.inputs.get('angle', self.player['angle'])}
+        return self.inputs
+
+
+class RoomWorld(World):
+    """World shared by every player in a room.
+
+    Each seat's gun state is swapped into the World attributes while its
+    input is applied, so the single-player rules run unchanged. Zombies
+    chase the nearest living player and the game is over once all are down.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.start = {'x': self.player['x'], 'y': self.player['y']}
+        self.seats = {}
+
+    def join(self, pid):
+        self.leave(pid)
+        seat = self.seats[pid] = Seat(self.start)
+        return seat
+
+    def leave(self, pid):
+        seat = self.seats.pop(pid, None)
+        field = seat and self.flow_fields.pop(id(seat.player), None)
+        if field:
+            field.close()
+
+    def living(self):
+        return [seat.player for seat in self.seats.values() if seat.player['hp'] > 0]
+
+    def _sit(self, seat):
+        for field in SEAT_FIELDS:
+            setattr(self, field, getattr(seat, field))
+
+    def _stand(self, seat):
+        for field in SEAT_FIELDS:
+            setattr(seat, field, getattr(self, field))
+
+    def step(self, dt, inputs=None):
+        self.time += dt
+        self.motion = dt / TICK_MS
+        if self.game_over:
+            return
+        for seat in self.seats.values():
+            if seat.player['hp'] <= 0:
+                continue
+            inputs = seat.next_input()
+            self._sit(seat)
+            self.player['angle'] = inputs.get('angle', self.player['angle'])
+            self.update_player(dt, inputs)
+            self._stand(seat)
+        if self.living():
+            self.update_world(dt)
+
+    def target_for(self, e):
+        living = self.living()
+        if not living:
+            return self.player
+        return min(living, key=lambda p: (p['x'] - e['x']) ** 2 + (p['y'] - e['y']) ** 2)
+
+    def hurt_player(self, player):
+        player['hp'] -= 10
+        if not self.living():
+            self.game_over = True
+
+    def spawn_enemy(self):
+        living = self.living()
+        if living:
+            self.player = self.rng.choice(living)
+        return super().spawn_enemy()
+
+    def restart(self):
+        super().restart()
+        for pid in list(self.seats):
+            self.join(pid)
+
+
+class Connection:
+    """A client socket and its place in a room."""
+
+    def __init__(self, pid, writer, codec):
+        self.id = pid
+        self.writer = writer
+        self.codec = codec
+        self.seat = None
+
+    def send(self, payload, opcode, reliable=False):
+        """Queue a frame; snapshots are dropped while the client is not reading, reliable ones never."""
+        if not reliable and self.writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            return False
+        self.writer.write(encode_frame(payload, opcode))
+        return True
+
+
+class Room:
+    """A named RoomWorld ticking at a fixed rate with its connected clients."""
+
+    def __init__(self, name, world, tick_rate=TICK_RATE, snapshot_rate=SNAPSHOT_RATE):
+        self.name = name
+        self.world = world
+        self.tick_rate = tick_rate
+        self.ticks_per_snapshot = max(1, round(tick_rate / snapshot_rate))
+        self.clients = {}
+        self.tick = 0
+        self.over_since = None
+        self.tick_times = deque(maxlen=tick_rate * 5)
+        self.bytes_sent = 0
+        self.task = None
+        # (x, y) -> hp of every rock and tree damaged so far, and those changed since the last broadcast
+        self.damaged = {}
+        self.changed = set()
+        world.obstacles.listeners.append(self.obstacle_changed)
+
+    def obstacle_changed(self, obj):
+        key = (obj['x'], obj['y'])
+        self.damaged[key] = obj['hp']
+        self.changed.add(key)
+
+    def join(self, conn):
+        conn.seat = self.world.join(conn.id)
+        self.clients[conn.id] = conn
+        world = self.world
+        welcome = {'type': 'room', 'id': conn.id, 'room': self.name, 'map': world.map_path,
+                   'seed': world.seed, 'endless': world.bounds is None,
+                   'obstacles': [[x, y, hp] for (x, y), hp in self.damaged.items()]}
+        conn.send(json.dumps(welcome).encode(), OP_TEXT, reliable=True)
+
+    def leave(self, conn):
+        self.clients.pop(conn.id, None)
+        self.world.leave(conn.id)
+
+    def handle(self, conn, msg):
+        if msg.get('type') != 'input':
+            return
+        seat = conn.seat
+        if conn.codec and msg.get('ack', 0) > conn.codec.peer_ack:
+            conn.codec.peer_ack = msg['ack']
+        if 'commands' in msg:
+            seat.queue(msg['commands'])
+            return
+        seq = msg.get('seq', 0)
+        if seq < seat.input_seq:
+            return
+        seat.input_seq = seq
+        seat.inputs = {k: msg[k] for k in INPUT_KEYS if k in msg}
+
+    def update(self, dt):
+        world = self.world
+        start = time.perf_counter()
+        world.step(dt)
+        if world.game_over:
+            if self.over_since is None:
+                self.over_since = world.time
+            elif world.time - self.over_since >= RESTART_DELAY:
+                world.restart()
+                self.over_since = None
+        self.tick_times.append(time.perf_counter() - start)
+        self.tick += 1
+        if self.tick % self.ticks_per_snapshot == 0:
+            self.broadcast()
+
+    def broadcast(self):
+        world = self.world
+        snapshot = {
+            'players': {str(pid): seat.player for pid, seat in world.seats.items()},
+            'zombies': world.enemies,
+            'bullets': world.bullets,
+        }
+        meta = {'wave': world.wave, 'score': world.score, 'game_over': world.game_over}
+        json_world = None
+        changes = None
+        if self.changed:
+            changes = json.dumps({'type': 'obstacles',
+                                  'changes': [[x, y, self.damaged[x, y]] for x, y in self.changed]}).encode()
+            self.changed = set()
+        for conn in list(self.clients.values()):
+            if changes:
+                conn.send(changes, OP_TEXT, reliable=True)
+            if conn.codec:
+                payload = state_codec.encode_world(conn.codec, conn.id, snapshot,
+                                                   dict(meta, seq=conn.seat.input_seq))
+                opcode = OP_BINARY
+            else:
+                if json_world is None:
+                    json_world = json.dumps(snapshot)
+                # only the id and input sequence differ between JSON clients
+                payload = (f'{{"type": "world", "id": {conn.id}, "seq": {conn.seat.input_seq}, '
+                           f'"wave": {meta["wave"]}, "score": {meta["score"]}, '
+                           f'"game_over": {json.dumps(meta["game_over"])}, "world": {json_world}}}').encode()
+                opcode = OP_TEXT
+            if conn.send(payload, opcode):
+                self.bytes_sent += len(payload)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / self.tick_rate
+        dt = 1000.0 / self.tick_rate
+        next_tick = loop.time()
+        while self.clients:
+            self.update(dt)
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < -0.25:
+                # too far behind to catch up; drop the backlog
+                next_tick = loop.time()
+                delay = 0
+            await asyncio.sleep(max(0.0, delay))
+
+    def stats(self):
+        times = sorted(self.tick_times)
+        if not times:
+            return None
+        return {
+            'room': self.name,
+            'players': len(self.clients),
+            'zombies': len(self.world.enemies),
+            'bullets': len(self.world.bullets),
+            'tick_ms_p50': times[len(times) // 2] * 1000,
+            'tick_ms_max': times[-1] * 1000,
+            'bytes_sent': self.bytes_sent,
+        }
+
+
+class GameServer:
+    """Accepts WebSocket clients and routes them to rooms by URL path."""
+
+    def __init__(self, map_path=None, tick_rate=TICK_RATE, snapshot_rate=SNAPSHOT_RATE, seed=None):
+        self.map_path = map_path
+        self.tick_rate = tick_rate
+        self.snapshot_rate = snapshot_rate
+        self.rng = random.Random(seed)
+        self.rooms = {}
+        self.next_id = 1
+
+    def room(self, name):
+        room = self.rooms.get(name)
+        if room is None:
+            world = RoomWorld.from_map(self.map_path, rng=random.Random(self.rng.random()),
+                                       seed=self.rng.getrandbits(64))
+            room = self.rooms[name] = Room(name, world, self.tick_rate, self.snapshot_rate)
+        return room
+
+    async def handshake(self, reader, writer):
+        """Answer the HTTP upgrade; return (room name, binary) or None."""
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            return None
+        lines = request.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        if len(parts) < 2 or headers.get("upgrade", "").lower() != "websocket" or "sec-websocket-key" not in headers:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\n\r\n")
+            return None
+        accept = base64.b64encode(hashlib.sha1(headers["sec-websocket-key"].encode() + GUID).digest()).decode()
+        offered = [p.strip() for p in headers.get("sec-websocket-protocol", "").split(",")]
+        binary = state_codec.PROTOCOL in offered
+        writer.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\n"
+            "Connection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n"
+            + (f"Sec-WebSocket-Protocol: {state_codec.PROTOCOL}\r\n" if binary else "") +
+            "\r\n"
+        ).encode())
+        name = parts[1].split("?", 1)[0].strip("/") or "default"
+        return name, binary
+
+    async def handle(self, reader, writer):
+        accepted = await self.handshake(reader, writer)
+        if accepted is None:
+            writer.close()
+            return
+        name, binary = accepted
+        conn = Connection(self.next_id, writer, state_codec.DeltaCodec() if binary else None)
+        self.next_id += 1
+        room = self.room(name)
+        room.join(conn)
+        if room.task is None or room.task.done():
+            room.task = asyncio.ensure_future(room.run())
+        buf = bytearray()
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                buf += data
+                pos = 0
+                while True:
+                    try:
+                        frame = parse_frame(buf, pos, MAX_FRAME_SIZE)
+                    except ValueError:
+                        writer.write(encode_frame(struct.pack(">H", CLOSE_TOO_BIG), OP_CLOSE))
+                        return
+                    if frame is None:
+                        break
+                    _, opcode, payload, pos = frame
+                    if opcode == OP_CLOSE:
+                        return
+                    if opcode == OP_TEXT:
+                        try:
+                            room.handle(conn, json.loads(payload))
+                        except ValueError:
+                            pass
+                del buf[:pos]
+        except ConnectionError:
+            pass
+        finally:
+            room.leave(conn)
+            if not room.clients:
+                self.rooms.pop(name, None)
+            writer.close()
+
+    async def serve(self, host="0.0.0.0", port=PORT):
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def report(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            for room in list(self.rooms.values()):
+                stats = room.stats()
+                if stats:
+                    print("{room}: {players} players, {zombies} zombies, {bullets} bullets, "
+                          "tick p50 {tick_ms_p50:.2f} ms max {tick_ms_max:.2f} ms, "
+                          "{bytes_sent} bytes sent".format(**stats), flush=True)
+
+
+async def run_server(args):
+    game = GameServer(args.map, args.tick_rate, args.snapshot_rate, args.seed)
+    server = await game.serve(args.host, args.port)
+    print(f"Game server listening on {args.port}", flush=True)
+    if args.stats:
+        asyncio.ensure_future(game.report(args.stats))
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Authoritative Zombie Survival server")
+    parser.add_argument('map', nargs='?', help="JSON map used for every room")
+    parser.add_argument('--host', default="0.0.0.0")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--tick-rate', type=int, default=TICK_RATE, help="simulation ticks per second")
+    parser.add_argument('--snapshot-rate', type=int, default=SNAPSHOT_RATE, help="snapshots sent per second")
+    parser.add_argument('--seed', type=int, help="seed for room worlds")
+    parser.add_argument('--stats', type=float, metavar='SECONDS', help="print per-room stats at this interval")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_server(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
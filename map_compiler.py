@@ -0,0 +1,348 @@
+"""Compile JSON maps into a memory-mapped binary format.
+
+Parsing a JSON map builds a dict for every object before the game starts,
+which is slow and memory hungry for maps with hundreds of thousands of
+objects. A compiled ``.zsmap`` file instead holds packed rock, wall and tree
+records plus a precomputed spatial bucket table per layer. ``load_map()``
+memory-maps it and only turns an object into a dict once the game looks at
+its grid cell, so load time and memory follow what is near the player::
+
+    python map_compiler.py custom-map.json          # writes custom-map.zsmap
+    python zombie_survival.py custom-map.json       # uses it while it is fresh
+
+The file starts with ``HEADER``, then one ``LAYER`` per rocks, walls, trees,
+then each layer's records, sorted cell keys, bucket starts and object
+indices. The header records the source's size, mtime and SHA-1, so a
+compiled map is only used while it matches its JSON source and the compiler
+skips maps that are already up to date.
+"""
+import argparse
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+from zombie_survival import GRID_CELL_SIZE, ROCK_RADIUS, SpatialGrid, WORLD_HEIGHT, WORLD_WIDTH
+
+MAGIC = b"ZSMP"
+VERSION = 1
+EXTENSION = ".zsmap"
+
+HEADER = struct.Struct("<4sHHQq20sddI")  # magic, version, flags, source size, mtime ns, sha1, start x/y, cell size
+LAYER = struct.Struct("<IIQQQQ")         # objects, cells, offsets of records, keys, starts, indices
+ROCK = struct.Struct("<ddi")             # x, y, hp
+WALL = struct.Struct("<dddd")            # x, y, width, height
+TREE = struct.Struct("<dddi")            # x, y, radius, hp
+
+_CELL_OFFSET = 1 << 31
+
+
+def _rock_fields(r):
+    return r['x'], r['y'], r.get('hp', 8)
+
+
+def _wall_fields(w):
+    return w['x'], w['y'], w['width'], w['height']
+
+
+def _tree_fields(t):
+    return t['x'], t['y'], t.get('radius', 240), t.get('hp', 5)
+
+
+def _rock_dict(rec):
+    return {'x': rec[0], 'y': rec[1], 'hp': rec[2]}
+
+
+def _wall_dict(rec):
+    return {'x': rec[0], 'y': rec[1], 'width': rec[2], 'height': rec[3]}
+
+
+def _tree_dict(rec):
+    return {'x': rec[0], 'y': rec[1], 'radius': rec[2], 'hp': rec[3]}
+
+
+def _rock_box(rec):
+    return rec[0] - ROCK_RADIUS, rec[1] - ROCK_RADIUS, rec[0] + ROCK_RADIUS, rec[1] + ROCK_RADIUS
+
+
+def _wall_box(rec):
+    return rec[0], rec[1], rec[0] + rec[2], rec[1] + rec[3]
+
+
+def _tree_box(rec):
+    return rec[0] - rec[2], rec[1] - rec[2], rec[0] + rec[2], rec[1] + rec[2]
+
+
+# (JSON key, record layout, fields from JSON, dict from record, bounding box);
+# the boxes match what Obstacles inserts into its grids
+LAYERS = (
+    ('rocks', ROCK, _rock_fields, _rock_dict, _rock_box),
+    ('walls', WALL, _wall_fields, _wall_dict, _wall_box),
+    ('trees', TREE, _tree_fields, _tree_dict, _tree_box),
+)
+
+
+def cell_key(cx, cy):
+    return ((cx + _CELL_OFFSET) << 32) | (cy + _CELL_OFFSET)
+
+
+def compiled_path(source):
+    return os.path.splitext(source)[0] + EXTENSION
+
+
+def _source_info(source):
+    st = os.stat(source)
+    return st.st_size, st.st_mtime_ns
+
+
+def _sha1(source):
+    h = hashlib.sha1()
+    with open(source, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.digest()
+
+
+def _pad(out, size):
+    out.append(b"\0" * (-size % 8))
+    return size + (-size % 8)
+
+
+def _build_layer(records, box, cell_size):
+    """Return (sorted cell keys, bucket starts, object indices) for one layer."""
+    buckets = {}
+    for i, rec in enumerate(records):
+        x0, y0, x1, y1 = box(rec)
+        for cx in range(int(x0 // cell_size), int(x1 // cell_size) + 1):
+            for cy in range(int(y0 // cell_size), int(y1 // cell_size) + 1):
+                buckets.setdefault(cell_key(cx, cy), []).append(i)
+    keys = sorted(buckets)
+    starts = [0]
+    indices = []
+    for key in keys:
+        indices.extend(buckets[key])
+        starts.append(len(indices))
+    return keys, starts, indices
+
+
+def compile_map(source, target=None, cell_size=GRID_CELL_SIZE):
+    """Compile a JSON map file; return the path written."""
+    target = target or compiled_path(source)
+    size, mtime = _source_info(source)
+    digest = _sha1(source)
+    with open(source, 'r') as f:
+        data = json.load(f)
+    start = data.get('playerStart', {'x': WORLD_WIDTH // 2, 'y': WORLD_HEIGHT // 2})
+
+    layers = []
+    for name, layout, fields, _, box in LAYERS:
+        records = [fields(item) for item in data.get(name, [])]
+        layers.append((layout, records) + _build_layer(records, box, cell_size))
+
+    out = [HEADER.pack(MAGIC, VERSION, 0, size, mtime, digest, start['x'], start['y'], cell_size)]
+    offset = HEADER.size + LAYER.size * len(layers)
+    offset = _pad(out, offset)
+    descriptors = []
+    blobs = []
+    for layout, records, keys, starts, indices in layers:
+        parts = [b"".join(layout.pack(*rec) for rec in records),
+                 struct.pack("<%dQ" % len(keys), *keys),
+                 struct.pack("<%dI" % len(starts), *starts),
+                 struct.pack("<%dI" % len(indices), *indices)]
+        places = []
+        for part in parts:
+            places.append(offset)
+            blobs.append(part)
+            offset = _pad(blobs, offset + len(part))
+        descriptors.append(LAYER.pack(len(records), len(keys), *places))
+    out[1:1] = descriptors
+
+    tmp = target + ".tmp"
+    with open(tmp, 'wb') as f:
+        f.write(b"".join(out))
+        f.write(b"".join(blobs))
+    os.replace(tmp, target)
+    return target
+
+
+def is_fresh(source, target=None):
+    """True if target was compiled from the current contents of source."""
+    target = target or compiled_path(source)
+    try:
+        with open(target, 'rb') as f:
+            head = f.read(HEADER.size)
+        size, mtime = _source_info(source)
+    except OSError:
+        return False
+    if len(head) < HEADER.size:
+        return False
+    magic, version, _, src_size, src_mtime, digest = HEADER.unpack(head)[:6]
+    if magic != MAGIC or version != VERSION or src_size != size:
+        return False
+    # a touched but unchanged source is still fresh
+    return src_mtime == mtime or digest == _sha1(source)
+
+
+class MappedGrid(SpatialGrid):
+    """SpatialGrid over one compiled layer that loads cells on first query.
+
+    Objects become dicts the first time a cell holding them is loaded, and an
+    object spanning several cells is the same dict in all of them.
+    """
+
+    def __init__(self, layer):
+        super().__init__(layer.cell_size)
+        self.layer = layer
+        self.loaded = set()
+        self.by_index = {}
+        self.index_of = {}
+        # indices of destroyed objects, skipped by cells loaded later
+        self.gone = set()
+
+    def __len__(self):
+        return len(self.layer) - len(self.gone) + len(self.items) - len(self.by_index)
+
+    def __iter__(self):
+        for i in range(len(self.layer)):
+            if i not in self.by_index and i not in self.gone:
+                self._materialize(i)
+        return super().__iter__()
+
+    def _materialize(self, i):
+        item = self.by_index[i] = self.layer[i]
+        self.index_of[id(item)] = i
+        self.items[id(item)] = (item, [])
+        for key in self.layer.cells_of(i):
+            if key in self.loaded:
+                self._place(item, key)
+        return item
+
+    def _place(self, item, key):
+        self.cells.setdefault(key, []).append(item)
+        self.items[id(item)][1].append(key)
+
+    def _load(self, key):
+        self.loaded.add(key)
+        for i in self.layer.bucket(*key):
+            if i in self.gone:
+                continue
+            item = self.by_index.get(i)
+            if item is None:
+                self._materialize(i)
+            else:
+                self._place(item, key)
+
+    def _load_range(self, cols, rows):
+        for cx in cols:
+            for cy in rows:
+                if (cx, cy) not in self.loaded:
+                    self._load((cx, cy))
+
+    def insert(self, item, x0, y0, x1, y1):
+        self._load_range(*self._cell_range(x0, y0, x1, y1))
+        super().insert(item, x0, y0, x1, y1)
+
+    def remove(self, item):
+        if not super().remove(item):
+            return False
+        i = self.index_of.pop(id(item), None)
+        if i is not None:
+            del self.by_index[i]
+            self.gone.add(i)
+        return True
+
+    def query(self, x, y, r):
+        self._load_range(*self._cell_range(x - r, y - r, x + r, y + r))
+        return super().query(x, y, r)
+
+
+class MapLayer:
+    """Read-only sequence view of one layer of a compiled map."""
+
+    def __init__(self, buf, count, cells, records, keys, starts, indices, layout, to_dict, box, cell_size):
+        self.buf = buf
+        self.count = count
+        self.layout = layout
+        self.to_dict = to_dict
+        self.box = box
+        self.cell_size = cell_size
+        self.records = records
+        self.keys = buf[keys:keys + cells * 8].cast('Q')
+        self.starts = buf[starts:starts + (cells + 1) * 4].cast('I')
+        self.indices = buf[indices:indices + self.starts[cells] * 4].cast('I')
+
+    def __len__(self):
+        return self.count
+
+    def _record(self, i):
+        return self.layout.unpack_from(self.buf, self.records + i * self.layout.size)
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return self.to_dict(self._record(i))
+
+    def bucket(self, cx, cy):
+        """Return the object indices in a cell."""
+        key = cell_key(cx, cy)
+        pos = bisect.bisect_left(self.keys, key)
+        if pos == len(self.keys) or self.keys[pos] != key:
+            return ()
+        return self.indices[self.starts[pos]:self.starts[pos + 1]]
+
+    def cells_of(self, i):
+        """Return the cells object i was bucketed into."""
+        x0, y0, x1, y1 = self.box(self._record(i))
+        size = self.cell_size
+        return [(cx, cy) for cx in range(int(x0 // size), int(x1 // size) + 1)
+                for cy in range(int(y0 // size), int(y1 // size) + 1)]
+
+    def spatial_grid(self, cell_size):
+        """Return a MappedGrid for this layer, or None if it was bucketed at another cell size."""
+        if cell_size != self.cell_size:
+            return None
+        return MappedGrid(self)
+
+
+def load(path):
+    """Memory-map a compiled map; return (rocks, walls, trees, player_start) like load_map()."""
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return load_buffer(memoryview(mm), path)
+
+
+def load_buffer(buf, name="buffer"):
+    """Like load() for a compiled map already in memory, such as a shared memory block."""
+    buf = memoryview(buf)
+    magic, version, _, _, _, _, start_x, start_y, cell_size = HEADER.unpack_from(buf)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("%s is not a version %d compiled map" % (name, VERSION))
+    layers = []
+    for n, (_, layout, _, to_dict, box) in enumerate(LAYERS):
+        desc = LAYER.unpack_from(buf, HEADER.size + n * LAYER.size)
+        layers.append(MapLayer(buf, *desc, layout, to_dict, box, cell_size))
+    return layers[0], layers[1], layers[2], {'x': start_x, 'y': start_y}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile JSON maps to the binary .zsmap format")
+    parser.add_argument('maps', nargs='+', help="JSON map files")
+    parser.add_argument('-o', '--output', help="output path (single map only)")
+    parser.add_argument('--force', action='store_true', help="recompile even if up to date")
+    args = parser.parse_args()
+    if args.output and len(args.maps) > 1:
+        parser.error("--output needs a single map")
+    for source in args.maps:
+        target = args.output or compiled_path(source)
+        if not args.force and is_fresh(source, target):
+            print(f"{target} is up to date")
+            continue
+        compile_map(source, target)
+        print(f"{source} -> {target}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""Client-side prediction and snapshot interpolation for the authoritative server.
+
+Against ``game_server.py`` the client no longer waits a round trip to see
+its own player move. ``Prediction`` applies every tick's input to the local
+player straight away and keeps it, numbered, until a snapshot acknowledges
+it. The commands go to the server in batches, and the server applies them
+one per tick. When a snapshot arrives the player is put back where the
+server has it after the acknowledged input, and the inputs the server has
+not applied yet are replayed on top. Both sides run the same
+``World.move_player()`` against the same obstacles, since the client builds
+its world from the map or seed in the server's room message and applies the
+damage the server reports. So with the same tick rate the replay lands where
+the server will, and corrections are rare and small.
+
+Other players, zombies and bullets cannot be predicted, so ``Interpolation``
+shows them a little in the past. It blends between the two snapshots around
+``now - delay``, so they move smoothly even at low snapshot rates.
+"""
+import math
+from collections import deque
+
+from zombie_survival import TICK_MS, _blend, apply_snapshot, pack_inputs, unpack_inputs
+
+MAX_PENDING = 600  # inputs kept for replay while the server acknowledges none
+INTERP_DELAY = 100  # milliseconds remote entities are shown behind the newest snapshot
+INTERP_GAPS = 1.5  # ... or this many snapshot intervals, when snapshots are slower
+SNAPSHOT_HISTORY = 32
+
+
+class Prediction:
+    """Predicts the local player from the inputs the server has not applied yet."""
+
+    def __init__(self, world, tick_ms=TICK_MS):
+        self.world = world
+        self.tick_ms = tick_ms
+        self.seq = 0
+        # (seq, inputs) applied locally, oldest first
+        self.pending = deque(maxlen=MAX_PENDING)
+        self.unsent = []
+        # how far the last snapshot moved the predicted player, in world units
+        self.error = 0.0
+
+    def _move(self, inputs):
+        world = self.world
+        if world.game_over or world.player['hp'] <= 0:
+            return
+        world.motion = self.tick_ms / TICK_MS
+        world.move_player(inputs)
+
+    def step(self, inputs):
+        """Apply one tick of inputs to the local player and queue it for the server."""
+        self.seq += 1
+        bits, angle = pack_inputs(inputs)
+        self.world.player['angle'] = angle
+        self._move(inputs)
+        self.pending.append((self.seq, inputs))
+        self.unsent.append([self.seq, bits, angle])
+        return self.seq
+
+    def message(self):
+        """Return an input message with every command not sent yet, or None."""
+        if not self.unsent:
+            return None
+        seq, bits, angle = self.unsent[-1]
+        # the newest input as plain fields too, for servers that only hold the latest
+        msg = dict(unpack_inputs(bits, angle), type='input', seq=seq, commands=self.unsent)
+        self.unsent = []
+        return msg
+
+    def reconcile(self, acked):
+        """Drop inputs up to ``acked`` and replay the rest from the player's current position."""
+        pending = self.pending
+        while pending and pending[0][0] <= acked:
+            pending.popleft()
+        for _, inputs in pending:
+            self._move(inputs)
+
+    def apply_snapshot(self, client, msg):
+        """apply_snapshot() for an authoritative world message, then reconcile; return the other players."""
+        player = self.world.player
+        x, y = player['x'], player['y']
+        players = apply_snapshot(self.world, client, msg, authoritative=True)
+        self.reconcile(msg.get('seq', 0))
+        self.error = math.hypot(player['x'] - x, player['y'] - y)
+        return players
+
+
+def _blend_items(newer, older, alpha):
+    before = {item['id']: (item['x'], item['y']) for item in older if 'id' in item}
+    return [dict(item, x=x, y=y) for item, x, y in _blend(newer, before, alpha)]
+
+
+class Interpolation:
+    """Buffers snapshots of remote entities and samples them ``delay`` ms in the past."""
+
+    def __init__(self, delay=INTERP_DELAY):
+        self.min_delay = delay
+        # (arrival ms, players, zombies, bullets), oldest first
+        self.snapshots = deque(maxlen=SNAPSHOT_HISTORY)
+        self.gap = 0.0
+
+    def delay(self):
+        return max(self.min_delay, INTERP_GAPS * self.gap)
+
+    def add(self, now, players, zombies, bullets):
+        snapshots = self.snapshots
+        if snapshots:
+            gap = now - snapshots[-1][0]
+            self.gap = gap if not self.gap else self.gap * 0.9 + gap * 0.1
+        snapshots.append((now, players, zombies, bullets))
+
+    def sample(self, now):
+        """Return (players, zombies, bullets) as they were ``delay()`` ms before now."""
+        snapshots = self.snapshots
+        if not snapshots:
+            return {}, [], []
+        t = now - self.delay()
+        while len(snapshots) > 2 and snapshots[1][0] <= t:
+            snapshots.popleft()
+        older = snapshots[0]
+        if len(snapshots) == 1 or t <= older[0]:
+            return older[1:]
+        newer = snapshots[1]
+        if t >= newer[0]:
+            return newer[1:]
+        alpha = (t - older[0]) / (newer[0] - older[0])
+        players = {}
+        for pid, p in newer[1].items():
+            before = older[1].get(pid)
+            if before is not None:
+                p = dict(p, x=before['x'] + (p['x'] - before['x']) * alpha,
+                         y=before['y'] + (p['y'] - before['y']) * alpha)
+            players[pid] = p
+        return players, _blend_items(newer[2], older[2], alpha), _blend_items(newer[3], older[3], alpha)
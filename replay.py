@@ -0,0 +1,289 @@
+"""Record game sessions and replay them deterministically.
+
+A recording holds everything the simulation consumed: the RNG seed, the map
+file, the fixed tick length, every tick's input, restarts, and the network
+snapshots applied between ticks. Replaying feeds the same sequence into a new
+``World`` as fast as it can, and checks the state hash stored after every
+tick, so a replay either reproduces the session exactly or reports the first
+tick where it went a different way::
+
+    python zombie_survival.py --record session.zsrec
+    python replay.py session.zsrec                          # verify, report ticks/s
+    python replay.py session.zsrec --until-wave 5 --watch   # fast-forward, then watch
+    python replay.py session.zsrec --profile frames.json    # profile offline
+
+The file is ``HEADER``, the map's name and zlib-compressed contents, then a
+zlib stream of records: ``TICK`` (buttons, aim angle, state hash after the
+step), ``SNAPSHOT`` (a length-prefixed JSON network message) and ``RESTART``.
+The stream is flushed every ``FLUSH_TICKS`` ticks, so a recording cut short
+by a crash still replays up to its last flush.
+"""
+import argparse
+import json
+import os
+import random
+import struct
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+
+from frame_profiler import FORMATS as PROFILE_FORMATS, FrameProfiler
+from zombie_survival import World, apply_snapshot, pack_inputs, unpack_inputs
+
+MAGIC = b"ZSRP"
+VERSION = 1
+EXTENSION = ".zsrec"
+FLUSH_TICKS = 60
+
+HEADER = struct.Struct("<4sHHQdHI")  # magic, version, flags, seed, tick ms, map name and data lengths
+TICK = struct.Struct("<BfI")         # buttons, angle, state hash
+LENGTH = struct.Struct("<I")
+
+REC_TICK = 1
+REC_SNAPSHOT = 2
+REC_RESTART = 3
+
+FLAG_NUMPY = 1
+FLAG_ENDLESS = 2
+
+
+def state_hash(world):
+    """CRC-32 of the simulated state: player, score, clock, zombies and bullets."""
+    player = world.player
+    values = [player['x'], player['y'], player['hp'], world.score, world.wave, world.time]
+    for e in world.enemies:
+        values += (e['x'], e['y'], e['hp'])
+    for b in world.bullets:
+        values += (b['x'], b['y'])
+    return zlib.crc32(array('d', values).tobytes())
+
+
+class Recorder:
+    """Writes a session to a recording as main() plays it."""
+
+    def __init__(self, path, seed, tick_ms, map_path=None, numpy=False, endless=False):
+        self.file = open(path, 'wb')
+        self.compressor = zlib.compressobj(9)
+        self.ticks = 0
+        name = os.path.basename(map_path or "").encode()
+        data = b""
+        if map_path:
+            with open(map_path, 'rb') as f:
+                data = zlib.compress(f.read(), 9)
+        flags = (FLAG_NUMPY if numpy else 0) | (FLAG_ENDLESS if endless else 0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, flags, seed, tick_ms, len(name), len(data)))
+        self.file.write(name + data)
+
+    def _write(self, data):
+        self.file.write(self.compressor.compress(data))
+
+    def step(self, world, dt, inputs):
+        """Step world with inputs and record the tick."""
+        bits, angle = pack_inputs(inputs)
+        # the angle is stored as float32, so the live game must use the stored value too
+        angle = struct.unpack("<f", struct.pack("<f", angle))[0]
+        world.step(dt, unpack_inputs(bits, angle))
+        self._write(bytes((REC_TICK,)) + TICK.pack(bits, angle, state_hash(world)))
+        self.ticks += 1
+        if self.ticks % FLUSH_TICKS == 0:
+            self.file.write(self.compressor.flush(zlib.Z_SYNC_FLUSH))
+            self.file.flush()
+
+    def snapshot(self, msg):
+        """Record a network message before it is applied to the world."""
+        data = json.dumps(msg, separators=(',', ':')).encode()
+        self._write(bytes((REC_SNAPSHOT,)) + LENGTH.pack(len(data)) + data)
+
+    def restart(self):
+        self._write(bytes((REC_RESTART,)))
+
+    def close(self):
+        self.file.write(self.compressor.flush())
+        self.file.close()
+
+
+class Recording:
+    """A recording opened for replay."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            head = f.read(HEADER.size)
+            if len(head) < HEADER.size:
+                raise ValueError("%s is not a recording" % path)
+            magic, version, self.flags, self.seed, self.tick_ms, name_len, data_len = HEADER.unpack(head)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError("%s is not a version %d recording" % (path, VERSION))
+            self.map_name = f.read(name_len).decode()
+            self.map_data = zlib.decompress(f.read(data_len)) if data_len else b""
+            # a recording cut short ends at its last complete flush
+            self.stream = zlib.decompressobj().decompress(f.read())
+        self._map_dir = None
+
+    def world_class(self):
+        if self.flags & FLAG_NUMPY:
+            from entity_store import ArrayWorld
+            return ArrayWorld
+        return World
+
+    def map_path(self):
+        """Write the embedded map to a temporary file and return its path, or None."""
+        if not self.map_data:
+            return None
+        if self._map_dir is None:
+            self._map_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(self._map_dir.name, self.map_name)
+        with open(path, 'wb') as f:
+            f.write(self.map_data)
+        return path
+
+    def new_world(self):
+        return self.world_class().from_map(self.map_path(), rng=random.Random(self.seed),
+                                           endless=bool(self.flags & FLAG_ENDLESS))
+
+    def records(self):
+        """Yield (REC_TICK, inputs, hash), (REC_SNAPSHOT, msg, None) and (REC_RESTART, None, None)."""
+        data = self.stream
+        pos = 0
+        while pos < len(data):
+            tag = data[pos]
+            pos += 1
+            if tag == REC_TICK:
+                if pos + TICK.size > len(data):
+                    return
+                bits, angle, digest = TICK.unpack_from(data, pos)
+                pos += TICK.size
+                yield REC_TICK, unpack_inputs(bits, angle), digest
+            elif tag == REC_SNAPSHOT:
+                if pos + LENGTH.size > len(data):
+                    return
+                size = LENGTH.unpack_from(data, pos)[0]
+                pos += LENGTH.size
+                if pos + size > len(data):
+                    return
+                yield REC_SNAPSHOT, json.loads(data[pos:pos + size]), None
+                pos += size
+            elif tag == REC_RESTART:
+                yield REC_RESTART, None, None
+            else:
+                raise ValueError("corrupt recording: record type %d" % tag)
+
+
+class _Client:
+    """The part of WebSocketClient that apply_snapshot() uses."""
+
+    def __init__(self):
+        self.id = None
+
+
+class Replayer:
+    """Feeds a recording into a World as fast as possible, resuming where it stopped.
+
+    With ``verify`` a ValueError names the first tick whose state hash differs
+    from the recorded one.
+    """
+
+    def __init__(self, recording, world=None, verify=True):
+        self.world = world or recording.new_world()
+        self.dt = recording.tick_ms
+        self.records = recording.records()
+        self.verify = verify
+        self.client = _Client()
+        self.ticks = 0
+
+    def run(self, until_tick=None, until_wave=None, on_tick=None):
+        """Replay until ``until_tick`` ticks, wave ``until_wave`` or the end; return the tick count.
+
+        ``on_tick(world, tick)`` is called after every step.
+        """
+        world = self.world
+        if (until_tick is not None and self.ticks >= until_tick or
+                until_wave is not None and world.wave >= until_wave):
+            return self.ticks
+        for kind, value, digest in self.records:
+            if kind == REC_SNAPSHOT:
+                apply_snapshot(world, self.client, value)
+                continue
+            if kind == REC_RESTART:
+                world.restart()
+                continue
+            world.step(self.dt, value)
+            self.ticks += 1
+            if self.verify and state_hash(world) != digest:
+                raise ValueError("replay diverged from the recording at tick %d" % self.ticks)
+            if on_tick:
+                on_tick(world, self.ticks)
+            if (until_tick is not None and self.ticks >= until_tick or
+                    until_wave is not None and world.wave >= until_wave):
+                break
+        return self.ticks
+
+
+def watch(world, tick_ms):
+    """Return an on_tick callback that draws each tick at normal speed."""
+    import zombie_survival
+    pygame = zombie_survival.pygame
+    if pygame is None:
+        sys.exit("Pygame is required to watch a replay: pip install pygame")
+    pygame.init()
+    screen = pygame.display.set_mode((zombie_survival.SCREEN_WIDTH, zombie_survival.SCREEN_HEIGHT))
+    renderer = zombie_survival.Renderer(screen, world)
+    clock = pygame.time.Clock()
+
+    def on_tick(world, tick):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                sys.exit(0)
+        renderer.draw()
+        pygame.display.flip()
+        clock.tick(1000 / tick_ms)
+    return on_tick
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded Zombie Survival session")
+    parser.add_argument('recording', help="a .zsrec file written by zombie_survival.py --record")
+    parser.add_argument('--until-tick', type=int, help="stop after this many ticks")
+    parser.add_argument('--until-wave', type=int, help="stop once this wave is reached")
+    parser.add_argument('--watch', action='store_true',
+                        help="after fast-forwarding, show the rest of the replay at normal speed")
+    parser.add_argument('--no-verify', action='store_true', help="skip the per-tick state hash check")
+    parser.add_argument('--profile', metavar='PATH', help="profile every tick and write the records to PATH")
+    parser.add_argument('--profile-format', choices=PROFILE_FORMATS, default='json')
+    args = parser.parse_args()
+
+    recording = Recording(args.recording)
+    replayer = Replayer(recording, verify=not args.no_verify)
+    world = replayer.world
+
+    on_tick = None
+    prof = None
+    if args.profile:
+        prof = FrameProfiler(record=True)
+        prof.watch(world, 'update_bullets', 'simulate.bullets')
+        prof.watch(world, 'update_enemies', 'simulate.enemies')
+        prof.enable()
+        prof.start_frame()
+
+        def on_tick(world, tick):
+            prof.lap('simulate')
+            prof.count('zombies', len(world.enemies))
+            prof.start_frame()
+
+    t0 = time.perf_counter()
+    ticks = replayer.run(args.until_tick, args.until_wave, on_tick)
+    seconds = max(time.perf_counter() - t0, 1e-9)
+    print("%d ticks in %.2f s (%.0f ticks/s, %.0fx real time)%s" % (
+        ticks, seconds, ticks / seconds, ticks * recording.tick_ms / 1000 / seconds,
+        ", every state hash matched" if replayer.verify else ""))
+    print("wave %d, score %d, hp %s, %d zombies, %d bullets" % (
+        world.wave, world.score, world.player['hp'], len(world.enemies), len(world.bullets)))
+    if prof:
+        prof.dump(args.profile, args.profile_format)
+    if args.watch:
+        replayer.run(on_tick=watch(world, recording.tick_ms))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
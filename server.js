@@ -1,51 +1,93 @@
 const http = require('http');
 const crypto = require('crypto');
+const codec = require('./state-codec');
 
-const PORT = 8765;
+const PORT = Number(process.env.PORT || 8765);
+// Clients only receive entities within this distance of their player; 0 sends everything.
+const AOI_RADIUS = Number(process.env.AOI_RADIUS || 1200);
+const SECTIONS = ['players', 'zombies', 'bullets'];
+const SHOWN_HISTORY = 64; // views kept per client for the states that acknowledge them
 const clients = new Map();
 let nextId = 1;
+let broadcastTick = 0;
 const world = { players: {}, bullets: [], zombies: [] };
 
+// Returns { opcode, payload, length } for the frame at the start of buffer,
+// or null until the whole frame has arrived.
 function parseFrame(buffer) {
-  const second = buffer[1];
-  let length = second & 0x7f;
+  if (buffer.length < 2) return null;
+  const opcode = buffer[0] & 0x0f;
+  const masked = (buffer[1] & 0x80) !== 0;
+  let length = buffer[1] & 0x7f;
   let offset = 2;
   if (length === 126) {
+    if (buffer.length < 4) return null;
     length = buffer.readUInt16BE(offset);
     offset += 2;
   } else if (length === 127) {
+    if (buffer.length < 10) return null;
     length = Number(buffer.readBigUInt64BE(offset));
     offset += 8;
   }
-  const mask = buffer.slice(offset, offset + 4);
-  offset += 4;
-  const payload = Buffer.alloc(length);
-  for (let i = 0; i < length; i++) {
-    payload[i] = buffer[offset + i] ^ mask[i % 4];
+  const maskOffset = offset;
+  if (masked) offset += 4;
+  if (buffer.length < offset + length) return null;
+  const payload = Buffer.from(buffer.subarray(offset, offset + length));
+  if (masked) {
+    for (let i = 0; i < length; i++) {
+      payload[i] ^= buffer[maskOffset + (i % 4)];
+    }
   }
-  return payload.toString();
+  return { opcode, payload, length: offset + length };
 }
 
-function frameData(data) {
-  const payload = Buffer.from(JSON.stringify(data));
+function frame(payload, opcode) {
   const length = payload.length;
   let header;
   if (length < 126) {
-    header = Buffer.from([0x81, length]);
+    header = Buffer.from([0x80 | opcode, length]);
   } else if (length < 65536) {
     header = Buffer.alloc(4);
-    header[0] = 0x81;
+    header[0] = 0x80 | opcode;
     header[1] = 126;
     header.writeUInt16BE(length, 2);
   } else {
     header = Buffer.alloc(10);
-    header[0] = 0x81;
+    header[0] = 0x80 | opcode;
     header[1] = 127;
     header.writeBigUInt64BE(BigInt(length), 2);
   }
   return Buffer.concat([header, payload]);
 }
 
+// With AOI on a client's state is built from the snapshot whose tick it
+// acknowledges, so it may replace or remove just the entities shown in that
+// snapshot, plus any it sends by id. Entities shown only in later snapshots are
+// kept. Clients that send no ack are taken to have seen the latest view.
+// Entities without an id count as shown when within the radius of its player.
+function mergeSection(name, client, submitted, ack) {
+  const view = ack ? client.shown.get(ack) : client.visible;
+  const shown = view ? view[name] : new Set();
+  const own = world.players[client.id];
+  const ids = new Set(submitted.map(item => item.id));
+  const r2 = AOI_RADIUS * AOI_RADIUS;
+  const kept = world[name].filter(item => (item.id === undefined
+    ? (item.x - own.x) ** 2 + (item.y - own.y) ** 2 > r2
+    : !shown.has(item.id) && !ids.has(item.id)));
+  world[name] = kept.concat(submitted);
+}
+
+function handleMessage(client, msg) {
+  if (msg && msg.type === 'state') {
+    world.players[client.id] = msg.player || world.players[client.id];
+    for (const name of ['zombies', 'bullets']) {
+      if (!msg[name]) continue;
+      if (AOI_RADIUS > 0) mergeSection(name, client, msg[name], msg.ack);
+      else world[name] = msg[name];
+    }
+  }
+}
+
 const server = http.createServer();
 
 server.on('upgrade', (req, socket) => {
@@ -58,28 +100,39 @@ server.on('upgrade', (req, socket) => {
     .createHash('sha1')
     .update(key + '258EAFA5-E914-47DA-95CA-C5AB0DC85B11')
     .digest('base64');
+  const offered = (req.headers['sec-websocket-protocol'] || '').split(',').map(p => p.trim());
+  const binary = offered.includes(codec.PROTOCOL);
   socket.write(
     'HTTP/1.1 101 Switching Protocols\r\n' +
     'Upgrade: websocket\r\n' +
     'Connection: Upgrade\r\n' +
     `Sec-WebSocket-Accept: ${accept}\r\n` +
+    (binary ? `Sec-WebSocket-Protocol: ${codec.PROTOCOL}\r\n` : '') +
     '\r\n'
   );
 
   const id = nextId++;
-  clients.set(socket, id);
+  const client = { id, codec: binary ? new codec.DeltaCodec() : null, visible: null, shown: new Map() };
+  clients.set(socket, client);
   world.players[id] = { x: 0, y: 0, angle: 0, hp: 100 };
 
+  let pending = Buffer.alloc(0);
   socket.on('data', (buf) => {
-    try {
-      const msg = JSON.parse(parseFrame(buf));
-      if (msg.type === 'state') {
-        world.players[id] = msg.player;
-        world.bullets = msg.bullets || world.bullets;
-        world.zombies = msg.zombies || world.zombies;
+    pending = pending.length ? Buffer.concat([pending, buf]) : buf;
+    let f;
+    while ((f = parseFrame(pending))) {
+      pending = pending.subarray(f.length);
+      try {
+        if (f.opcode === 0x8) {
+          socket.end();
+        } else if (f.opcode === 0x1) {
+          handleMessage(client, JSON.parse(f.payload.toString()));
+        } else if (f.opcode === 0x2 && client.codec) {
+          handleMessage(client, codec.decodeMessage(client.codec, f.payload));
+        }
+      } catch (err) {
+        console.error('Bad frame', err);
       }
-    } catch (err) {
-      console.error('Bad frame', err);
     }
   });
 
@@ -90,10 +143,89 @@ server.on('upgrade', (req, socket) => {
 socket.on("error", () => {});
 });
 
+// Buckets every player, zombie and bullet into square cells of the AOI radius, so
+// each client only looks at the 3x3 cells around its player.
+function buildGrid(radius) {
+  const grid = new Map();
+  const add = (name, key, item) => {
+    const cell = `${Math.floor(item.x / radius)},${Math.floor(item.y / radius)}`;
+    let bucket = grid.get(cell);
+    if (!bucket) {
+      bucket = { players: [], zombies: [], bullets: [] };
+      grid.set(cell, bucket);
+    }
+    bucket[name].push([key, item]);
+  };
+  for (const [id, p] of Object.entries(world.players)) add('players', id, p);
+  world.zombies.forEach(z => add('zombies', z.id === undefined ? null : z.id, z));
+  world.bullets.forEach(b => add('bullets', b.id === undefined ? null : b.id, b));
+  return grid;
+}
+
+// Returns the part of the world within radius of the client's player and
+// remembers the ids shown for mergeSection(). Clients work out what entered
+// and left their view themselves, since they may skip stale snapshots.
+function interestFor(client, grid, radius) {
+  const own = world.players[client.id];
+  const view = { players: {}, zombies: [], bullets: [] };
+  const visible = { players: new Set(), zombies: new Set(), bullets: new Set() };
+  const cx = Math.floor(own.x / radius);
+  const cy = Math.floor(own.y / radius);
+  const r2 = radius * radius;
+  for (let x = cx - 1; x <= cx + 1; x++) {
+    for (let y = cy - 1; y <= cy + 1; y++) {
+      const bucket = grid.get(`${x},${y}`);
+      if (!bucket) continue;
+      for (const name of SECTIONS) {
+        for (const [key, item] of bucket[name]) {
+          const dx = item.x - own.x;
+          const dy = item.y - own.y;
+          if (dx * dx + dy * dy > r2) continue;
+          if (name === 'players') view.players[key] = item;
+          else view[name].push(item);
+          if (key !== null) visible[name].add(key);
+        }
+      }
+    }
+  }
+  view.players[client.id] = own;
+  visible.players.add(String(client.id));
+  client.visible = visible;
+  return view;
+}
+
+// Keeps the view just sent under the tick the client will acknowledge it by.
+function remember(client, tick) {
+  client.shown.set(tick, client.visible);
+  if (client.shown.size > SHOWN_HISTORY) client.shown.delete(client.shown.keys().next().value);
+}
+
 function broadcast() {
-  for (const [socket, id] of clients.entries()) {
+  let json = null;
+  const radius = AOI_RADIUS;
+  const tick = ++broadcastTick;
+  const grid = radius > 0 && clients.size ? buildGrid(radius) : null;
+  for (const [socket, client] of clients.entries()) {
     try {
-      socket.write(frameData({ type: 'world', id, world }));
+      if (grid) {
+        const view = interestFor(client, grid, radius);
+        if (client.codec) {
+          // the delta codec already turns entering and leaving entities into full and removed records
+          socket.write(frame(codec.encodeWorld(client.codec, client.id, view), 0x2));
+          remember(client, client.codec.tick);
+        } else {
+          const own = world.players[client.id];
+          const msg = { type: 'world', id: client.id, tick, aoi: { x: own.x, y: own.y, radius }, world: view };
+          socket.write(frame(Buffer.from(JSON.stringify(msg)), 0x1));
+          remember(client, tick);
+        }
+      } else if (client.codec) {
+        socket.write(frame(codec.encodeWorld(client.codec, client.id, world), 0x2));
+      } else {
+        // only the id differs between JSON clients
+        json = json || JSON.stringify(world);
+        socket.write(frame(Buffer.from(`{"type":"world","id":${client.id},"tick":${tick},"world":${json}}`), 0x1));
+      }
     } catch (_) {}
   }
 }
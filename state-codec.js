@@ -0,0 +1,239 @@
+// Binary, delta-encoded game state. Mirrors state_codec.py; see its module
+// docstring for the wire layout. The meta (wave, score, game over) and ack
+// trailers after the bullets section come only from the Python server; the
+// relay has neither, so they are not written here and ignored when decoding.
+
+const PROTOCOL = 'zs-binary-1';
+
+const MSG_WORLD = 1;
+const MSG_STATE = 2;
+
+const POS_SCALE = 8;
+const VEL_SCALE = 256;
+const ANGLE_SCALE = 10000;
+const KEYFRAME_INTERVAL = 60;
+const HISTORY_SIZE = 64;
+const POSITION_ID_BASE = 0x80000000;
+
+const HEADER_SIZE = 17;
+const MOVE_SIZE = 8;
+
+// [size, write(view, offset, rec), read(view, offset) -> rec]
+const LAYOUTS = {
+  players: [16,
+    (v, o, r) => { v.setUint32(o, r[0], true); v.setInt32(o + 4, r[1], true); v.setInt32(o + 8, r[2], true);
+      v.setInt16(o + 12, r[3], true); v.setInt16(o + 14, r[4], true); },
+    (v, o) => [v.getUint32(o, true), v.getInt32(o + 4, true), v.getInt32(o + 8, true),
+      v.getInt16(o + 12, true), v.getInt16(o + 14, true)]],
+  zombies: [15,
+    (v, o, r) => { v.setUint32(o, r[0], true); v.setInt32(o + 4, r[1], true); v.setInt32(o + 8, r[2], true);
+      v.setUint8(o + 12, r[3]); v.setUint8(o + 13, r[4]); v.setInt8(o + 14, r[5]); },
+    (v, o) => [v.getUint32(o, true), v.getInt32(o + 4, true), v.getInt32(o + 8, true),
+      v.getUint8(o + 12), v.getUint8(o + 13), v.getInt8(o + 14)]],
+  bullets: [16,
+    (v, o, r) => { v.setUint32(o, r[0], true); v.setInt32(o + 4, r[1], true); v.setInt32(o + 8, r[2], true);
+      v.setInt16(o + 12, r[3], true); v.setInt16(o + 14, r[4], true); },
+    (v, o) => [v.getUint32(o, true), v.getInt32(o + 4, true), v.getInt32(o + 8, true),
+      v.getInt16(o + 12, true), v.getInt16(o + 14, true)]],
+};
+const SECTIONS = ['players', 'zombies', 'bullets'];
+
+// Python's round() rounds halves to even; match it so both sides quantize alike.
+function q(value) {
+  const r = Math.round(value);
+  return (Math.abs(value % 1) === 0.5 && r % 2 !== 0) ? r - 1 : r;
+}
+
+// Same as Python's math.remainder(angle, 2 * pi): keeps angles within +-pi.
+function wrapAngle(angle) {
+  return angle - 2 * Math.PI * Math.round(angle / (2 * Math.PI));
+}
+
+function entityId(item, index) {
+  return item.id !== undefined ? item.id >>> 0 : POSITION_ID_BASE + index;
+}
+
+const quantize = {
+  players: (id, p) => [id, q(p.x * POS_SCALE), q(p.y * POS_SCALE), q(wrapAngle(p.angle || 0) * ANGLE_SCALE),
+    Math.max(-32768, Math.min(32767, q(p.hp === undefined ? 100 : p.hp)))],
+  zombies: (id, z) => [id, q(z.x * POS_SCALE), q(z.y * POS_SCALE), z.radius | 0, q(z.speed * 10),
+    Math.max(-128, Math.min(127, q(z.hp * 2)))],
+  bullets: (id, b) => [id, q(b.x * POS_SCALE), q(b.y * POS_SCALE), q(b.dx * VEL_SCALE), q(b.dy * VEL_SCALE)],
+};
+
+const dequantize = {
+  players: r => ({ x: r[1] / POS_SCALE, y: r[2] / POS_SCALE, angle: r[3] / ANGLE_SCALE, hp: r[4] }),
+  zombies: r => {
+    const z = { x: r[1] / POS_SCALE, y: r[2] / POS_SCALE, radius: r[3], speed: r[4] / 10, hp: r[5] / 2 };
+    if (r[0] < POSITION_ID_BASE) z.id = r[0];
+    return z;
+  },
+  bullets: r => {
+    const b = { x: r[1] / POS_SCALE, y: r[2] / POS_SCALE, dx: r[3] / VEL_SCALE, dy: r[4] / VEL_SCALE };
+    if (r[0] < POSITION_ID_BASE) b.id = r[0];
+    return b;
+  },
+};
+
+function sameTail(a, b) {
+  for (let i = 3; i < a.length; i++) {
+    if (a[i] !== b[i]) return false;
+  }
+  return true;
+}
+
+function encodeSection(name, current, base) {
+  const [size, write] = LAYOUTS[name];
+  const full = [];
+  const moved = [];
+  for (const [id, rec] of current) {
+    const old = base.get(id);
+    if (old) {
+      const dx = rec[1] - old[1];
+      const dy = rec[2] - old[2];
+      if (sameTail(old, rec)) {
+        if (dx === 0 && dy === 0) continue;
+        if (dx >= -32768 && dx < 32768 && dy >= -32768 && dy < 32768) {
+          moved.push([id, dx, dy]);
+          continue;
+        }
+      }
+    }
+    full.push(rec);
+  }
+  const removed = [];
+  for (const id of base.keys()) {
+    if (!current.has(id)) removed.push(id);
+  }
+  const buf = Buffer.alloc(6 + full.length * size + moved.length * MOVE_SIZE + removed.length * 4);
+  const view = new DataView(buf.buffer, buf.byteOffset, buf.length);
+  let o = 0;
+  view.setUint16(o, full.length, true); o += 2;
+  for (const rec of full) { write(view, o, rec); o += size; }
+  view.setUint16(o, moved.length, true); o += 2;
+  for (const [id, dx, dy] of moved) {
+    view.setUint32(o, id, true); view.setInt16(o + 4, dx, true); view.setInt16(o + 6, dy, true);
+    o += MOVE_SIZE;
+  }
+  view.setUint16(o, removed.length, true); o += 2;
+  for (const id of removed) { view.setUint32(o, id, true); o += 4; }
+  return buf;
+}
+
+function decodeSection(name, view, offset, base) {
+  const [size, , read] = LAYOUTS[name];
+  const records = new Map(base);
+  let count = view.getUint16(offset, true); offset += 2;
+  for (let i = 0; i < count; i++, offset += size) {
+    const rec = read(view, offset);
+    records.set(rec[0], rec);
+  }
+  count = view.getUint16(offset, true); offset += 2;
+  for (let i = 0; i < count; i++, offset += MOVE_SIZE) {
+    const id = view.getUint32(offset, true);
+    const old = records.get(id);
+    if (!old) continue;
+    const rec = old.slice();
+    rec[1] += view.getInt16(offset + 4, true);
+    rec[2] += view.getInt16(offset + 6, true);
+    records.set(id, rec);
+  }
+  count = view.getUint16(offset, true); offset += 2;
+  for (let i = 0; i < count; i++, offset += 4) {
+    records.delete(view.getUint32(offset, true));
+  }
+  return [records, offset];
+}
+
+function trim(history) {
+  while (history.size > HISTORY_SIZE) history.delete(history.keys().next().value);
+}
+
+class DeltaCodec {
+  constructor(keyframeInterval = KEYFRAME_INTERVAL) {
+    this.keyframeInterval = keyframeInterval;
+    this.tick = 0;
+    this.sent = new Map();
+    this.peerAck = 0;
+    this.lastKeyframe = 0;
+    this.received = new Map();
+    this.ack = 0;
+  }
+
+  encode(msgType, senderId, sections) {
+    this.tick += 1;
+    let base = null;
+    if (this.tick - this.lastKeyframe < this.keyframeInterval) base = this.sent.get(this.peerAck) || null;
+    const baseTick = base ? this.peerAck : 0;
+    if (!base) {
+      this.lastKeyframe = this.tick;
+      base = {};
+    }
+    const header = Buffer.alloc(HEADER_SIZE);
+    header.writeUInt8(msgType, 0);
+    header.writeUInt32LE(this.tick, 1);
+    header.writeUInt32LE(baseTick, 5);
+    header.writeUInt32LE(this.ack, 9);
+    header.writeUInt32LE(senderId >>> 0, 13);
+    const parts = [header];
+    for (const name of SECTIONS) parts.push(encodeSection(name, sections[name], base[name] || new Map()));
+    this.sent.set(this.tick, sections);
+    trim(this.sent);
+    return Buffer.concat(parts);
+  }
+
+  decode(buf) {
+    const view = new DataView(buf.buffer, buf.byteOffset, buf.length);
+    const msgType = view.getUint8(0);
+    const tick = view.getUint32(1, true);
+    const baseTick = view.getUint32(5, true);
+    const ack = view.getUint32(9, true);
+    const senderId = view.getUint32(13, true);
+    if (ack > this.peerAck) this.peerAck = ack;
+    let base = {};
+    if (baseTick) {
+      base = this.received.get(baseTick);
+      if (!base) return null;
+    }
+    let offset = HEADER_SIZE;
+    const sections = {};
+    for (const name of SECTIONS) {
+      [sections[name], offset] = decodeSection(name, view, offset, base[name] || new Map());
+    }
+    this.received.set(tick, sections);
+    trim(this.received);
+    if (tick > this.ack) this.ack = tick;
+    return { msgType, tick, ack, senderId, sections };
+  }
+}
+
+function toSections(players, zombies, bullets) {
+  const sections = { players: new Map(), zombies: new Map(), bullets: new Map() };
+  for (const [id, p] of players) sections.players.set(id, quantize.players(id, p));
+  zombies.forEach((z, i) => { const id = entityId(z, i); sections.zombies.set(id, quantize.zombies(id, z)); });
+  bullets.forEach((b, i) => { const id = entityId(b, i); sections.bullets.set(id, quantize.bullets(id, b)); });
+  return sections;
+}
+
+function encodeWorld(codec, ownId, world) {
+  const players = Object.entries(world.players).map(([id, p]) => [Number(id), p]);
+  return codec.encode(MSG_WORLD, ownId, toSections(players, world.zombies, world.bullets));
+}
+
+function decodeMessage(codec, buf) {
+  const decoded = codec.decode(buf);
+  if (!decoded) return null;
+  const { msgType, tick, ack, senderId, sections } = decoded;
+  const zombies = [...sections.zombies.values()].map(dequantize.zombies);
+  const bullets = [...sections.bullets.values()].map(dequantize.bullets);
+  if (msgType === MSG_WORLD) {
+    const players = {};
+    for (const [id, rec] of sections.players) players[id] = dequantize.players(rec);
+    return { type: 'world', id: senderId, tick, world: { players, zombies, bullets } };
+  }
+  const own = sections.players.get(0);
+  // ack: the newest world tick the client had, or the one its state was built from
+  return { type: 'state', tick, ack, player: own ? dequantize.players(own) : null, bullets, zombies };
+}
+
+module.exports = { PROTOCOL, MSG_WORLD, MSG_STATE, DeltaCodec, encodeWorld, decodeMessage };
@@ -0,0 +1,263 @@
+"""Compact binary, delta-encoded game state for the multiplayer protocol.
+
+Mirrors ``state-codec.js`` on the server. Peers that both offer the
+``zs-binary-1`` WebSocket subprotocol exchange binary frames laid out as::
+
+    header   <BIIII   message type, tick, base tick (0 = keyframe), ack, sender id
+    players  section
+    zombies  section
+    bullets  section
+    meta     <IiB     optional on world messages: wave, score, game over
+    ack      <I       optional after meta: the client's last input the server applied
+
+and every section is::
+
+    <H count, full records      new entities or ones that changed more than position
+    <H count, <Ihh move records id plus quantized x/y change since the base tick
+    <H count, <I removed ids    entities present in the base tick but gone now
+
+Only the Python server (game_server.py) sends the meta and ack trailers;
+server.js relays no scores or inputs, so state-codec.js neither writes nor
+reads them and ignores any bytes after the bullets section.
+
+Positions are quantized to 1/8 world unit. Each side delta-encodes against the
+newest tick the peer has acknowledged and sends a keyframe at least every
+``KEYFRAME_INTERVAL`` ticks or whenever that tick is no longer in its history.
+"""
+import math
+import struct
+from collections import OrderedDict
+
+PROTOCOL = "zs-binary-1"
+
+MSG_WORLD = 1
+MSG_STATE = 2
+
+POS_SCALE = 8
+VEL_SCALE = 256
+ANGLE_SCALE = 10000
+KEYFRAME_INTERVAL = 60
+HISTORY_SIZE = 64
+# entities sent without an id are keyed by their list position in this range
+POSITION_ID_BASE = 0x80000000
+
+HEADER = struct.Struct("<BIIII")
+COUNT = struct.Struct("<H")
+MOVE = struct.Struct("<Ihh")
+PLAYER = struct.Struct("<Iiihh")   # id, x, y, angle, hp
+ZOMBIE = struct.Struct("<IiiBBb")  # id, x, y, radius, speed * 10, hp * 2
+BULLET = struct.Struct("<Iiihh")   # id, x, y, dx, dy
+META = struct.Struct("<IiB")       # wave, score, game over
+ACK_SEQ = struct.Struct("<I")      # after META: the client's last input the server applied
+
+
+def _entity_id(item, index):
+    return int(item['id']) if 'id' in item else POSITION_ID_BASE + index
+
+
+def quantize_player(pid, p):
+    angle = math.remainder(p.get('angle', 0), 2 * math.pi)
+    return (pid, round(p['x'] * POS_SCALE), round(p['y'] * POS_SCALE),
+            round(angle * ANGLE_SCALE), max(-32768, min(32767, round(p.get('hp', 100)))))
+
+
+def quantize_zombie(eid, z):
+    return (eid, round(z['x'] * POS_SCALE), round(z['y'] * POS_SCALE),
+            int(z['radius']), round(z['speed'] * 10), max(-128, min(127, round(z['hp'] * 2))))
+
+
+def quantize_bullet(eid, b):
+    return (eid, round(b['x'] * POS_SCALE), round(b['y'] * POS_SCALE),
+            round(b['dx'] * VEL_SCALE), round(b['dy'] * VEL_SCALE))
+
+
+def player_dict(rec):
+    return {'x': rec[1] / POS_SCALE, 'y': rec[2] / POS_SCALE,
+            'angle': rec[3] / ANGLE_SCALE, 'hp': rec[4]}
+
+
+def zombie_dict(rec):
+    z = {'x': rec[1] / POS_SCALE, 'y': rec[2] / POS_SCALE, 'radius': rec[3],
+         'speed': rec[4] / 10, 'hp': rec[5] / 2}
+    if rec[0] < POSITION_ID_BASE:
+        z['id'] = rec[0]
+    return z
+
+
+def bullet_dict(rec):
+    b = {'x': rec[1] / POS_SCALE, 'y': rec[2] / POS_SCALE,
+         'dx': rec[3] / VEL_SCALE, 'dy': rec[4] / VEL_SCALE}
+    if rec[0] < POSITION_ID_BASE:
+        b['id'] = rec[0]
+    return b
+
+
+SECTIONS = (
+    ('players', PLAYER),
+    ('zombies', ZOMBIE),
+    ('bullets', BULLET),
+)
+
+
+def _encode_section(out, layout, current, base):
+    full = []
+    moved = []
+    for eid, rec in current.items():
+        old = base.get(eid)
+        if old == rec:
+            continue
+        if old is not None and old[3:] == rec[3:]:
+            dx = rec[1] - old[1]
+            dy = rec[2] - old[2]
+            if -32768 <= dx < 32768 and -32768 <= dy < 32768:
+                moved.append(MOVE.pack(eid, dx, dy))
+                continue
+        full.append(layout.pack(*rec))
+    removed = [eid for eid in base if eid not in current]
+    out.append(COUNT.pack(len(full)))
+    out.extend(full)
+    out.append(COUNT.pack(len(moved)))
+    out.extend(moved)
+    out.append(COUNT.pack(len(removed)))
+    out.append(struct.pack("<%dI" % len(removed), *removed))
+
+
+def _decode_section(data, offset, layout, base):
+    records = OrderedDict(base)
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    for rec in layout.iter_unpack(data[offset:offset + count * layout.size]):
+        records[rec[0]] = rec
+    offset += count * layout.size
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    for eid, dx, dy in MOVE.iter_unpack(data[offset:offset + count * MOVE.size]):
+        old = records.get(eid)
+        if old is None:
+            continue  # like state-codec.js: a move for an entity we never saw is dropped
+        records[eid] = (eid, old[1] + dx, old[2] + dy) + old[3:]
+    offset += count * MOVE.size
+    count, = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    for eid in struct.unpack_from("<%dI" % count, data, offset):
+        records.pop(eid, None)
+    offset += count * 4
+    return records, offset
+
+
+class DeltaCodec:
+    """One end of a binary connection.
+
+    Outgoing snapshots are delta-encoded against the newest of our ticks the
+    peer has acknowledged; incoming ones are rebuilt from the peer's ticks we
+    kept. ``ack`` is the newest peer tick we decoded and is sent back in every
+    message header.
+    """
+
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL, history_size=HISTORY_SIZE):
+        self.keyframe_interval = keyframe_interval
+        self.history_size = history_size
+        self.tick = 0
+        self.sent = OrderedDict()
+        self.peer_ack = 0
+        self.last_keyframe = 0
+        self.received = OrderedDict()
+        self.ack = 0
+
+    def encode(self, msg_type, sender_id, sections, trailer=b"", ack=None):
+        """Pack {section name: {id: record}} and an optional raw trailer into a binary message.
+
+        ``ack`` defaults to the newest tick received; an older one that is
+        still in the peer's history is just as valid a delta base.
+        """
+        self.tick += 1
+        base = None
+        if self.tick - self.last_keyframe < self.keyframe_interval:
+            base = self.sent.get(self.peer_ack)
+        base_tick = self.peer_ack if base is not None else 0
+        if base is None:
+            self.last_keyframe = self.tick
+            base = {}
+        out = [HEADER.pack(msg_type, self.tick, base_tick, self.ack if ack is None else ack, sender_id)]
+        for name, layout in SECTIONS:
+            _encode_section(out, layout, sections[name], base.get(name, {}))
+        out.append(trailer)
+        self.sent[self.tick] = sections
+        while len(self.sent) > self.history_size:
+            self.sent.popitem(last=False)
+        return b"".join(out)
+
+    def decode(self, data):
+        """Return (msg_type, tick, sender_id, sections, trailer), or None if the base tick is unknown."""
+        msg_type, tick, base_tick, ack, sender_id = HEADER.unpack_from(data)
+        if ack > self.peer_ack:
+            self.peer_ack = ack
+        if base_tick:
+            base = self.received.get(base_tick)
+            if base is None:
+                return None
+        else:
+            base = {}
+        offset = HEADER.size
+        sections = {}
+        for name, layout in SECTIONS:
+            sections[name], offset = _decode_section(data, offset, layout, base.get(name, {}))
+        self.received[tick] = sections
+        while len(self.received) > self.history_size:
+            self.received.popitem(last=False)
+        if tick > self.ack:
+            self.ack = tick
+        return msg_type, tick, sender_id, sections, bytes(data[offset:])
+
+
+def _sections(players, zombies, bullets):
+    return {
+        'players': OrderedDict((pid, quantize_player(pid, p)) for pid, p in players),
+        'zombies': OrderedDict((rec[0], rec) for rec in (
+            quantize_zombie(_entity_id(z, i), z) for i, z in enumerate(zombies))),
+        'bullets': OrderedDict((rec[0], rec) for rec in (
+            quantize_bullet(_entity_id(b, i), b) for i, b in enumerate(bullets))),
+    }
+
+
+def encode_world(codec, own_id, world, meta=None):
+    """Encode a server world snapshot for the client with id own_id.
+
+    ``meta`` is an optional dict with the room's ``wave``, ``score`` and
+    ``game_over``, which relay servers do not track, and optionally the
+    ``seq`` of the client's last input applied.
+    """
+    players = ((int(pid), p) for pid, p in world['players'].items())
+    trailer = b""
+    if meta is not None:
+        trailer = META.pack(meta['wave'], meta['score'], bool(meta['game_over']))
+        if 'seq' in meta:
+            trailer += ACK_SEQ.pack(meta['seq'])
+    return codec.encode(MSG_WORLD, own_id, _sections(players, world['zombies'], world['bullets']), trailer)
+
+
+def encode_state(codec, player, bullets, zombies, ack=None):
+    """Encode a client's own player, bullets and zombies; ``ack`` is the world tick they were built from."""
+    return codec.encode(MSG_STATE, 0, _sections([(0, player)], zombies, bullets), ack=ack)
+
+
+def decode_message(codec, data):
+    """Decode a binary message into the same dict shape as the JSON protocol."""
+    decoded = codec.decode(data)
+    if decoded is None:
+        return None
+    msg_type, tick, sender_id, sections, trailer = decoded
+    zombies = [zombie_dict(rec) for rec in sections['zombies'].values()]
+    bullets = [bullet_dict(rec) for rec in sections['bullets'].values()]
+    if msg_type == MSG_WORLD:
+        players = {str(pid): player_dict(rec) for pid, rec in sections['players'].items()}
+        msg = {'type': 'world', 'id': sender_id, 'tick': tick,
+               'world': {'players': players, 'zombies': zombies, 'bullets': bullets}}
+        if len(trailer) >= META.size:
+            wave, score, game_over = META.unpack_from(trailer)
+            msg.update(wave=wave, score=score, game_over=bool(game_over))
+        if len(trailer) >= META.size + ACK_SEQ.size:
+            msg['seq'], = ACK_SEQ.unpack_from(trailer, META.size)
+        return msg
+    player = player_dict(sections['players'][0]) if 0 in sections['players'] else None
+    return {'type': 'state', 'tick': tick, 'player': player, 'bullets': bullets, 'zombies': zombies}
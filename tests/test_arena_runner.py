@@ -0,0 +1,30 @@
+import json
+
+import arena_runner
+
+
+def test_batch_runs_arenas_on_shared_maps(tmp_path):
+    source = str(tmp_path / 'arena.json')
+    with open(source, 'w') as f:
+        json.dump({'playerStart': {'x': 2000, 'y': 2000},
+                   'rocks': [{'x': 2000 + 120 * i, 'y': 1700, 'hp': 3} for i in range(20)],
+                   'walls': [{'x': 1600, 'y': 1600, 'width': 40, 'height': 800}]}, f)
+    specs = arena_runner.make_specs(6, ['random', source], [1], [1000, 250], [250], seed=5, max_ticks=400)
+    # the same seed and settings twice must play the same game in any worker
+    specs.append(dict(specs[1], id=6))
+    seen = []
+    report = arena_runner.run_batch(specs, processes=2, on_result=seen.append)
+
+    assert sorted(r['id'] for r in seen) == list(range(7))
+    assert report.count == 7 and report.ticks == sum(r['ticks'] for r in seen)
+    assert len(report.groups) == 4
+    twins = [r for r in seen if r['id'] in (1, 6)]
+    assert twins[0]['score'] == twins[1]['score'] and twins[0]['ticks'] == twins[1]['ticks']
+    assert all(r['ticks'] == 400 or r['died'] for r in seen)
+    assert len(report.lines()) == 5
+
+
+def test_later_starting_wave_makes_a_harder_arena():
+    easy, hard = (arena_runner.run_arena({'seed': 2, 'wave': wave, 'max_ticks': 3000}) for wave in (1, 10))
+    assert not easy['died']
+    assert hard['died'] and hard['wave_reached'] >= 10
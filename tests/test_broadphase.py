@@ -0,0 +1,78 @@
+import math
+import random
+
+from zombie_survival import GRID_CELL_SIZE, ROCK_RADIUS, Obstacles, find_bullet_hits, find_bullet_hits_brute
+
+
+def random_entities(rng, count, spread):
+    enemies = [{'x': rng.random() * spread, 'y': rng.random() * spread,
+                'radius': rng.choice((20, 25, 35, 40))} for _ in range(count)]
+    bullets = [{'x': rng.random() * spread, 'y': rng.random() * spread} for _ in range(count)]
+    return enemies, bullets
+
+
+def test_broadphase_matches_brute_force():
+    rng = random.Random(7)
+    for spread in (50, 300, 2000):
+        for _ in range(20):
+            enemies, bullets = random_entities(rng, rng.randint(0, 120), spread)
+            assert find_bullet_hits(enemies, bullets) == find_bullet_hits_brute(enemies, bullets)
+
+
+def test_bullet_hits_at_most_one_zombie():
+    enemies = [{'x': 0, 'y': 0, 'radius': 25}, {'x': 10, 'y': 0, 'radius': 25}]
+    bullets = [{'x': 5, 'y': 0}]
+    assert find_bullet_hits(enemies, bullets) == [(0, 0)]
+
+
+def overlapping(items, x, y, radius, hits):
+    return {id(o) for o in items if hits(o, x, y, radius)}
+
+
+def rock_hits(r, x, y, radius):
+    return math.hypot(r['x'] - x, r['y'] - y) < ROCK_RADIUS + radius
+
+
+def wall_hits(w, x, y, radius):
+    return (x + radius > w['x'] and x - radius < w['x'] + w['width'] and
+            y + radius > w['y'] and y - radius < w['y'] + w['height'])
+
+
+def tree_hits(t, x, y, radius):
+    return math.hypot(t['x'] - x, t['y'] - y) < t['radius'] + radius
+
+
+def test_obstacle_grid_matches_linear_scan():
+    rng = random.Random(3)
+    # half of everything sits within an obstacle's size of a cell border
+    def coord():
+        if rng.random() < 0.5:
+            return rng.randrange(1, 8) * GRID_CELL_SIZE + rng.uniform(-60, 60)
+        return rng.uniform(0, 8 * GRID_CELL_SIZE)
+    rocks = [{'x': coord(), 'y': coord(), 'hp': 2} for _ in range(150)]
+    walls = [{'x': coord(), 'y': coord(), 'width': rng.choice((40, 700)), 'height': rng.choice((40, 700))}
+             for _ in range(60)]
+    trees = [{'x': coord(), 'y': coord(), 'radius': rng.choice((30, 60)), 'hp': 1} for _ in range(150)]
+    obstacles = Obstacles(rocks, walls, trees)
+
+    def check():
+        for _ in range(400):
+            x, y, radius = coord(), coord(), rng.choice((5, 25, 200))
+            for grid, items, hits, first in ((obstacles.rocks, rocks, rock_hits, obstacles.rock_at),
+                                             (obstacles.walls, walls, wall_hits, obstacles.wall_at),
+                                             (obstacles.trees, trees, tree_hits, obstacles.tree_at)):
+                expected = overlapping(items, x, y, radius, hits)
+                assert overlapping(grid.query(x, y, radius), x, y, radius, hits) == expected
+                found = first(x, y, radius)
+                assert (found is None) if not expected else id(found) in expected
+    check()
+
+    for r in rng.sample(rocks, 60):
+        assert not obstacles.damage(obstacles.rocks, r)
+        assert obstacles.damage(obstacles.rocks, r)
+        rocks.remove(r)
+    for t in rng.sample(trees, 60):
+        assert obstacles.damage(obstacles.trees, t)
+        trees.remove(t)
+    assert len(obstacles.rocks) == len(rocks) and len(obstacles.trees) == len(trees)
+    check()
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from entity_store import ArrayWorld, EntityArrays
+from zombie_survival import World
+
+
+def test_remove_mask_keeps_order_and_load_numbers_missing_ids():
+    ids = iter(range(100, 200))
+    store = EntityArrays(('id', 'x'))
+    store.load([{'x': float(i)} for i in range(5)] + [{'id': 7, 'x': 5.0}], lambda: next(ids))
+    assert store['id'].tolist() == [100, 101, 102, 103, 104, 7]
+    store.remove_mask(np.array([True, False, False, True, False, False]))
+    assert store['x'].tolist() == [1.0, 2.0, 4.0, 5.0]
+    assert len(store) == 4
+
+
+def test_array_world_entity_lists_write_through():
+    world = ArrayWorld(player_start={'x': 1000, 'y': 1000}, rng=random.Random(1))
+    world.enemies.append({'x': 1100.0, 'y': 1000.0, 'radius': 25, 'speed': 1, 'hp': 3})
+    world.enemies.append({'x': 1300.0, 'y': 1000.0, 'radius': 25, 'speed': 1, 'hp': 3})
+    world.enemies[0]['hp'] = 1
+    world.enemies[-1]['x'] += 50
+    assert [(e['hp'], e['x']) for e in world.enemies] == [(1.0, 1100.0), (3.0, 1350.0)]
+    first = world.enemies[0]
+    assert isinstance(first['id'], int) and dict(first) == world.enemy_store.to_dicts()[0]
+    world.enemies.remove(first)
+    assert [e['x'] for e in world.enemies] == [1350.0]
+    world.enemies = [dict(e) for e in world.enemies] + [{'x': 0.0, 'y': 0.0, 'radius': 25, 'speed': 1, 'hp': 1}]
+    assert len(world.enemies) == 2 and world.enemies[1]['id'] not in (0, world.enemies[0]['id'])
+
+
+def test_array_world_zombie_on_its_waypoint_heads_for_the_player():
+    world = ArrayWorld(player_start={'x': 1000, 'y': 1000}, rng=random.Random(1))
+    world.add_enemy({'x': 1500.0, 'y': 1000.0, 'radius': 25, 'speed': 2.0, 'hp': 1})
+    field = world.flow_field(world.player)
+    size = field.cell_size
+    field.waypoints[field._index(int(1500 // size), int(1000 // size))] = (1500.0, 1000.0)
+    world.update_enemies()
+    assert (world.enemies[0]['x'], world.enemies[0]['y']) == (1498.0, 1000.0)
+
+
+def test_array_world_matches_dict_world():
+    inputs = [{'fire': True, 'angle': (i * 0.01) % 6.28, 'right': i % 400 < 200} for i in range(3000)]
+    results = []
+    for cls in (World, ArrayWorld):
+        world = cls.from_map(None, rng=random.Random(3))
+        for step in inputs:
+            world.step(16, step)
+        results.append((world.score, world.wave, world.player['x'], world.player['hp'],
+                        [(e['id'], round(e['x'], 6), round(e['y'], 6)) for e in world.enemies],
+                        [(b['id'], round(b['x'], 6), round(b['y'], 6)) for b in world.bullets]))
+    assert results[0] == results[1]
+
+
+def test_array_world_backs_a_room():
+    from game_server import RoomWorld
+    ArrayRoomWorld = type('ArrayRoomWorld', (RoomWorld, ArrayWorld), {})
+    results = []
+    for cls in (RoomWorld, ArrayRoomWorld):
+        world = cls.from_map(None, rng=random.Random(5))
+        near = world.join(1)
+        far = world.join(2)
+        far.player['x'] += 900
+        for tick in range(1000):
+            near.inputs = {'fire': True, 'angle': tick * 0.02}
+            far.inputs = {'fire': tick % 3 == 0, 'angle': -tick * 0.01, 'left': tick % 500 < 100}
+            world.step(16)
+        results.append((world.score, world.wave, near.player['hp'], far.player['hp'], far.player['x'],
+                        [(e['id'], round(e['x'], 6), round(e['y'], 6)) for e in world.enemies]))
+    assert results[0] == results[1]
+    # both players were chased and hurt, not just the world's own
+    assert results[0][2] < 100 and results[0][3] < 100
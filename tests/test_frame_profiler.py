@@ -0,0 +1,81 @@
+import json
+import random
+
+from pytest import approx
+
+from frame_profiler import FrameProfiler, RollingHistogram
+from zombie_survival import World
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, ms):
+        self.now += ms / 1000
+
+
+def test_histogram_percentiles_roll_over_window():
+    hist = RollingHistogram(100)
+    for value in range(200):
+        hist.add(value)
+    assert len(hist) == 100
+    assert hist.percentiles() == (150, 195, 199)
+    assert RollingHistogram().percentiles() == (0, 0, 0)
+
+
+def test_phases_counts_and_watched_methods(tmp_path):
+    clock = FakeClock()
+    prof = FrameProfiler(record=True, clock=clock)
+    world = World(rng=random.Random(1))
+    original = world.update_bullets
+
+    def update_bullets():
+        clock.advance(2)
+        original()
+    world.update_bullets = update_bullets
+    prof.watch(world, 'update_bullets', 'simulate.bullets')
+    prof.enable()
+    for _ in range(3):
+        prof.start_frame()
+        clock.advance(1)
+        prof.lap('input')
+        world.step(16)
+        clock.advance(3)
+        prof.lap('simulate')
+        prof.count('zombies', len(world.enemies))
+    prof.start_frame()
+
+    assert len(prof.frames) == 3
+    frame = prof.frames[0]
+    assert frame['total'] == approx(6)
+    assert frame['phases'] == approx({'input': 1, 'simulate.bullets': 2, 'simulate': 5})
+    assert prof.summary()['frame'] == approx((6, 6, 6))
+
+    prof.dump(str(tmp_path / 'trace.json'), 'chrome')
+    events = json.load(open(tmp_path / 'trace.json'))['traceEvents']
+    assert [e['name'] for e in events[:4]] == ['frame', 'input', 'simulate.bullets', 'simulate']
+    assert (events[2]['ts'], events[2]['dur']) == approx((1000, 2000))
+    assert events[4] == {'name': 'entities', 'ph': 'C', 'pid': 1, 'ts': 0, 'args': {'zombies': 0}}
+    prof.dump(str(tmp_path / 'frames.json'))
+    assert json.load(open(tmp_path / 'frames.json'))['summary']['input']['p99'] == approx(1)
+
+
+def test_disabled_profiler_records_nothing_and_unwraps():
+    clock = FakeClock()
+    prof = FrameProfiler(record=True, clock=clock)
+    world = World(rng=random.Random(1))
+    prof.watch(world, 'update_enemies', 'simulate.enemies')
+    assert 'update_enemies' not in vars(world)
+    prof.enable()
+    assert 'update_enemies' in vars(world)
+    prof.disable()
+    assert 'update_enemies' not in vars(world)
+    for _ in range(3):
+        prof.start_frame()
+        prof.lap('input')
+        prof.count('zombies', 1)
+    assert prof.frames == [] and prof.histograms == {}
@@ -0,0 +1,17 @@
+from benchmarks import game_bench
+
+
+def test_scenarios_are_deterministic():
+    first = game_bench.run_scenario('horde100', ticks=30)
+    second = game_bench.run_scenario('horde100', ticks=30)
+    assert first['state'] == second['state']
+    assert first['bullets'] > 100 and first['zombies'] > 50
+
+
+def test_compare_scales_baseline_by_calibration():
+    baseline = {'calibration': 1.0, 'scenarios': {'empty': {'ticks_per_sec': 1000, 'p95_ms': 2.0}}}
+    result = {'scenario': 'empty', 'ticks_per_sec': 500, 'p95_ms': 4.0}
+    # twice as slow on a machine that calibrates twice as slow is fine
+    assert game_bench.compare([result], baseline, 2.0) == []
+    failures = game_bench.compare([result], baseline, 1.0)
+    assert len(failures) == 2 and failures[0].startswith('empty: 500 ticks/s')
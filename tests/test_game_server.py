@@ -0,0 +1,172 @@
+import asyncio
+import random
+import socket
+import struct
+import threading
+import time
+
+import pytest
+
+from game_server import GameServer, RoomWorld
+from zombie_survival import OP_CLOSE, WebSocketClient, World, parse_frame
+
+
+@pytest.fixture
+def running_server():
+    loop = asyncio.new_event_loop()
+    game = GameServer(tick_rate=60, snapshot_rate=30, seed=1)
+    server = loop.run_until_complete(game.serve("127.0.0.1", 0))
+    port = server.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield game, loop, port
+
+    async def shutdown():
+        server.close()
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel()
+
+    asyncio.run_coroutine_threadsafe(shutdown(), loop).result(1.0)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(1.0)
+
+
+@pytest.fixture
+def server_port(running_server):
+    return running_server[2]
+
+
+def wait_for(client, predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for msg in client.recv_all():
+            if msg.get('type') == 'world' and predicate(msg):
+                return msg
+        time.sleep(0.01)
+    raise AssertionError("no matching snapshot")
+
+
+@pytest.mark.parametrize('binary', [True, False])
+def test_server_moves_player_from_inputs(server_port, binary):
+    client = WebSocketClient("127.0.0.1", server_port, binary=binary, path="/moves")
+    client.connect()
+    try:
+        first = wait_for(client, lambda m: True)
+        pid = str(first['id'])
+        start_x = first['world']['players'][pid]['x']
+        client.send({'type': 'input', 'seq': 1, 'right': True, 'angle': 0})
+        moved = wait_for(client, lambda m: m['world']['players'][pid]['x'] > start_x + 20)
+        assert moved['wave'] == 1 and moved['game_over'] is False
+    finally:
+        client.close()
+
+
+def test_rooms_are_isolated(server_port):
+    a = WebSocketClient("127.0.0.1", server_port, path="/a")
+    b = WebSocketClient("127.0.0.1", server_port, path="/b")
+    c = WebSocketClient("127.0.0.1", server_port, path="/a")
+    for client in (a, b, c):
+        client.connect()
+    try:
+        ids = {str(client.id or wait_for(client, lambda m: True)['id']) for client in (a, b, c)}
+        assert len(ids) == 3
+        room_a = wait_for(a, lambda m: len(m['world']['players']) == 2)
+        room_b = wait_for(b, lambda m: True)
+        assert len(room_b['world']['players']) == 1
+        assert not set(room_a['world']['players']) & set(room_b['world']['players'])
+    finally:
+        for client in (a, b, c):
+            client.close()
+
+
+def test_zombies_chase_nearest_living_player():
+    world = RoomWorld(rng=random.Random(3))
+    near = world.join(1).player
+    far = world.join(2).player
+    far['x'] += 1000
+    world.enemies = [{'id': 1, 'x': near['x'] + 300, 'y': near['y'], 'radius': 15, 'speed': 1, 'hp': 3}]
+    world.step(16)
+    assert world.enemies[0]['x'] < near['x'] + 300
+    near['hp'] = 0
+    world.step(16)
+    assert world.enemies[0]['x'] > near['x'] + 299
+    assert not world.game_over
+
+
+def positions(grid, x, y):
+    return sorted((o['x'], o['y'], o.get('hp')) for o in grid.query(x, y, 3000))
+
+
+def client_world(welcome):
+    world = World.from_map(welcome['map'], endless=welcome['endless'], seed=welcome['seed'])
+    world.obstacles.apply_changes(welcome['obstacles'])
+    return world
+
+
+def test_clients_build_the_room_terrain_and_follow_its_damage(running_server):
+    game, loop, port = running_server
+    first = WebSocketClient("127.0.0.1", port, path="/terrain")
+    first.connect()
+    second = WebSocketClient("127.0.0.1", port, binary=False, path="/terrain")
+    try:
+        local = client_world(first.wait_for('room'))
+        obstacles = game.rooms['terrain'].world.obstacles
+        x, y = local.player['x'], local.player['y']
+        for layer in ('rocks', 'walls', 'trees'):
+            assert positions(getattr(local.obstacles, layer), x, y) == positions(getattr(obstacles, layer), x, y)
+
+        rock = min(obstacles.rocks.query(x, y, 3000), key=lambda r: (r['x'] - x) ** 2 + (r['y'] - y) ** 2)
+        tree = min(obstacles.trees.query(x, y, 3000), key=lambda t: (t['x'] - x) ** 2 + (t['y'] - y) ** 2)
+
+        async def damage():
+            obstacles.damage(obstacles.rocks, rock)
+            obstacles.set_hp(obstacles.trees, tree, 0)
+        asyncio.run_coroutine_threadsafe(damage(), loop).result(1.0)
+        deadline = time.monotonic() + 2
+        while positions(local.obstacles.trees, x, y) != positions(obstacles.trees, x, y):
+            assert time.monotonic() < deadline, "no obstacle changes"
+            for msg in first.recv_all():
+                if msg.get('type') == 'obstacles':
+                    local.obstacles.apply_changes(msg['changes'])
+            time.sleep(0.01)
+        assert positions(local.obstacles.rocks, x, y) == positions(obstacles.rocks, x, y)
+
+        # a late joiner gets the damage so far with the seed
+        second.connect()
+        late = client_world(second.wait_for('room'))
+        assert positions(late.obstacles.rocks, x, y) == positions(obstacles.rocks, x, y)
+        assert positions(late.obstacles.trees, x, y) == positions(obstacles.trees, x, y)
+    finally:
+        first.close()
+        second.close()
+
+
+def test_oversized_frame_is_refused_with_1009(server_port):
+    client = WebSocketClient("127.0.0.1", server_port, binary=False, path="/big")
+    client.connect()
+    sock = client.sock
+    try:
+        sock.setblocking(True)
+        sock.settimeout(2.0)
+        # a masked text frame claiming 2**63 bytes; nothing after the header is ever sent
+        sock.sendall(bytes([0x81, 0xFF]) + struct.pack(">Q", 1 << 63) + b"mask")
+        buf = bytearray()
+        closed = False
+        deadline = time.monotonic() + 2.0
+        while not closed and time.monotonic() < deadline:
+            try:
+                data = sock.recv(65536)
+            except socket.timeout:
+                break
+            closed = not data
+            buf += data
+        frames = []
+        frame = parse_frame(buf)
+        while frame is not None:
+            frames.append(frame)
+            frame = parse_frame(buf, frame[3])
+        assert closed
+        assert frames[-1][1] == OP_CLOSE and struct.unpack(">H", frames[-1][2][:2])[0] == 1009
+    finally:
+        client.close()
@@ -0,0 +1,60 @@
+import json
+import math
+import os
+import random
+
+import map_compiler
+from zombie_survival import World, load_map
+
+
+def write_map(path, seed=5, count=400):
+    rng = random.Random(seed)
+    data = {
+        'playerStart': {'x': 2000, 'y': 2000},
+        'rocks': [{'x': rng.uniform(0, 4000), 'y': rng.uniform(0, 4000), 'hp': 3} for _ in range(count)],
+        'walls': [{'x': rng.uniform(0, 4000), 'y': rng.uniform(0, 4000), 'width': 200, 'height': 40}
+                  for _ in range(count // 4)],
+        'trees': [{'x': rng.uniform(0, 4000), 'y': rng.uniform(0, 4000), 'radius': 240, 'hp': 2}
+                  for _ in range(count // 4)],
+    }
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def run(world, steps=1500):
+    for n in range(steps):
+        world.step(16, {'fire': True, 'angle': n * 0.01, 'up': n % 400 < 200, 'left': n % 300 < 150})
+    return (world.player, world.enemies, world.score,
+            sorted((r['x'], r['y'], r['hp']) for r in world.obstacles.rocks),
+            sorted((t['x'], t['y'], t['hp']) for t in world.obstacles.trees))
+
+
+def test_compiled_map_plays_like_json(tmp_path):
+    source = str(tmp_path / 'map.json')
+    write_map(source)
+    expected = run(World.from_map(source, rng=random.Random(2)))
+
+    map_compiler.compile_map(source)
+    rocks, walls, trees, start = load_map(source)
+    assert isinstance(rocks, map_compiler.MapLayer)
+    assert start == {'x': 2000, 'y': 2000} and len(walls) == 100
+    world = World(rocks, walls, trees, start, random.Random(2))
+    # only the cells near the player are ever turned into dicts
+    assert len(world.obstacles.rocks.by_index) < len(rocks)
+    assert run(world) == expected
+    assert any(hp < 3 for _, _, hp in expected[3]) and len(expected[3]) < 400
+
+
+def test_stale_compiled_map_falls_back_to_json(tmp_path):
+    source = str(tmp_path / 'map.json')
+    write_map(source)
+    map_compiler.compile_map(source)
+    assert map_compiler.is_fresh(source)
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert map_compiler.is_fresh(source)  # touched but unchanged
+
+    write_map(source, seed=6)
+    assert not map_compiler.is_fresh(source)
+    rocks = load_map(source)[0]
+    assert isinstance(rocks, list) and math.isclose(rocks[0]['x'], json.load(open(source))['rocks'][0]['x'])
@@ -0,0 +1,109 @@
+import json
+import socket
+import time
+
+from zombie_survival import OP_TEXT, NetworkThread, WebSocketClient, encode_frame, parse_frame
+
+
+def connected_thread(send_rate, **kwargs):
+    client = WebSocketClient(binary=False)
+    client.sock, server = socket.socketpair()
+    client.sock.setblocking(False)
+    server.settimeout(1.0)
+    return NetworkThread(client, send_rate, **kwargs).start(), server
+
+
+def read_messages(server, duration):
+    buf = bytearray()
+    server.settimeout(0.05)
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        try:
+            buf += server.recv(65536)
+        except socket.timeout:
+            pass
+    messages = []
+    pos = 0
+    while True:
+        frame = parse_frame(buf, pos)
+        if frame is None:
+            return messages
+        messages.append(json.loads(frame[2]))
+        pos = frame[3]
+
+
+def test_submitted_states_are_coalesced_and_rate_limited():
+    net, server = connected_thread(send_rate=10)
+    try:
+        start = time.monotonic()
+        while time.monotonic() - start < 0.5:
+            net.submit({'type': 'state', 'n': time.monotonic()})
+            time.sleep(0.002)
+        messages = read_messages(server, 0.2)
+    finally:
+        net.stop()
+    assert 3 <= len(messages) <= 7
+    assert all(a['n'] < b['n'] for a, b in zip(messages, messages[1:]))
+
+
+def test_latest_returns_newest_snapshot_once():
+    net, server = connected_thread(send_rate=20)
+    try:
+        server.sendall(b''.join(encode_frame(json.dumps({'type': 'world', 'n': n}).encode())
+                                for n in range(5)))
+        deadline = time.monotonic() + 1.0
+        snapshot = None
+        while snapshot is None and time.monotonic() < deadline:
+            snapshot = net.latest()
+            time.sleep(0.01)
+        assert snapshot == {'type': 'world', 'n': 4}
+        assert net.latest() is None
+    finally:
+        net.stop()
+
+
+def test_full_inbox_drops_the_oldest_messages():
+    net, server = connected_thread(send_rate=20, inbox_size=3)
+    try:
+        server.sendall(b''.join(encode_frame(json.dumps({'type': 'obstacles', 'n': n}).encode())
+                                for n in range(10)))
+        deadline = time.monotonic() + 1.0
+        while len(net.inbox) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        assert [m['n'] for m in net.received()] == [7, 8, 9]
+        assert net.received() == []
+    finally:
+        net.stop()
+
+
+def test_recv_returns_the_newest_snapshot_and_keeps_other_messages():
+    client = WebSocketClient(binary=False)
+    client.sock, server = socket.socketpair()
+    client.sock.setblocking(False)
+    try:
+        server.sendall(b''.join(encode_frame(json.dumps(msg).encode()) for msg in (
+            {'type': 'room', 'id': 1}, {'type': 'world', 'n': 1},
+            {'type': 'obstacles', 'changes': []}, {'type': 'world', 'n': 2})))
+        time.sleep(0.05)
+        assert client.recv() == {'type': 'world', 'n': 2}
+        assert client.recv()['type'] == 'room'
+        assert client.recv()['type'] == 'obstacles'
+        assert client.recv() is None
+    finally:
+        client.close()
+        server.close()
+
+
+def test_recv_messages_returns_every_frame_undecoded():
+    client = WebSocketClient(binary=False)
+    client.sock, server = socket.socketpair()
+    client.sock.setblocking(False)
+    try:
+        server.sendall(encode_frame(b'{"type": "world", "n": 1}') + encode_frame(b'not json'))
+        time.sleep(0.05)
+        assert client.recv_messages() == [(OP_TEXT, b'{"type": "world", "n": 1}'), (OP_TEXT, b'not json')]
+        assert client.recv_messages() == []
+    finally:
+        client.close()
+        server.close()
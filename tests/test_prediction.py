@@ -0,0 +1,117 @@
+import json
+import random
+from collections import deque
+from types import SimpleNamespace
+
+from game_server import MAX_QUEUED_COMMANDS, Room, RoomWorld, Seat
+from prediction import INTERP_DELAY, Interpolation, Prediction
+from state_codec import DeltaCodec, decode_message, encode_world
+from zombie_survival import ROCK_RADIUS, TICK_MS, World, WORLD_HEIGHT, WORLD_WIDTH
+
+LATENCY = 8  # ticks each way, about 133 ms at 60 ticks/s
+SEND_EVERY = 3
+SNAPSHOT_EVERY = 3
+
+
+def walls():
+    cx, cy = WORLD_WIDTH // 2, WORLD_HEIGHT // 2
+    return [{'x': cx + 60, 'y': cy - 300, 'width': 40, 'height': 400}]
+
+
+def inputs_for(tick):
+    # walk into the wall, then along it and back
+    return {'right': tick < 90, 'up': 60 <= tick < 150, 'left': tick >= 150, 'angle': tick * 0.01}
+
+
+def play(server, seat, client_world, inputs, ticks=240):
+    """Run a predicting client against the server over a slow link; return the prediction and its errors."""
+    prediction = Prediction(client_world)
+    client = SimpleNamespace(id=None)
+    to_server = deque()
+    to_client = deque()
+    errors = []
+    for tick in range(ticks):
+        prediction.step(inputs(tick))
+        if tick % SEND_EVERY == 0:
+            to_server.append((tick + LATENCY, prediction.message()))
+        while to_server and to_server[0][0] <= tick:
+            seat.queue(to_server.popleft()[1]['commands'])
+        server.step(TICK_MS)
+        if tick % SNAPSHOT_EVERY == 0:
+            to_client.append((tick + LATENCY, {
+                'type': 'world', 'id': 1, 'seq': seat.input_seq,
+                'world': {'players': {'1': dict(seat.player)}, 'zombies': [], 'bullets': []}}))
+        while to_client and to_client[0][0] <= tick:
+            prediction.apply_snapshot(client, to_client.popleft()[1])
+            errors.append(prediction.error)
+    return prediction, errors
+
+
+def test_prediction_matches_the_server_at_high_latency():
+    server = RoomWorld(walls=walls(), rng=random.Random(1))
+    seat = server.join(1)
+    client_world = World(walls=walls(), rng=random.Random(2))
+    prediction, errors = play(server, seat, client_world, inputs_for)
+    assert errors and max(errors) < 1e-9
+    assert len(prediction.pending) <= 2 * LATENCY + SEND_EVERY + SNAPSHOT_EVERY
+    # the wall stopped both of them at the same spot
+    assert seat.player['x'] < WORLD_WIDTH // 2 + 60
+
+
+def test_seat_queues_commands_once_and_caps_the_backlog():
+    seat = Seat({'x': 0, 'y': 0})
+    seat.queue([[1, 8, 0.5], [2, 0, 0.5]])
+    seat.queue([[2, 0, 0.5], [3, 1, 0.0]])
+    assert [seq for seq, _ in seat.commands] == [1, 2, 3]
+    assert seat.next_input()['right'] and seat.input_seq == 1
+    seat.next_input()
+    assert seat.next_input()['up'] and seat.input_seq == 3
+    # starved of commands the player stands still rather than repeating the last one
+    assert seat.next_input() == {'angle': 0.0}
+    seat.queue([[n, 0, 0.0] for n in range(4, 100)])
+    assert len(seat.commands) == MAX_QUEUED_COMMANDS
+
+
+def test_binary_snapshots_carry_the_acknowledged_input():
+    server, client = DeltaCodec(), DeltaCodec()
+    world = {'players': {'1': {'x': 1.0, 'y': 2.0, 'angle': 0, 'hp': 100}}, 'zombies': [], 'bullets': []}
+    meta = {'wave': 2, 'score': 5, 'game_over': False, 'seq': 77}
+    assert decode_message(client, encode_world(server, 1, world, meta))['seq'] == 77
+
+
+def test_interpolation_blends_snapshots_in_the_past():
+    interp = Interpolation()
+    interp.add(0, {'2': {'x': 0.0, 'y': 0.0}}, [{'id': 1, 'x': 0.0, 'y': 0.0}], [])
+    interp.add(50, {'2': {'x': 20.0, 'y': 0.0}}, [{'id': 1, 'x': 10.0, 'y': 0.0}, {'id': 2, 'x': 7.0, 'y': 1.0}],
+               [{'id': 9, 'x': 4.0, 'y': 4.0}])
+    players, zombies, bullets = interp.sample(INTERP_DELAY + 25)
+    assert players['2']['x'] == 10.0
+    assert [(z['id'], z['x']) for z in zombies] == [(1, 5.0), (2, 7.0)]
+    assert bullets == [{'id': 9, 'x': 4.0, 'y': 4.0}]
+    assert interp.sample(INTERP_DELAY + 500)[0]['2']['x'] == 20.0
+
+    # slow snapshots push the delay out so there is still a pair to blend between
+    for n in range(2, 40):
+        interp.add(n * 400, {}, [], [])
+    assert interp.delay() > 400
+
+
+def test_prediction_uses_the_room_terrain_on_a_random_map():
+    room = Room('random', RoomWorld.from_map(rng=random.Random(1), seed=99))
+    sent = []
+    room.join(SimpleNamespace(id=1, send=lambda payload, opcode, reliable=False: sent.append(payload)))
+    welcome = json.loads(sent[0])
+    assert welcome['type'] == 'room' and welcome['seed'] == 99
+    client_world = World.from_map(welcome['map'], rng=random.Random(2), endless=welcome['endless'],
+                                  seed=welcome['seed'])
+
+    # start both players just left of the rock nearest the start and walk into it
+    seat = room.world.seats[1]
+    x, y = seat.player['x'], seat.player['y']
+    rock = min(room.world.obstacles.rocks.query(x, y, 3000),
+               key=lambda r: (r['x'] - x) ** 2 + (r['y'] - y) ** 2)
+    for player in (seat.player, client_world.player):
+        player.update(x=rock['x'] - ROCK_RADIUS - 80, y=rock['y'])
+    _, errors = play(room.world, seat, client_world, lambda tick: {'right': True, 'angle': 0.0}, ticks=120)
+    assert errors and max(errors) < 1e-9
+    assert seat.player['x'] < rock['x'] - ROCK_RADIUS
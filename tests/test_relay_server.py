@@ -0,0 +1,100 @@
+import shutil
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.swarm_bench import free_port, start_server
+from zombie_survival import WebSocketClient, state_message
+
+pytestmark = pytest.mark.skipif(shutil.which('node') is None, reason="needs node to run server.js")
+
+
+@pytest.fixture
+def port():
+    port = free_port()
+    server = start_server(port)
+    yield port
+    server.kill()
+    server.wait()
+
+
+def next_world(client, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        worlds = [m for m in client.recv_all() if m.get('type') == 'world']
+        if worlds:
+            client.id = worlds[-1]['id']
+            client.tick = worlds[-1]['tick']
+            return worlds[-1]['world']
+        time.sleep(0.01)
+    raise AssertionError("no world snapshot from server.js")
+
+
+def send_state(client, x, y, zombies, ack=None):
+    client.send(state_message(SimpleNamespace(player={'x': x, 'y': y, 'angle': 0, 'hp': 100},
+                                              bullets=[], enemies=zombies), ack))
+
+
+def zombie(eid, x, y):
+    return {'id': eid, 'x': x, 'y': y, 'radius': 25, 'speed': 1.0, 'hp': 1}
+
+
+def test_distant_clients_keep_each_others_zombies(port):
+    near, far = WebSocketClient(port=port, binary=False), WebSocketClient(port=port, binary=True)
+    near.connect()
+    far.connect()
+    try:
+        next_world(near)
+        next_world(far)
+        # far outside each other's area of interest, each sends only what it sees
+        send_state(near, 100, 100, [zombie(near.id << 20 | 1, 150, 100)])
+        send_state(far, 8000, 8000, [zombie(far.id << 20 | 1, 8050, 8000)])
+        for _ in range(5):
+            send_state(far, 8000, 8000, [zombie(far.id << 20 | 1, 8050, 8000)])
+            next_world(far)
+        assert [z['id'] for z in next_world(near)['zombies']] == [near.id << 20 | 1]
+        for _ in range(5):
+            send_state(near, 100, 100, [zombie(near.id << 20 | 1, 150, 100)])
+            next_world(near)
+        assert [z['id'] for z in next_world(far)['zombies']] == [far.id << 20 | 1]
+
+        # killing a zombie it was shown removes it
+        send_state(near, 100, 100, [])
+        deadline = time.monotonic() + 3
+        while next_world(near)['zombies']:
+            assert time.monotonic() < deadline
+        assert [z['id'] for z in next_world(far)['zombies']] == [far.id << 20 | 1]
+    finally:
+        near.close()
+        far.close()
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_zombies_entering_view_after_the_acknowledged_snapshot_survive(port, binary):
+    near, far = WebSocketClient(port=port, binary=binary), WebSocketClient(port=port, binary=False)
+    near.connect()
+    far.connect()
+    try:
+        next_world(far)
+        send_state(near, 100, 100, [])
+        next_world(near)
+        stale = near.tick
+        # a zombie walks into view; the next snapshot shows it, but our state is still built from the older one
+        eid = far.id << 20 | 1
+        send_state(far, 8000, 8000, [zombie(eid, 150, 100)])
+        deadline = time.monotonic() + 3
+        while not next_world(near)['zombies']:
+            assert time.monotonic() < deadline
+        shown = near.tick
+        send_state(near, 100, 100, [], ack=stale)
+        for _ in range(4):
+            assert [z['id'] for z in next_world(near)['zombies']] == [eid]
+
+        # a state built from a snapshot that showed it may still remove it
+        send_state(near, 100, 100, [], ack=shown)
+        while next_world(near)['zombies']:
+            assert time.monotonic() < deadline + 3
+    finally:
+        near.close()
+        far.close()
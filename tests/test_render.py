@@ -0,0 +1,95 @@
+import os
+import random
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+pygame = pytest.importorskip("pygame")
+
+from zombie_survival import Renderer, World, SCREEN_WIDTH, SCREEN_HEIGHT, TEXT_CACHE_SIZE
+
+
+@pytest.fixture
+def screen():
+    pygame.init()
+    yield pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.quit()
+
+
+def test_terrain_chunks_are_reused_and_invalidated(screen):
+    rock = {'x': 1200, 'y': 1000, 'hp': 1}
+    world = World(rocks=[rock], player_start={'x': 1000, 'y': 1000}, rng=random.Random(1))
+    renderer = Renderer(screen, world)
+    renderer.draw()
+    chunks = dict(renderer.terrain.chunks)
+    renderer.draw()
+    assert renderer.terrain.chunks == chunks
+
+    world.obstacles.damage(world.obstacles.rocks, rock)
+    assert (1200 // renderer.terrain.chunk_size, 1000 // renderer.terrain.chunk_size) not in renderer.terrain.chunks
+    renderer.draw()
+    assert screen.get_at((SCREEN_WIDTH // 2 + 200, SCREEN_HEIGHT // 2))[:3] == (34, 165, 47)
+
+
+def array_world():
+    pytest.importorskip("numpy")
+    from entity_store import ArrayWorld
+    return ArrayWorld
+
+
+@pytest.mark.parametrize('world_cls', [lambda: World, array_world], ids=['dicts', 'arrays'])
+def test_draw_interpolates_between_ticks(screen, world_cls):
+    world = world_cls()(player_start={'x': 1000, 'y': 1000}, rng=random.Random(1))
+    world.add_enemy({'x': 1100, 'y': 1000, 'radius': 25, 'speed': 0, 'hp': 1})
+    # one that only appears after remember() is drawn where it is
+    late = {'x': 1000, 'y': 1150, 'radius': 25, 'speed': 0, 'hp': 1}
+    renderer = Renderer(screen, world)
+    renderer.remember()
+    world.enemies[0]['x'] = 1200
+    world.add_enemy(late)
+    renderer.draw(alpha=0.5)
+    # halfway between the zombie's last two positions
+    assert screen.get_at((SCREEN_WIDTH // 2 + 150, SCREEN_HEIGHT // 2))[:3] == (0, 255, 0)
+    assert screen.get_at((SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 150))[:3] == (0, 255, 0)
+    renderer.draw(alpha=1.0)
+    assert screen.get_at((SCREEN_WIDTH // 2 + 150, SCREEN_HEIGHT // 2))[:3] != (0, 255, 0)
+
+
+def test_profiled_draw_times_each_layer(screen):
+    from frame_profiler import FrameProfiler
+    world = World(player_start={'x': 1000, 'y': 1000}, rng=random.Random(1))
+    prof = FrameProfiler(record=True)
+    prof.enable()
+    renderer = Renderer(screen, world, prof)
+    renderer.show_profile = True
+    for _ in range(2):
+        prof.start_frame()
+        renderer.draw()
+    phases = prof.frames[0]['phases']
+    assert set(phases) == {'render.terrain', 'render.bullets', 'render.players', 'render.zombies',
+                           'render.hud', 'render.overlay'}
+    assert prof.frames[0]['counts'] == {'bullets': 0, 'zombies': 0, 'drawn': 0, 'players': 0}
+
+
+def test_hud_text_is_rendered_once_and_kept_while_in_use(screen, monkeypatch):
+    world = World(player_start={'x': 1000, 'y': 1000}, rng=random.Random(1))
+    renderer = Renderer(screen, world)
+    renderer.draw()
+    wave = renderer.assets.text(f"Wave: {world.wave}")
+    rendered = []
+
+    class CountingFont:
+        def __init__(self, font):
+            self.font = font
+
+        def render(self, value, *args):
+            rendered.append(value)
+            return self.font.render(value, *args)
+    monkeypatch.setattr(renderer.assets, 'font', CountingFont(renderer.assets.font))
+    for score in range(TEXT_CACHE_SIZE * 2):
+        world.score = score
+        renderer.draw()
+    # only the changing score was rendered again; the wave label survived every eviction
+    assert rendered == [f"Score: {score}" for score in range(1, TEXT_CACHE_SIZE * 2)]
+    assert renderer.assets.text(f"Wave: {world.wave}") is wave
+    assert len(renderer.assets.texts) == TEXT_CACHE_SIZE
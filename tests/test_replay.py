@@ -0,0 +1,71 @@
+import json
+import math
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from replay import FLUSH_TICKS, Recorder, Recording, Replayer, state_hash
+from zombie_survival import World, TICK_MS, apply_snapshot
+
+
+def write_map(path):
+    with open(path, 'w') as f:
+        json.dump({'playerStart': {'x': 3000, 'y': 3000},
+                   'rocks': [{'x': 3000 + 100 * i, 'y': 2700, 'hp': 2} for i in range(10)]}, f)
+
+
+def record(path, map_path=None, ticks=600, close=True):
+    seed = 77
+    world = World.from_map(map_path, rng=random.Random(seed))
+    recorder = Recorder(path, seed, TICK_MS, map_path)
+    client = SimpleNamespace(id=None)
+    for n in range(ticks):
+        if n == 100:
+            msg = {'type': 'world', 'id': 3, 'world': {'players': {}, 'bullets': [], 'zombies': [
+                {'id': 9, 'x': world.player['x'] + 200, 'y': world.player['y'], 'radius': 25,
+                 'speed': 1.0, 'hp': 1}]}}
+            recorder.snapshot(msg)
+            apply_snapshot(world, client, msg)
+        if n == 400:
+            recorder.restart()
+            world.restart()
+        recorder.step(world, TICK_MS, {'fire': True, 'angle': math.sin(n / 50) * 3.1,
+                                       'up': n % 200 < 100, 'left': n % 150 < 60})
+    if close:
+        recorder.close()
+    else:
+        recorder.file.close()
+    return world
+
+
+def test_replay_reproduces_every_tick(tmp_path):
+    map_path = str(tmp_path / 'arena.json')
+    write_map(map_path)
+    path = str(tmp_path / 'session.zsrec')
+    live = record(path, map_path)
+
+    replayer = Replayer(Recording(path))
+    assert replayer.run() == 600
+    assert state_hash(replayer.world) == state_hash(live)
+    assert replayer.world.player == live.player
+
+
+def test_replay_reports_divergence_and_resumes(tmp_path):
+    path = str(tmp_path / 'session.zsrec')
+    record(path)
+    recording = Recording(path)
+    world = recording.new_world()
+    world.player['x'] += 1
+    with pytest.raises(ValueError, match="at tick 1$"):
+        Replayer(recording, world).run()
+
+    replayer = Replayer(Recording(path))
+    assert replayer.run(until_tick=250) == 250
+    assert replayer.run() == 600
+
+
+def test_cut_short_recording_replays_to_last_flush(tmp_path):
+    path = str(tmp_path / 'crash.zsrec')
+    record(path, ticks=FLUSH_TICKS * 3 + 10, close=False)
+    assert Replayer(Recording(path)).run() == FLUSH_TICKS * 3
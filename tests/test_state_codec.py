@@ -0,0 +1,60 @@
+import state_codec
+from state_codec import DeltaCodec, decode_message, encode_state, encode_world
+
+
+def make_world(n, shift=0.0):
+    return {
+        'players': {'1': {'x': 100.0, 'y': 200.0, 'angle': 0.5, 'hp': 90}},
+        'zombies': [{'id': i + 1, 'x': i * 10.0 + shift, 'y': 50.0, 'radius': 25, 'speed': 1.0, 'hp': 1}
+                    for i in range(n)],
+        'bullets': [{'id': 1000, 'x': 5.5, 'y': 6.25, 'dx': 3.0, 'dy': -4.0}],
+    }
+
+
+def test_world_round_trip():
+    server, client = DeltaCodec(), DeltaCodec()
+    msg = decode_message(client, encode_world(server, 1, make_world(3)))
+    assert msg['type'] == 'world' and msg['id'] == 1
+    assert msg['world'] == make_world(3)
+
+
+def test_deltas_are_smaller_and_track_acks():
+    server, client = DeltaCodec(), DeltaCodec()
+    keyframe = encode_world(server, 1, make_world(50))
+    decode_message(client, keyframe)
+    # the client's next state message carries its ack back to the server
+    decode_message(server, encode_state(client, {'x': 0, 'y': 0}, [], []))
+    assert server.peer_ack == 1
+    delta = encode_world(server, 1, make_world(49, shift=1.0))
+    assert len(delta) < len(keyframe) * 0.6
+    msg = decode_message(client, delta)
+    assert msg['world'] == make_world(49, shift=1.0)
+
+
+def test_unknown_base_is_dropped_until_keyframe():
+    server, client = DeltaCodec(keyframe_interval=3), DeltaCodec()
+    encode_world(server, 1, make_world(2))
+    server.peer_ack = 1
+    assert decode_message(client, encode_world(server, 1, make_world(2, shift=2.0))) is None
+    assert decode_message(client, encode_world(server, 1, make_world(2, shift=3.0))) is None
+    msg = decode_message(client, encode_world(server, 1, make_world(2, shift=4.0)))
+    assert msg['world']['zombies'] == make_world(2, shift=4.0)['zombies']
+
+
+def test_entities_without_ids_are_keyed_by_position():
+    server, client = DeltaCodec(), DeltaCodec()
+    world = make_world(0)
+    world['zombies'] = [{'x': 1.0, 'y': 2.0, 'radius': 20, 'speed': 2.0, 'hp': 0.5}]
+    msg = decode_message(client, encode_world(server, 1, world))
+    assert msg['world']['zombies'] == world['zombies']
+    assert state_codec.POSITION_ID_BASE in client.received[1]['zombies']
+
+
+def test_moves_for_unknown_ids_are_skipped():
+    server, client = DeltaCodec(), DeltaCodec()
+    decode_message(client, encode_world(server, 1, make_world(2)))
+    server.peer_ack = 1
+    # the client lost zombie 2 from its copy of the base tick
+    del client.received[1]['zombies'][2]
+    msg = decode_message(client, encode_world(server, 1, make_world(2, shift=1.0)))
+    assert [z['id'] for z in msg['world']['zombies']] == [1]
@@ -0,0 +1,30 @@
+import argparse
+import asyncio
+import shutil
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks import swarm_bench
+
+
+def fake_bot(arrivals, sizes):
+    return SimpleNamespace(arrivals=arrivals, sizes=sizes, connected=True, partial_frames=lambda: 0)
+
+
+def test_summarize_counts_missed_broadcasts():
+    steady = fake_bot([0.05 * i for i in range(5)], [100] * 5)
+    # one gap of three intervals means two broadcasts never arrived
+    gappy = fake_bot([0.0, 0.05, 0.2, 0.25], [300] * 4)
+    r = swarm_bench.summarize([steady, gappy], 1.0)
+    assert r['dropped'] == 2 and r['received_per_sec'] == 9
+    assert r['gap_p50_ms'] == pytest.approx(50) and r['gap_p99_ms'] == pytest.approx(150)
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason="needs node to run server.js")
+def test_swarm_step_against_local_server():
+    args = argparse.Namespace(seed=1, binary=False, zombies=2, bullets=1, send_rate=20, warmup=0.3,
+                              seconds=0.6, aoi=None)
+    r = asyncio.run(swarm_bench.run_step(3, args))
+    assert r['connected'] == 3 and r['disconnected'] == 0
+    assert r['received_per_sec'] > 20 and 0 < r['gap_p50_ms'] < 200
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from tictactoe_engine import O, WIN, X, Board, Solver, line_masks
+
+
+def play_all(board, moves):
+    for i in moves:
+        board.play(i)
+    return board
+
+
+def test_line_masks_cover_every_k_in_a_row():
+    assert len(line_masks(3, 3)) == 8
+    # 5x5, four in a row: 2 per row and column, 4 per diagonal direction
+    assert len(line_masks(5, 4)) == 10 + 10 + 4 + 4
+
+
+def test_board_finds_the_winning_line():
+    board = play_all(Board(), [0, 3, 4, 5])
+    assert board.play(8)
+    assert board.winner == X
+    assert board.cells_of(board.winning_line) == [(0, 0), (1, 1), (2, 2)]
+    with pytest.raises(ValueError):
+        board.play(1)
+    board.undo()
+    assert board.winner is None and board.turn == X
+
+    big = play_all(Board(5, 4), [4, 0, 8, 1, 12, 2, 16])
+    assert big.winner == X and big.cells_of(big.winning_line) == [(0, 4), (1, 3), (2, 2), (3, 1)]
+
+
+def test_perfect_play_draws_and_punishes_mistakes():
+    solver = Solver()
+    board = Board()
+    _, value = solver.best_move(board)
+    assert value == 0
+    while not board.is_over():
+        board.play(solver.best_move(board)[0])
+    assert board.winner is None
+
+    # X in a corner, O on an edge next to it loses
+    move, value = solver.best_move(play_all(Board(), [0, 1]))
+    assert value > WIN // 2
+    # take a win now rather than block
+    assert solver.best_move(play_all(Board(), [0, 3, 1, 4]))[0] == 2
+    # block the threat
+    assert solver.best_move(play_all(Board(), [0, 4, 1]))[0] == 2
+
+
+def test_saved_table_answers_without_searching(tmp_path):
+    path = str(tmp_path / '3x3.tt')
+    solver = Solver(path=path)
+    solver.best_move(Board())
+    solver.save()
+
+    warm = Solver(path=path)
+    assert warm.load() == len(solver.table)
+    assert warm.table == solver.table
+    assert warm.best_move(Board()) == solver.best_move(Board())
+    assert warm.nodes == 1
+    with pytest.raises(ValueError):
+        Solver(4, 3).load(path)
+
+
+def test_big_boards_answer_within_the_time_limit():
+    solver = Solver(7, 5)
+    board = play_all(Board(7, 5), [24, 25])
+    t0 = time.perf_counter()
+    move, _ = solver.best_move(board, time_limit=0.2)
+    assert time.perf_counter() - t0 < 1.0
+    assert move in board.moves()
+    # four in a row against the edge must be blocked at its open end
+    board = play_all(Board(7, 5), [21, 0, 22, 1, 23, 6, 24])
+    assert board.turn == O
+    assert solver.best_move(board, time_limit=0.2)[0] == 25
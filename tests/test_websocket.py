@@ -0,0 +1,73 @@
+import json
+import socket
+
+from state_codec import DeltaCodec
+from zombie_survival import WebSocketClient, apply_mask, encode_frame, parse_frame, OP_BINARY, OP_TEXT
+
+
+def make_client():
+    client = WebSocketClient()
+    client.sock, server = socket.socketpair()
+    client.sock.setblocking(False)
+    return client, server
+
+
+def world_frame(tick):
+    return encode_frame(json.dumps({'type': 'world', 'tick': tick}).encode())
+
+
+def test_parse_frame_handles_masked_and_partial_frames():
+    payload = b'{"a": 1}' * 40
+    mask = b'\x01\x02\x03\x04'
+    frame = bytes([0x81, 0x80 | 126]) + len(payload).to_bytes(2, 'big') + mask + apply_mask(payload, mask)
+    for cut in (1, 3, 7, len(frame) - 1):
+        assert parse_frame(frame[:cut]) is None
+    assert parse_frame(frame) == (True, OP_TEXT, payload, len(frame))
+
+
+def test_frames_split_across_reads_are_reassembled():
+    client, server = make_client()
+    data = world_frame(1)
+    server.sendall(data[:5])
+    assert client.recv_all() == []
+    server.sendall(data[5:])
+    assert client.recv_all() == [{'type': 'world', 'tick': 1}]
+
+
+def test_only_newest_world_snapshot_is_kept():
+    client, server = make_client()
+    chat = encode_frame(json.dumps({'type': 'chat'}).encode())
+    server.sendall(world_frame(1) + chat + world_frame(2) + world_frame(3))
+    assert client.recv_all() == [{'type': 'chat'}, {'type': 'world', 'tick': 3}]
+    assert client.stats['stale_snapshots'] == 2
+
+
+def test_empty_binary_frame_is_skipped():
+    client, server = make_client()
+    client.codec = DeltaCodec()
+    server.sendall(encode_frame(b"", OP_BINARY) + world_frame(1))
+    assert client.recv_all() == [{'type': 'world', 'tick': 1}]
+
+
+def test_fragmented_message_is_joined():
+    client, server = make_client()
+    body = json.dumps({'type': 'world', 'tick': 9}).encode()
+    server.sendall(bytes([0x01, 4]) + body[:4] + bytes([0x80, len(body) - 4]) + body[4:])
+    assert client.recv_all() == [{'type': 'world', 'tick': 9}]
+
+
+def test_merge_view_updates_in_place_and_reports_enter_and_leave():
+    client = WebSocketClient()
+    first = client.merge_view({'type': 'world', 'world': {
+        'players': {'1': {'x': 0, 'y': 0}},
+        'zombies': [{'id': 5, 'x': 1, 'y': 1}, {'id': 6, 'x': 2, 'y': 2}],
+        'bullets': [{'x': 3, 'y': 3}]}})
+    assert first['enter'] == {'players': ['1'], 'zombies': [5, 6], 'bullets': []}
+    zombie = first['world']['zombies'][0]
+    second = client.merge_view({'type': 'world', 'world': {
+        'players': {'1': {'x': 4, 'y': 0}, '2': {'x': 9, 'y': 9}},
+        'zombies': [{'id': 5, 'x': 7, 'y': 1}],
+        'bullets': []}})
+    assert second['enter'] == {'players': ['2'], 'zombies': [], 'bullets': []}
+    assert second['leave'] == {'players': [], 'zombies': [6], 'bullets': []}
+    assert second['world']['zombies'] == [zombie] and zombie['x'] == 7
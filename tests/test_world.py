@@ -0,0 +1,110 @@
+import random
+
+from zombie_survival import FlowField, World, TICK_MS, WORLD_WIDTH, WORLD_HEIGHT, ROCK_RADIUS
+
+
+def make_world(**kwargs):
+    return World(rng=random.Random(1), **kwargs)
+
+
+def test_step_runs_headless_and_spawns_zombies():
+    world = make_world()
+    for _ in range(300):
+        world.step(TICK_MS, {'up': True})
+    assert world.player['y'] == WORLD_HEIGHT // 2 - 300 * 2
+    assert len(world.enemies) == 4
+
+
+def test_speeds_do_not_depend_on_tick_rate():
+    ends = []
+    for rate in (30, 120):
+        world = make_world()
+        world.spawn_timer = -10 ** 9
+        world.enemies.append({'id': 1, 'x': WORLD_WIDTH // 2 + 400, 'y': WORLD_HEIGHT // 2, 'radius': 25,
+                              'speed': 1.0, 'hp': 5})
+        world.bullets.append({'id': 2, 'x': WORLD_WIDTH // 2, 'y': WORLD_HEIGHT // 2 - 100, 'dx': 0, 'dy': -5})
+        for _ in range(rate):
+            world.step(1000 / rate, {'left': True})
+        ends.append((world.player['x'], world.enemies[0]['x'], world.bullets[0]['y']))
+    (player_a, zombie_a, bullet_a), (player_b, zombie_b, bullet_b) = ends
+    assert abs(player_a - player_b) < 1e-6 and abs(bullet_a - bullet_b) < 1e-6
+    # zombies steer at waypoints, so their paths differ slightly with the step size
+    assert abs(zombie_a - zombie_b) < 1
+    assert abs(ends[0][0] - (WORLD_WIDTH // 2 - 120)) < 1e-6
+
+
+def test_rock_blocks_player_movement():
+    start = {'x': 1000, 'y': 1000}
+    world = make_world(rocks=[{'x': 1000 + ROCK_RADIUS + 21, 'y': 1000, 'hp': 8}], player_start=start)
+    for _ in range(10):
+        world.step(16, {'right': True})
+    assert world.player['x'] == 1000
+
+
+def test_bullets_destroy_rock():
+    rock = {'x': 1200, 'y': 1000, 'hp': 2}
+    world = make_world(rocks=[rock], player_start={'x': 1000, 'y': 1000})
+    for _ in range(400):
+        world.step(16, {'fire': True, 'angle': 0})
+    assert rock['hp'] <= 0
+    assert len(world.obstacles.rocks) == 0
+
+
+def test_killing_zombies_scores_and_advances_wave():
+    world = make_world()
+    world.zombies_to_next_wave = 2
+    for _ in range(2):
+        world.enemies.append({'x': WORLD_WIDTH // 2 + 100, 'y': WORLD_HEIGHT // 2, 'radius': 25, 'speed': 0, 'hp': 1})
+        world.bullets.append({'x': WORLD_WIDTH // 2 + 100, 'y': WORLD_HEIGHT // 2, 'dx': 0, 'dy': 0})
+        world.step(16)
+    assert world.score == 20
+    assert world.wave == 2
+    assert world.enemies == []
+
+
+def test_zombies_route_around_walls():
+    start = {'x': 1000, 'y': 1000}
+    wall = {'x': 1200, 'y': 600, 'width': 40, 'height': 800}
+    world = make_world(walls=[wall], player_start=start)
+    world.enemies.append({'x': 1500, 'y': 1000, 'radius': 25, 'speed': 2.0, 'hp': 1})
+    for _ in range(1000):
+        world.update_enemies()
+        if not world.enemies:
+            break
+    assert world.enemies == []
+    assert world.player['hp'] == 90
+
+
+def test_zombie_on_its_waypoint_heads_for_the_player():
+    world = make_world(player_start={'x': 1000, 'y': 1000})
+    world.add_enemy({'x': 1500.0, 'y': 1000.0, 'radius': 25, 'speed': 2.0, 'hp': 1})
+    field = world.flow_field(world.player)
+    size = field.cell_size
+    field.waypoints[field._index(int(1500 // size), int(1000 // size))] = (1500.0, 1000.0)
+    world.update_enemies()
+    assert (world.enemies[0]['x'], world.enemies[0]['y']) == (1498.0, 1000.0)
+
+
+def test_flow_field_reopens_destroyed_rock_in_place():
+    rocks = [{'x': 1000 + dx, 'y': 1500, 'hp': 1} for dx in range(-600, 601, 80)]
+    world = make_world(rocks=rocks, player_start={'x': 1000, 'y': 1000})
+    field = world.flow_field(world.player)
+    blocked_path = field.dist[:]
+    for rock in rocks[6:10]:
+        world.obstacles.damage(world.obstacles.rocks, rock)
+    fresh = FlowField(world.obstacles)
+    fresh.update(1000, 1000)
+    assert field.dist == fresh.dist
+    assert field.dist != blocked_path
+
+
+def test_flow_field_cache_only_keeps_the_current_window():
+    world = World.from_map(rng=random.Random(4), endless=True, seed=4)
+    field = FlowField(world.obstacles)
+    window = (2 * field.reach + 1) ** 2
+    for step in range(200):
+        field.update(10000 + step * 400, 10000)
+        assert len(field.blocked_cells) == window
+    fresh = FlowField(world.obstacles)
+    fresh.update(10000 + 199 * 400, 10000)
+    assert field.dist == fresh.dist
@@ -0,0 +1,61 @@
+import random
+
+from world_chunks import CHUNK_SIZE, MAX_CHUNKS, ChunkLayer, chunked_layers
+from zombie_survival import BULLET_RANGE, TICK_MS, World, WORLD_WIDTH
+
+
+def positions(grid, x, y, r):
+    return sorted((o['x'], o['y'], o.get('hp')) for o in grid.query(x, y, r))
+
+
+def test_chunks_are_generated_the_same_from_a_seed():
+    a = ChunkLayer('rocks', 5).spatial_grid(100)
+    b = ChunkLayer('rocks', 5).spatial_grid(100)
+    other = ChunkLayer('rocks', 6).spatial_grid(100)
+    box = (9000, 9000, 6000)
+    assert positions(a, *box) == positions(b, *box)
+    assert positions(a, *box) != positions(other, *box)
+    assert all(0 <= o['x'] <= WORLD_WIDTH for o in a)
+
+
+def test_evicted_chunks_come_back_with_their_damage():
+    grid = ChunkLayer('rocks', 1, max_chunks=1).spatial_grid(100)
+    x = y = CHUNK_SIZE * 5.5
+    half = CHUNK_SIZE / 2 - 100
+    rocks = sorted(grid.query(x, y, half), key=lambda o: (o['x'], o['y']))
+    while len(rocks) < 2:
+        x += CHUNK_SIZE
+        rocks = sorted(grid.query(x, y, half), key=lambda o: (o['x'], o['y']))
+    rocks[0]['hp'] = 3
+    grid.remove(rocks[1])
+    before = positions(grid, x, y, half)
+
+    grid.query(x + 4 * CHUNK_SIZE, y, 10)
+    assert len(grid.chunks) == 1
+    assert positions(grid, x, y, half) == before
+    # still remembered after a second round trip
+    grid.query(x + 4 * CHUNK_SIZE, y, 10)
+    assert positions(grid, x, y, half) == before
+    assert grid.deltas
+
+
+def test_endless_world_keeps_memory_bounded():
+    world = World.from_map(None, rng=random.Random(2), endless=True)
+    assert world.bounds is None
+    rocks = world.obstacles.rocks
+    for n in range(1, 40):
+        world.player['x'] = -n * CHUNK_SIZE
+        world.step(TICK_MS, {'fire': True})
+    assert len(rocks.chunks) <= MAX_CHUNKS
+    assert any(o['x'] < -60000 for o in rocks)
+
+    world.bullets = [{'x': world.player['x'] + BULLET_RANGE - 1, 'y': world.player['y'], 'dx': 5, 'dy': 0}]
+    world.update_bullets()
+    assert world.bullets == []
+
+
+def test_bounded_layers_stay_inside_the_world():
+    rocks, walls, trees = chunked_layers(9)
+    grid = trees.spatial_grid(100)
+    assert grid.query(-3000, -3000, 500) == []
+    assert walls.generate(-1, 0) == []
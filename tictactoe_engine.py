@@ -0,0 +1,300 @@
+"""Bitboard Tic-Tac-Toe engine and solver, independent of any GUI.
+
+A ``Board`` keeps each side's stones as one integer, bit ``row * size + col``
+per cell, and finds wins with precomputed masks of every k-in-a-row line, so
+a move only checks the lines through its own cell. ``Solver`` plays with a
+negamax search with alpha-beta pruning. Its transposition table is keyed by
+(stones of the side to move, stones of the other side), and is shared by
+every game of one board size and saved between runs::
+
+    board = Board()                 # 3x3, three in a row
+    solver = solver_for(3, 3)       # loads the saved table, if any
+    move, value = solver.best_move(board)
+    board.play(move)
+    solver.save()
+
+Small boards are solved outright; a 3x3 game takes a few thousand positions
+once and is a table lookup after that. On larger boards, where the full tree
+is far too big, the solver deepens iteratively until ``time_limit`` and
+scores the unfinished positions by their open lines. The table file is
+``HEADER`` then one ``ENTRY`` per position.
+"""
+import os
+import struct
+import time
+
+MAGIC = b"TTTT"
+VERSION = 1
+HEADER = struct.Struct("<4sHBBI")  # magic, version, size, k, entry count
+ENTRY = struct.Struct("<QQBBib")    # mover's stones, other stones, depth, flag, value, best move
+TABLE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "tictactoe")
+
+MAX_CELLS = 64  # stones are saved as 64-bit masks
+MAX_ENTRIES = 4000000  # the table is cleared when it grows past this
+WIN = 1 << 28  # above any evaluate() score, and small enough to save as int32
+TIME_CHECK = 4096  # nodes between clock checks
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+X = 0
+O = 1
+
+
+def line_masks(size, k):
+    """Return the masks of every k cells in a row, column or diagonal on a size x size board."""
+    lines = []
+    for row in range(size):
+        for col in range(size):
+            for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_r, end_c = row + dr * (k - 1), col + dc * (k - 1)
+                if 0 <= end_r < size and 0 <= end_c < size:
+                    mask = 0
+                    for n in range(k):
+                        mask |= 1 << ((row + dr * n) * size + col + dc * n)
+                    lines.append(mask)
+    return lines
+
+
+class Board:
+    """A size x size board won with k in a row; X moves first."""
+
+    def __init__(self, size=3, k=3):
+        if not 1 <= k <= size or size * size > MAX_CELLS:
+            raise ValueError("need 1 <= k <= size <= 8, got size %d and k %d" % (size, k))
+        self.size = size
+        self.k = k
+        self.cells = size * size
+        self.full = (1 << self.cells) - 1
+        self.lines = line_masks(size, k)
+        # the lines through each cell, so a move only checks those
+        self.cell_lines = [[m for m in self.lines if m >> i & 1] for i in range(self.cells)]
+        self.stones = [0, 0]
+        self.history = []
+        self.winner = None
+        self.winning_line = 0
+
+    @property
+    def turn(self):
+        """X or O, whichever moves next."""
+        return len(self.history) % 2
+
+    def occupied(self):
+        return self.stones[X] | self.stones[O]
+
+    def moves(self):
+        """Indices of the empty cells."""
+        free = self.full & ~self.occupied()
+        return [i for i in range(self.cells) if free >> i & 1]
+
+    def at(self, row, col):
+        """X, O or None for the cell at row, col."""
+        bit = 1 << (row * self.size + col)
+        if self.stones[X] & bit:
+            return X
+        if self.stones[O] & bit:
+            return O
+        return None
+
+    def is_full(self):
+        return self.occupied() == self.full
+
+    def is_over(self):
+        return self.winner is not None or self.is_full()
+
+    def play(self, i):
+        """Place the next stone on cell i; return True if it won."""
+        if self.is_over() or self.occupied() >> i & 1:
+            raise ValueError("cell %d cannot be played" % i)
+        side = self.turn
+        stones = self.stones[side] | 1 << i
+        self.stones[side] = stones
+        self.history.append(i)
+        for mask in self.cell_lines[i]:
+            if stones & mask == mask:
+                self.winner = side
+                self.winning_line = mask
+                return True
+        return False
+
+    def undo(self):
+        i = self.history.pop()
+        self.stones[self.turn] &= ~(1 << i)
+        self.winner = None
+        self.winning_line = 0
+
+    def cells_of(self, mask):
+        """(row, col) of every cell set in mask."""
+        return [divmod(i, self.size) for i in range(self.cells) if mask >> i & 1]
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+class Solver:
+    """Negamax with alpha-beta pruning and a transposition table for one board size."""
+
+    def __init__(self, size=3, k=3, path=None):
+        self.size = size
+        self.k = k
+        self.path = path
+        board = Board(size, k)
+        self.cells = board.cells
+        self.lines = board.lines
+        self.cell_lines = board.cell_lines
+        # cells crossed by more lines first; usually the strongest moves
+        self.order = sorted(range(self.cells), key=lambda i: -len(self.cell_lines[i]))
+        # (mover's stones, other stones) -> (depth searched, flag, value, best move)
+        self.table = {}
+        self.nodes = 0
+        self.deadline = None
+
+    def evaluate(self, mine, theirs):
+        """Score a position for the side to move by the lines still open to each side."""
+        score = 0
+        for mask in self.lines:
+            if not mask & theirs:
+                score += 1 << 2 * bin(mask & mine).count('1')
+            elif not mask & mine:
+                score -= 1 << 2 * bin(mask & theirs).count('1')
+        return score
+
+    def _search(self, mine, theirs, empty, depth, alpha, beta):
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % TIME_CHECK == 0 and time.perf_counter() > self.deadline:
+            raise _OutOfTime
+        depth = min(depth, empty)
+        key = (mine, theirs)
+        entry = self.table.get(key)
+        best_move = -1
+        if entry is not None:
+            entry_depth, flag, value, best_move = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return value
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+        if depth == 0:
+            return self.evaluate(mine, theirs)
+
+        occupied = mine | theirs
+        moves = [i for i in self.order if not occupied >> i & 1]
+        for i in moves:
+            stones = mine | 1 << i
+            for mask in self.cell_lines[i]:
+                if stones & mask == mask:
+                    # nothing beats winning now; sooner wins score higher
+                    value = WIN + empty - 1
+                    self.table[key] = (empty, EXACT, value, i)
+                    return value
+        if best_move >= 0:
+            moves.remove(best_move)
+            moves.insert(0, best_move)
+
+        start_alpha = alpha
+        best = -WIN * 2
+        for i in moves:
+            if empty == 1:
+                value = 0
+            else:
+                value = -self._search(theirs, mine | 1 << i, empty - 1, depth - 1, -beta, -alpha)
+            if value > best:
+                best, best_move = value, i
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        break
+        flag = UPPER if best <= start_alpha else LOWER if best >= beta else EXACT
+        self.table[key] = (depth, flag, best, best_move)
+        return best
+
+    def best_move(self, board, time_limit=None, max_depth=None):
+        """Return (cell, value) for the side to move; value > WIN // 2 is a forced win.
+
+        Searches deeper one ply at a time until the position is solved,
+        ``max_depth`` is reached or ``time_limit`` seconds pass, and answers
+        from the deepest search that finished.
+        """
+        if board.is_over():
+            raise ValueError("the game is over")
+        if len(self.table) > MAX_ENTRIES:
+            self.table.clear()
+        side = board.turn
+        mine, theirs = board.stones[side], board.stones[1 - side]
+        empty = self.cells - len(board.history)
+        limit = empty if max_depth is None else min(max_depth, empty)
+        self.deadline = None if time_limit is None else time.perf_counter() + time_limit
+        # resume from whatever a previous search or game left in the table
+        entry = self.table.get((mine, theirs))
+        first = min(entry[0], limit) if entry else 1
+        result = (entry[3], entry[2]) if entry else None
+        try:
+            for depth in range(max(first, 1), limit + 1):
+                value = self._search(mine, theirs, empty, depth, -WIN * 2, WIN * 2)
+                result = (self.table[(mine, theirs)][3], value)
+                if abs(value) > WIN // 2:
+                    break
+        except _OutOfTime:
+            pass
+        finally:
+            self.deadline = None
+        if result is None:
+            # no stored move and not even one ply finished: take the first move in the usual order
+            occupied = mine | theirs
+            result = (next(i for i in self.order if not occupied >> i & 1), 0)
+        return result
+
+    def save(self, path=None):
+        """Write the table to path, by default the one it was loaded from."""
+        path = path or self.path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.size, self.k, len(self.table)))
+            f.write(b"".join(ENTRY.pack(mine, theirs, depth, flag, value, best)
+                             for (mine, theirs), (depth, flag, value, best) in self.table.items()))
+        os.replace(tmp, path)
+
+    def load(self, path=None):
+        """Merge a saved table into this one; return the number of entries read."""
+        path = path or self.path
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < HEADER.size:
+            raise ValueError("%s is not a Tic-Tac-Toe table" % path)
+        magic, version, size, k, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a version %d Tic-Tac-Toe table" % (path, VERSION))
+        if (size, k) != (self.size, self.k):
+            raise ValueError("%s is for %dx%d boards with %d in a row" % (path, size, size, k))
+        table = self.table
+        for mine, theirs, depth, flag, value, best in ENTRY.iter_unpack(data[HEADER.size:HEADER.size + count * ENTRY.size]):
+            entry = table.get((mine, theirs))
+            if entry is None or entry[0] < depth:
+                table[(mine, theirs)] = (depth, flag, value, best)
+        return count
+
+
+def table_path(size, k):
+    return os.path.join(TABLE_DIR, "%dx%d-%d.tt" % (size, size, k))
+
+
+_solvers = {}
+
+
+def solver_for(size=3, k=3):
+    """The shared Solver for a board size, with its saved table loaded."""
+    solver = _solvers.get((size, k))
+    if solver is None:
+        solver = _solvers[(size, k)] = Solver(size, k, table_path(size, k))
+        try:
+            solver.load()
+        except (OSError, ValueError):
+            pass
+    return solver
@@ -0,0 +1,192 @@
+"""Generate the random world chunk by chunk as the game looks at it.
+
+``spawn_world_objects()`` creates every rock, wall and tree of the world up
+front. The layers built here create them per ``CHUNK_SIZE`` square instead,
+from a random generator seeded with the world seed, the layer and the chunk's
+coordinates, so a chunk comes out the same every time it is generated. A
+chunk is generated the first time a query touches it, and once more than
+``MAX_CHUNKS`` are loaded the least recently used one is dropped. Dropping a
+chunk keeps only the hp of objects that were damaged and the indices of
+those destroyed, and they are applied when it is generated again. Memory
+follows what is near the player, so the world can be much larger than
+``WORLD_WIDTH`` x ``WORLD_HEIGHT`` or have no edges at all::
+
+    python zombie_survival.py            # the usual 20000 x 20000 world
+    python zombie_survival.py --endless  # no edges
+"""
+import random
+from collections import OrderedDict
+
+from zombie_survival import ROCK_RADIUS, SpatialGrid, WORLD_HEIGHT, WORLD_WIDTH
+
+CHUNK_SIZE = 2000
+MAX_CHUNKS = 64  # loaded chunks per layer
+WORLD_BOUNDS = (0, 0, WORLD_WIDTH, WORLD_HEIGHT)
+
+# objects per chunk; the same density as spawn_world_objects() over the whole world
+DENSITY = {
+    'rocks': 300 * CHUNK_SIZE ** 2 / (WORLD_WIDTH * WORLD_HEIGHT),
+    'walls': 50 * CHUNK_SIZE ** 2 / (WORLD_WIDTH * WORLD_HEIGHT),
+    'trees': 200 * CHUNK_SIZE ** 2 / (WORLD_WIDTH * WORLD_HEIGHT),
+}
+
+
+def _rock(rng, x, y):
+    return {'x': x, 'y': y, 'hp': 8}
+
+
+def _wall(rng, x, y):
+    return {'x': x, 'y': y,
+            'width': 200 if rng.random() > 0.5 else 40,
+            'height': 40 if rng.random() > 0.5 else 200}
+
+
+def _tree(rng, x, y):
+    return {'x': x, 'y': y, 'radius': 240, 'hp': 5}
+
+
+# name: (make, farthest an object reaches outside its own chunk)
+LAYERS = {
+    'rocks': (_rock, ROCK_RADIUS),
+    'walls': (_wall, 200),
+    'trees': (_tree, 240),
+}
+
+
+def _box(obj):
+    if 'width' in obj:
+        return obj['x'], obj['y'], obj['x'] + obj['width'], obj['y'] + obj['height']
+    r = obj.get('radius', ROCK_RADIUS)
+    return obj['x'] - r, obj['y'] - r, obj['x'] + r, obj['y'] + r
+
+
+class ChunkLayer:
+    """One procedurally generated layer; passed to World in place of a list."""
+
+    def __init__(self, name, seed, bounds=WORLD_BOUNDS, chunk_size=CHUNK_SIZE, max_chunks=MAX_CHUNKS):
+        self.name = name
+        self.seed = seed
+        self.make, self.reach = LAYERS[name]
+        self.density = DENSITY[name]
+        self.bounds = bounds
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+
+    def generate(self, cx, cy):
+        """Return fresh dicts for every object of chunk (cx, cy), always in the same order."""
+        # string seeds are hashed the same way in every process, unlike hash()
+        rng = random.Random("%d/%s/%d/%d" % (self.seed, self.name, cx, cy))
+        size = self.chunk_size
+        count = int(self.density)
+        if rng.random() < self.density - count:
+            count += 1
+        x0, y0, x1, y1 = cx * size, cy * size, (cx + 1) * size, (cy + 1) * size
+        if self.bounds is not None:
+            bx0, by0, bx1, by1 = self.bounds
+            x0, y0, x1, y1 = max(x0, bx0), max(y0, by0), min(x1, bx1), min(y1, by1)
+            if x0 >= x1 or y0 >= y1:
+                return []
+        objects = []
+        for _ in range(count):
+            x = x0 + rng.random() * (x1 - x0)
+            y = y0 + rng.random() * (y1 - y0)
+            objects.append(self.make(rng, x, y))
+        return objects
+
+    def chunk_range(self, x0, y0, x1, y1):
+        """The chunks that may hold objects overlapping the box (x0, y0)-(x1, y1)."""
+        reach = self.reach
+        if self.bounds is not None:
+            bx0, by0, bx1, by1 = self.bounds
+            x0, y0 = max(x0, bx0 - reach), max(y0, by0 - reach)
+            x1, y1 = min(x1, bx1 + reach), min(y1, by1 + reach)
+            if x0 > x1 or y0 > y1:
+                return range(0), range(0)
+        size = self.chunk_size
+        return (range(int((x0 - reach) // size), int((x1 + reach) // size) + 1),
+                range(int((y0 - reach) // size), int((y1 + reach) // size) + 1))
+
+    def spatial_grid(self, cell_size):
+        return ChunkGrid(self, cell_size)
+
+
+class ChunkGrid(SpatialGrid):
+    """SpatialGrid over a ChunkLayer that generates chunks on query and drops old ones.
+
+    Iterating or taking the length only covers the chunks loaded right now.
+    """
+
+    def __init__(self, layer, cell_size):
+        super().__init__(cell_size)
+        self.layer = layer
+        # (cx, cy) -> the live objects generated there, least recently used first
+        self.chunks = OrderedDict()
+        # (cx, cy) -> {index: hp} for damaged objects of chunks not loaded, 0 if destroyed
+        self.deltas = {}
+        self.origin = {}
+
+    def _load_range(self, x0, y0, x1, y1):
+        chunks = self.chunks
+        cols, rows = self.layer.chunk_range(x0, y0, x1, y1)
+        for cx in cols:
+            for cy in rows:
+                key = (cx, cy)
+                if key in chunks:
+                    chunks.move_to_end(key)
+                else:
+                    self._load(key)
+        # the chunks just touched are the most recent, so keeping that many never drops them
+        keep = max(self.layer.max_chunks, len(cols) * len(rows))
+        while len(chunks) > keep:
+            self._evict(next(iter(chunks)))
+
+    def _load(self, key):
+        delta = self.deltas.pop(key, {})
+        live = []
+        for i, obj in enumerate(self.layer.generate(*key)):
+            generated = obj.get('hp')
+            hp = delta.get(i)
+            if hp is not None:
+                if hp <= 0:
+                    continue
+                obj['hp'] = hp
+            self.origin[id(obj)] = (key, i, generated)
+            super().insert(obj, *_box(obj))
+            live.append(obj)
+        self.chunks[key] = live
+        # destroyed objects stay destroyed however often the chunk comes back
+        self.deltas[key] = {i: 0 for i, hp in delta.items() if hp <= 0}
+
+    def _evict(self, key):
+        live = self.chunks.pop(key)
+        delta = self.deltas.pop(key)
+        for obj in live:
+            _, i, hp = self.origin.pop(id(obj))
+            if obj.get('hp') != hp:
+                delta[i] = obj['hp']
+            super().remove(obj)
+        if delta:
+            self.deltas[key] = delta
+
+    def insert(self, item, x0, y0, x1, y1):
+        self._load_range(x0, y0, x1, y1)
+        super().insert(item, x0, y0, x1, y1)
+
+    def remove(self, item):
+        if not super().remove(item):
+            return False
+        origin = self.origin.pop(id(item), None)
+        if origin is not None:
+            key, i, _ = origin
+            self.deltas[key][i] = 0
+            self.chunks[key].remove(item)
+        return True
+
+    def query(self, x, y, r):
+        self._load_range(x - r, y - r, x + r, y + r)
+        return super().query(x, y, r)
+
+
+def chunked_layers(seed, bounds=WORLD_BOUNDS):
+    """Return (rocks, walls, trees) layers for World; bounds None makes the world endless."""
+    return tuple(ChunkLayer(name, seed, bounds) for name in ('rocks', 'walls', 'trees'))
@@ -1,12 +1,21 @@
-import pygame
+try:
+    import pygame
+except ImportError:  # World runs headless without pygame
+    pygame = None
+import argparse
 import math
 import random
 import json
 import os
 import sys
+from collections import OrderedDict, deque
+
+import state_codec
+from frame_profiler import FORMATS as PROFILE_FORMATS, FrameProfiler
 
 # Screen dimensions
 import socket, base64, hashlib, struct
+import select, threading, time
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 
@@ -14,28 +23,133 @@ SCREEN_HEIGHT = 600
 WORLD_WIDTH = 20000
 WORLD_HEIGHT = 20000
 
+# movement speeds are in units per tick at the default tick rate
+TICK_RATE = 60  # simulation steps per second
+TICK_MS = 1000 / TICK_RATE
+MAX_CATCH_UP_TICKS = 5  # steps run per frame at most; a longer stall is dropped
+RENDER_FPS = 60
+
 PLAYER_SPEED = 2
 BULLET_SPEED = 5
+BULLET_RANGE = 3000  # bullets this far from the player are dropped in an endless world
 FIRE_RATE = 500  # milliseconds
+SPAWN_INTERVAL = 1000  # milliseconds between zombie spawns in the first wave
+WAVE_SPAWN_SCALE = 0.9  # each wave spawns this much sooner than the last
+MIN_SPAWN_INTERVAL = 200
 MAGAZINE_SIZE = 6
 RELOAD_TIME = 2000
 
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+RECV_CHUNK = 65536
+NET_SEND_RATE = 20  # state sends per second, matching the server's 50 ms broadcast
+
+
+def apply_mask(data, mask):
+    """XOR a payload with a 4-byte WebSocket mask in one big-integer operation."""
+    n = len(data)
+    if not n:
+        return b""
+    key = (bytes(mask) * (n // 4 + 1))[:n]
+    return (int.from_bytes(data, "big") ^ int.from_bytes(key, "big")).to_bytes(n, "big")
+
+
+def encode_frame(payload, opcode=OP_TEXT, mask=None):
+    """Build a single unfragmented frame carrying payload.
+
+    Clients must pass a 4-byte ``mask``; servers send frames unmasked.
+    """
+    header = bytearray([0x80 | opcode])
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header.append(mask_bit | length)
+    elif length < 65536:
+        header.append(mask_bit | 126)
+        header.extend(struct.pack(">H", length))
+    else:
+        header.append(mask_bit | 127)
+        header.extend(struct.pack(">Q", length))
+    if mask:
+        return bytes(header) + mask + apply_mask(payload, mask)
+    return bytes(header) + payload
+
+
+def parse_frame(buf, start=0, max_size=None):
+    """Parse the frame at buf[start:].
+
+    Returns ``(fin, opcode, payload, end)`` or None while the frame is still
+    incomplete. Masked frames are unmasked; unmasked ones are returned as-is.
+    Raises ValueError as soon as the header declares a payload longer than
+    ``max_size``, before any of it is buffered.
+    """
+    view = memoryview(buf)
+    avail = len(buf) - start
+    if avail < 2:
+        return None
+    b1 = view[start]
+    b2 = view[start + 1]
+    length = b2 & 0x7F
+    offset = start + 2
+    if length == 126:
+        if avail < 4:
+            return None
+        length = struct.unpack_from(">H", buf, offset)[0]
+        offset += 2
+    elif length == 127:
+        if avail < 10:
+            return None
+        length = struct.unpack_from(">Q", buf, offset)[0]
+        offset += 8
+    if max_size is not None and length > max_size:
+        raise ValueError(f"{length} byte frame exceeds the {max_size} byte limit")
+    mask = None
+    if b2 & 0x80:
+        if len(buf) < offset + 4:
+            return None
+        mask = view[offset:offset + 4]
+        offset += 4
+    end = offset + length
+    if len(buf) < end:
+        return None
+    payload = view[offset:end]
+    payload = apply_mask(payload, mask) if mask is not None else bytes(payload)
+    return bool(b1 & 0x80), b1 & 0x0F, payload, end
+
+
 class WebSocketClient:
-    def __init__(self, host="localhost", port=8765):
+    def __init__(self, host="localhost", port=8765, binary=True, path="/"):
         self.host = host
         self.port = port
+        self.path = path
         self.sock = None
         self.id = None
+        # offer the binary delta protocol; the server decides whether to use it
+        self.binary = binary
+        self.codec = None
+        self.buffer = bytearray()
+        self.chunk = bytearray(RECV_CHUNK)
+        self.fragments = None
+        self.outbox = bytearray()
+        # messages that arrived after the one wait_for() returned
+        self.backlog = []
+        # entities in our area of interest, by section and id; see merge_view()
+        self.view = {'players': {}, 'zombies': {}, 'bullets': {}}
+        self.stats = {'frames': 0, 'bytes': 0, 'messages': 0, 'stale_snapshots': 0}
 
     def connect(self):
         s = socket.create_connection((self.host, self.port))
         key = base64.b64encode(os.urandom(16)).decode()
         headers = (
-            f"GET / HTTP/1.1\r\n"
+            f"GET {self.path} HTTP/1.1\r\n"
             f"Host: {self.host}:{self.port}\r\n"
             "Upgrade: websocket\r\n"
             "Connection: Upgrade\r\n"
             f"Sec-WebSocket-Key: {key}\r\n"
+            + (f"Sec-WebSocket-Protocol: {state_codec.PROTOCOL}\r\n" if self.binary else "") +
             "Sec-WebSocket-Version: 13\r\n\r\n"
         )
         s.send(headers.encode())
@@ -43,56 +157,663 @@ class WebSocketClient:
         if b"101" not in resp:
             s.close()
             raise ConnectionError("WebSocket handshake failed")
+        head, _, rest = resp.partition(b"\r\n\r\n")
+        protocols = [line.split(b":", 1)[1].strip().decode() for line in head.split(b"\r\n")
+                     if line.lower().startswith(b"sec-websocket-protocol:")]
+        if state_codec.PROTOCOL in protocols:
+            self.codec = state_codec.DeltaCodec()
+        # anything after the headers is the start of the first frame
+        self.buffer.extend(rest)
         s.setblocking(False)
         self.sock = s
 
     def send(self, data):
         if not self.sock:
             return
-        payload = json.dumps(data).encode()
-        header = bytearray([0x81])
-        length = len(payload)
-        if length < 126:
-            header.append(length)
-        elif length < 65536:
-            header.append(126)
-            header.extend(struct.pack(">H", length))
+        if self.codec and data.get("type") == "state":
+            payload = state_codec.encode_state(self.codec, data["player"], data["bullets"], data["zombies"],
+                                               data.get("ack"))
+            frame = encode_frame(payload, OP_BINARY, os.urandom(4))
         else:
-            header.append(127)
-            header.extend(struct.pack(">Q", length))
-        self.sock.sendall(header + payload)
+            if self.codec and "ack" not in data:
+                # JSON messages carry the binary snapshot ack back to the server
+                data = dict(data, ack=self.codec.ack)
+            frame = encode_frame(json.dumps(data).encode(), OP_TEXT, os.urandom(4))
+        self.outbox += frame
+        self.flush()
 
-    def recv(self):
+    def flush(self):
+        """Write as much of the outbox as the socket takes; True once it is empty."""
+        while self.outbox and self.sock:
+            try:
+                sent = self.sock.send(self.outbox)
+            except (BlockingIOError, InterruptedError):
+                return False
+            except OSError:
+                self.close()
+                return False
+            del self.outbox[:sent]
+        return not self.outbox
+
+    def _read_available(self):
+        """Append everything the socket has ready to the buffer."""
+        view = memoryview(self.chunk)
+        while self.sock:
+            try:
+                n = self.sock.recv_into(self.chunk)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                self.close()
+                return
+            if not n:
+                self.close()
+                return
+            self.buffer += view[:n]
+            self.stats['bytes'] += n
+            if n < len(self.chunk):
+                return
+
+    def _parse_messages(self):
+        """Yield every complete message in the buffer, reassembling fragments."""
+        buf = self.buffer
+        pos = 0
+        while True:
+            frame = parse_frame(buf, pos)
+            if frame is None:
+                break
+            fin, opcode, payload, pos = frame
+            self.stats['frames'] += 1
+            if opcode == OP_CLOSE:
+                self.close()
+                break
+            if opcode >= OP_CLOSE:
+                continue
+            if opcode != OP_CONTINUATION:
+                self.fragments = (opcode, [payload])
+            elif self.fragments is None:
+                continue
+            else:
+                self.fragments[1].append(payload)
+            if fin:
+                opcode, parts = self.fragments
+                self.fragments = None
+                yield opcode, b"".join(parts)
+        del buf[:pos]
+
+    def recv_messages(self):
+        """Drain the socket and return every complete (opcode, payload) message, undecoded.
+
+        Meant for tools that time or measure the raw traffic; recv_all() is
+        what a game wants.
+        """
         if not self.sock:
+            return []
+        self._read_available()
+        return list(self._parse_messages())
+
+    def recv_all(self):
+        """Drain all pending messages, keeping only the newest world snapshot."""
+        if not self.sock:
+            return []
+        self._read_available()
+        messages, self.backlog = self.backlog, []
+        world_at = None
+        for opcode, payload in self._parse_messages():
+            if opcode == OP_BINARY:
+                if not self.codec or not payload:
+                    continue
+                # binary world snapshots are decoded lazily, only the newest one
+                msg = payload if payload[0] == state_codec.MSG_WORLD else \
+                    state_codec.decode_message(self.codec, payload)
+            else:
+                try:
+                    msg = json.loads(payload)
+                except ValueError:
+                    continue
+            if msg is None:
+                continue
+            self.stats['messages'] += 1
+            if isinstance(msg, bytes) or (isinstance(msg, dict) and msg.get("type") == "world"):
+                if world_at is not None:
+                    messages[world_at] = None
+                    self.stats['stale_snapshots'] += 1
+                world_at = len(messages)
+            messages.append(msg)
+        if world_at is not None and isinstance(messages[world_at], bytes):
+            messages[world_at] = state_codec.decode_message(self.codec, messages[world_at])
+        if world_at is not None and messages[world_at] and "world" in messages[world_at]:
+            self.merge_view(messages[world_at])
+        return [m for m in messages if m is not None]
+
+    def merge_view(self, msg):
+        """Fold a world snapshot into ``view`` and record what entered and left it.
+
+        Servers with area-of-interest filtering only send entities near our
+        player. Entities are updated in place by id, so references to them stay
+        valid; ``msg['enter']`` and ``msg['leave']`` are set to the ids that came
+        into and went out of view since the last merged snapshot. The server
+        does not send them, since only the client knows which snapshots
+        recv_all() skipped as stale.
+        """
+        snapshot = msg["world"]
+        enter = {}
+        leave = {}
+        for name in ('players', 'zombies', 'bullets'):
+            items = snapshot[name]
+            pairs = items.items() if name == 'players' else \
+                ((item.get('id', ('anon', i)), item) for i, item in enumerate(items))
+            known = self.view[name]
+            current = {}
+            enter[name] = []
+            for key, item in pairs:
+                old = known.get(key)
+                if old is None:
+                    if not isinstance(key, tuple):
+                        enter[name].append(key)
+                    old = item
+                else:
+                    old.update(item)
+                current[key] = old
+            leave[name] = [key for key in known if key not in current and not isinstance(key, tuple)]
+            self.view[name] = current
+            snapshot[name] = current if name == 'players' else list(current.values())
+        msg['enter'] = enter
+        msg['leave'] = leave
+        return msg
+
+    def wait_for(self, kind, timeout=5.0):
+        """Block until a message of type ``kind`` arrives and return it.
+
+        Snapshots before and with it are dropped; other messages after it are
+        kept for the next recv_all().
+        """
+        deadline = time.monotonic() + timeout
+        while self.sock:
+            messages = self.recv_all()
+            for i, msg in enumerate(messages):
+                if msg.get("type") == kind:
+                    self.backlog = [m for m in messages[i + 1:] if m.get("type") != "world"]
+                    return msg
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            select.select([self.sock], [], [], remaining)
+        raise ConnectionError(f"no {kind} message from the server")
+
+    def recv(self):
+        """Return one pending message, or None.
+
+        The newest world snapshot comes first; other messages are kept, oldest
+        first, for the following recv() or recv_all() calls.
+        """
+        messages = self.recv_all()
+        if not messages:
             return None
-        try:
-            first = self.sock.recv(2)
-            if not first:
-                return None
-            _, b2 = first
-            length = b2 & 0x7F
-            if length == 126:
-                length = struct.unpack(">H", self.sock.recv(2))[0]
-            elif length == 127:
-                length = struct.unpack(">Q", self.sock.recv(8))[0]
-            mask = self.sock.recv(4)
-            data = bytearray(self.sock.recv(length))
-            for i in range(length):
-                data[i] ^= mask[i % 4]
-            return json.loads(data.decode())
-        except BlockingIOError:
-            return None
-        except Exception:
-            return None
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].get("type") == "world":
+                break
+        else:
+            i = 0
+        self.backlog = messages[:i] + messages[i + 1:]
+        return messages[i]
+
+    def close(self):
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+        self.sock = None
+
+class NetworkThread:
+    """Runs a WebSocketClient on a background thread.
+
+    The game loop hands over its newest state with submit() and picks up the
+    newest world snapshot with latest(); neither touches the socket. State is
+    sent at most ``send_rate`` times a second and only the last submitted
+    state is kept, so a slow link never stalls a frame.
+    """
+
+    def __init__(self, client, send_rate=NET_SEND_RATE, inbox_size=64):
+        self.client = client
+        self.interval = 1.0 / send_rate
+        # the network thread appends and the game loop pops; both are atomic on a deque,
+        # and a full inbox drops its oldest message without a check-then-act race
+        self.inbox = deque(maxlen=inbox_size)
+        self.lock = threading.Lock()
+        self.outgoing = None
+        self.snapshot = None
+        self.next_send = time.monotonic()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="network", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join(1.0)
+        self.client.close()
+
+    def send_due(self):
+        """True when the next submitted state would go out on the next send tick."""
+        return self.outgoing is None and time.monotonic() >= self.next_send
+
+    def submit(self, state):
+        """Replace any state still waiting to be sent."""
+        with self.lock:
+            self.outgoing = state
+
+    def latest(self):
+        """Return the newest world snapshot received since the last call, or None."""
+        with self.lock:
+            snapshot, self.snapshot = self.snapshot, None
+        return snapshot
+
+    def received(self):
+        """Return the other messages received since the last call, oldest first."""
+        messages = []
+        while True:
+            try:
+                messages.append(self.inbox.popleft())
+            except IndexError:
+                return messages
+
+    def _run(self):
+        client = self.client
+        while not self.stopped.is_set() and client.sock:
+            now = time.monotonic()
+            wait = max(0.0, self.next_send - now)
+            writers = [client.sock] if client.outbox else []
+            try:
+                readable, writable, _ = select.select([client.sock], writers, [], wait)
+            except (OSError, ValueError):
+                break
+            if writable:
+                client.flush()
+            if readable:
+                for msg in client.recv_all():
+                    if msg.get("type") == "world":
+                        with self.lock:
+                            self.snapshot = msg
+                    else:
+                        self.inbox.append(msg)
+            now = time.monotonic()
+            if now >= self.next_send:
+                self.next_send = max(self.next_send + self.interval, now)
+                # the previous send is still draining; keep coalescing into it
+                if client.outbox:
+                    continue
+                with self.lock:
+                    state, self.outgoing = self.outgoing, None
+                if state is not None:
+                    client.send(state)
+
+
+BUTTONS = ('up', 'down', 'left', 'right', 'fire')
+
+
+def pack_inputs(inputs):
+    """Return (button bits, aim angle) for an inputs dict."""
+    bits = 0
+    for n, key in enumerate(BUTTONS):
+        if inputs.get(key):
+            bits |= 1 << n
+    return bits, inputs.get('angle', 0.0)
+
+
+def unpack_inputs(bits, angle):
+    inputs = {key: bool(bits >> n & 1) for n, key in enumerate(BUTTONS)}
+    inputs['angle'] = angle
+    return inputs
+
+
+def state_message(world, ack=None):
+    """Copy the parts of a World sent to the server, safe to hand to another thread.
+
+    ``ack`` is the tick of the snapshot the world was last updated from, so
+    the server knows which of its entities the state could have seen.
+    """
+    msg = {
+        "type": "state",
+        "player": dict(world.player),
+        "bullets": [dict(b) for b in world.bullets],
+        "zombies": [dict(e) for e in world.enemies],
+    }
+    if ack:
+        msg["ack"] = ack
+    return msg
+
 
 ROCK_RADIUS = 45
+GRID_CELL_SIZE = 500  # world units per spatial grid bucket
+FLOW_CELL_SIZE = 50  # world units per flow field cell
+FLOW_RANGE = 24  # flow field cells searched in each direction from the target
+FLOW_CLEARANCE = 40  # room a flow field cell needs around rocks and walls: the largest zombie radius
+
+
+class SpatialGrid:
+    """Bucket items by world cell so lookups only touch nearby cells."""
+
+    def __init__(self, cell_size=GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.items = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return (item for item, _ in self.items.values())
+
+    def _cell_range(self, x0, y0, x1, y1):
+        size = self.cell_size
+        return (range(int(x0 // size), int(x1 // size) + 1),
+                range(int(y0 // size), int(y1 // size) + 1))
+
+    def insert(self, item, x0, y0, x1, y1):
+        """Add item to every cell its bounding box (x0, y0)-(x1, y1) touches."""
+        keys = []
+        cols, rows = self._cell_range(x0, y0, x1, y1)
+        for cx in cols:
+            for cy in rows:
+                self.cells.setdefault((cx, cy), []).append(item)
+                keys.append((cx, cy))
+        self.items[id(item)] = (item, keys)
+
+    def remove(self, item):
+        """Drop item from the cells it was inserted into."""
+        entry = self.items.pop(id(item), None)
+        if entry is None:
+            return False
+        for key in entry[1]:
+            bucket = self.cells[key]
+            # keep insertion order, so the first match a query finds does not
+            # depend on which neighbours were removed before a cell was filled
+            for i, other in enumerate(bucket):
+                if other is item:
+                    del bucket[i]
+                    break
+            if not bucket:
+                del self.cells[key]
+        return True
+
+    def query(self, x, y, r):
+        """Return the items in the cells overlapping the square of half-size r around (x, y)."""
+        cols, rows = self._cell_range(x - r, y - r, x + r, y + r)
+        cells = self.cells
+        if len(cols) == 1 and len(rows) == 1:
+            return list(cells.get((cols[0], rows[0]), ()))
+        found = []
+        seen = set()
+        for cx in cols:
+            for cy in rows:
+                for item in cells.get((cx, cy), ()):
+                    if id(item) not in seen:
+                        seen.add(id(item))
+                        found.append(item)
+        return found
+
+
+class Obstacles:
+    """Rocks, walls and trees indexed by SpatialGrid for local collision checks."""
+
+    def __init__(self, rocks=(), walls=(), trees=(), cell_size=GRID_CELL_SIZE):
+        # called with each rock or tree that is damaged or destroyed
+        self.listeners = []
+        for name, items, add in (('rocks', rocks, self.add_rock),
+                                 ('walls', walls, self.add_wall),
+                                 ('trees', trees, self.add_tree)):
+            # compiled map layers come with their own prebuilt index
+            grid = items.spatial_grid(cell_size) if hasattr(items, 'spatial_grid') else None
+            setattr(self, name, SpatialGrid(cell_size) if grid is None else grid)
+            if grid is None:
+                for item in items:
+                    add(item)
+
+    def add_rock(self, r):
+        self.rocks.insert(r, r['x'] - ROCK_RADIUS, r['y'] - ROCK_RADIUS,
+                          r['x'] + ROCK_RADIUS, r['y'] + ROCK_RADIUS)
+
+    def add_wall(self, w):
+        self.walls.insert(w, w['x'], w['y'], w['x'] + w['width'], w['y'] + w['height'])
+
+    def add_tree(self, t):
+        self.trees.insert(t, t['x'] - t['radius'], t['y'] - t['radius'],
+                          t['x'] + t['radius'], t['y'] + t['radius'])
+
+    def damage(self, grid, obj):
+        """Take one hp off a rock or tree; return True if that destroyed it."""
+        return self.set_hp(grid, obj, obj['hp'] - 1)
+
+    def set_hp(self, grid, obj, hp):
+        """Set a rock or tree's hp; return True if that destroyed it."""
+        obj['hp'] = hp
+        destroyed = hp <= 0
+        if destroyed:
+            grid.remove(obj)
+        for listener in self.listeners:
+            listener(obj)
+        return destroyed
+
+    def apply_changes(self, changes):
+        """Set the hp of the rocks and trees at [x, y, hp] positions, as a server reports them."""
+        for x, y, hp in changes:
+            for grid in (self.rocks, self.trees):
+                obj = next((o for o in grid.query(x, y, 0) if o['x'] == x and o['y'] == y), None)
+                if obj is not None:
+                    if obj['hp'] != hp:
+                        self.set_hp(grid, obj, hp)
+                    break
+
+    def rock_at(self, x, y, radius):
+        """Return the first rock overlapping a circle, or None."""
+        for r in self.rocks.query(x, y, radius):
+            if math.hypot(r['x'] - x, r['y'] - y) < ROCK_RADIUS + radius:
+                return r
+        return None
+
+    def wall_at(self, x, y, radius):
+        """Return the first wall overlapping a circle's bounding box, or None."""
+        for w in self.walls.query(x, y, radius):
+            if (x + radius > w['x'] and x - radius < w['x'] + w['width'] and
+                    y + radius > w['y'] and y - radius < w['y'] + w['height']):
+                return w
+        return None
+
+    def tree_at(self, x, y, radius, scale=1.0):
+        """Return the first tree whose radius * scale overlaps a circle, or None."""
+        for t in self.trees.query(x, y, radius):
+            if math.hypot(t['x'] - x, t['y'] - y) < t['radius'] * scale + radius:
+                return t
+        return None
+
+    def blocks(self, x, y, radius):
+        """True if a circle collides with a rock, wall or tree trunk."""
+        return (self.rock_at(x, y, radius) is not None or
+                self.wall_at(x, y, radius) is not None or
+                self.tree_at(x, y, radius, 0.25) is not None)
+
+
+class FlowField:
+    """Shortest-path directions towards one target around rocks and walls.
+
+    A Dijkstra search from the target's cell covers a window of FLOW_RANGE
+    cells on each side, and every cell points at the centre of its cheapest
+    neighbour, so steering a zombie is a single lookup however many there are.
+    Walking towards cell centres keeps zombies in the lanes that have
+    FLOW_CLEARANCE around obstacles. The field is rebuilt only when the target
+    moves to another cell, and a destroyed rock reopens its cells and relaxes
+    the distances around them in place. Which cells are blocked is cached for
+    the current window only, so a target roaming an endless world does not
+    grow the cache.
+    """
+
+    def __init__(self, obstacles, cell_size=FLOW_CELL_SIZE, reach=FLOW_RANGE):
+        self.obstacles = obstacles
+        self.cell_size = cell_size
+        self.reach = reach
+        # the window has a one cell border that is never walkable
+        self.stride = 2 * reach + 3
+        stride = self.stride
+        # (index offset, cost, offsets of the two cells a diagonal step passes)
+        self.steps = [(dy * stride + dx, 14 if dx and dy else 10,
+                       dx if dx and dy else 0, dy * stride if dx and dy else 0)
+                      for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+        self.straight = [offset for offset, _, side_a, _ in self.steps if not side_a]
+        self.diagonal = [(offset, side_a, side_b) for offset, _, side_a, side_b in self.steps if side_a]
+        self.blocked_cells = {}
+        self.target = None
+        self.origin = (0, 0)
+        self.dist = []
+        self.passable = []
+        self.waypoints = {}
+        obstacles.listeners.append(self._obstacle_changed)
+
+    def close(self):
+        self.obstacles.listeners.remove(self._obstacle_changed)
+
+    def _blocked(self, cx, cy):
+        blocked = self.blocked_cells.get((cx, cy))
+        if blocked is None:
+            x = (cx + 0.5) * self.cell_size
+            y = (cy + 0.5) * self.cell_size
+            blocked = (self.obstacles.rock_at(x, y, FLOW_CLEARANCE) is not None or
+                       self.obstacles.wall_at(x, y, FLOW_CLEARANCE) is not None)
+            self.blocked_cells[(cx, cy)] = blocked
+        return blocked
+
+    def _index(self, cx, cy):
+        """Flat window index of a cell, or None outside the searched window."""
+        x = cx - self.origin[0]
+        y = cy - self.origin[1]
+        if 0 < x < self.stride - 1 and 0 < y < self.stride - 1:
+            return y * self.stride + x
+        return None
+
+    def update(self, x, y):
+        """Follow a target at (x, y), rebuilding the field if it changed cell."""
+        size = self.cell_size
+        cell = (int(x // size), int(y // size))
+        if cell == self.target:
+            return
+        self.target = cell
+        stride = self.stride
+        x0 = cell[0] - self.reach - 1
+        y0 = cell[1] - self.reach - 1
+        self.origin = (x0, y0)
+        blocked = self._blocked
+        self.passable = passable = [0 < i < stride - 1 and 0 < j < stride - 1 and not blocked(x0 + i, y0 + j)
+                                    for j in range(stride) for i in range(stride)]
+        # the cells left behind are looked up again if the target comes back
+        self.blocked_cells = {(x0 + i, y0 + j): not passable[j * stride + i]
+                              for j in range(1, stride - 1) for i in range(1, stride - 1)}
+        self.dist = [math.inf] * (stride * stride)
+        start = self._index(*cell)
+        self.dist[start] = 0
+        self._relax([(0, start)])
+        self.waypoints = {}
+
+    def _relax(self, seeds):
+        """Dijkstra outwards from (distance, index) seeds, lowering dist where shorter.
+
+        Step costs are only 10 and 14, so a handful of distance buckets stand
+        in for a heap.
+        """
+        dist = self.dist
+        passable = self.passable
+        straight = self.straight
+        diagonal = self.diagonal
+        pending = {}
+        for d, k in seeds:
+            pending.setdefault(d, []).append(k)
+        while pending:
+            d = min(pending)
+            d10 = d + 10
+            d14 = d + 14
+            for k in pending.pop(d):
+                if d > dist[k]:
+                    continue
+                for offset in straight:
+                    n = k + offset
+                    if d10 < dist[n] and passable[n]:
+                        dist[n] = d10
+                        pending.setdefault(d10, []).append(n)
+                for offset, side_a, side_b in diagonal:
+                    n = k + offset
+                    # diagonal steps may not cut the corner of a blocked cell
+                    if d14 < dist[n] and passable[n] and passable[k + side_a] and passable[k + side_b]:
+                        dist[n] = d14
+                        pending.setdefault(d14, []).append(n)
+
+    def _obstacle_changed(self, obj):
+        if obj['hp'] > 0 or self.target is None:
+            return
+        size = self.cell_size
+        reach = obj.get('radius', ROCK_RADIUS) + FLOW_CLEARANCE
+        seeds = []
+        for cx in range(int((obj['x'] - reach) // size), int((obj['x'] + reach) // size) + 1):
+            for cy in range(int((obj['y'] - reach) // size), int((obj['y'] + reach) // size) + 1):
+                if not self.blocked_cells.pop((cx, cy), False) or self._blocked(cx, cy):
+                    continue
+                k = self._index(cx, cy)
+                if k is None:
+                    continue
+                self.passable[k] = True
+                # searching again from the neighbours covers the reopened cell and
+                # the diagonal steps its corner no longer blocks
+                seeds.extend(k + offset for offset, _, _, _ in self.steps)
+        if seeds:
+            self._relax([(self.dist[n], n) for n in set(seeds) if self.dist[n] < math.inf])
+            self.waypoints = {}
+
+    def _waypoint(self, k):
+        waypoint = self.waypoints.get(k, False)
+        if waypoint is False:
+            dist = self.dist
+            passable = self.passable
+            best = math.inf
+            waypoint = None
+            # zombies next to the target's cell head straight for it
+            if dist[k] > 14:
+                for offset, cost, side_a, side_b in self.steps:
+                    n = k + offset
+                    if side_a and passable[k] and not (passable[k + side_a] and passable[k + side_b]):
+                        continue
+                    if dist[n] + cost < best:
+                        best = dist[n] + cost
+                        waypoint = n
+            if waypoint is not None:
+                cy, cx = divmod(waypoint, self.stride)
+                waypoint = ((self.origin[0] + cx + 0.5) * self.cell_size,
+                            (self.origin[1] + cy + 0.5) * self.cell_size)
+            self.waypoints[k] = waypoint
+        return waypoint
+
+    def waypoint(self, x, y):
+        """Point a zombie at (x, y) should walk towards, or None to head straight for the target."""
+        size = self.cell_size
+        k = self._index(int(x // size), int(y // size))
+        return None if k is None else self._waypoint(k)
 
 
 def load_map(path):
-    """Load map data from JSON file if available."""
+    """Load map data from JSON file if available.
+
+    A ``.zsmap`` file from map_compiler.py is memory-mapped instead, and so is
+    the compiled copy of a JSON map while it is up to date.
+    """
     if not path or not os.path.exists(path):
         return [], [], [], {'x': WORLD_WIDTH // 2, 'y': WORLD_HEIGHT // 2}
 
+    import map_compiler
+    if path.endswith(map_compiler.EXTENSION):
+        return map_compiler.load(path)
+    if map_compiler.is_fresh(path):
+        return map_compiler.load(map_compiler.compiled_path(path))
+
     with open(path, 'r') as f:
         data = json.load(f)
 
@@ -108,24 +829,24 @@ def load_map(path):
     return rocks, walls, trees, player_start
 
 
-def spawn_world_objects():
+def spawn_world_objects(rng=random):
     """Generate random world objects similar to the JS version."""
     rocks = [{
-        'x': random.random() * WORLD_WIDTH,
-        'y': random.random() * WORLD_HEIGHT,
+        'x': rng.random() * WORLD_WIDTH,
+        'y': rng.random() * WORLD_HEIGHT,
         'hp': 8
     } for _ in range(300)]
 
     walls = [{
-        'x': random.random() * WORLD_WIDTH,
-        'y': random.random() * WORLD_HEIGHT,
-        'width': 200 if random.random() > 0.5 else 40,
-        'height': 40 if random.random() > 0.5 else 200
+        'x': rng.random() * WORLD_WIDTH,
+        'y': rng.random() * WORLD_HEIGHT,
+        'width': 200 if rng.random() > 0.5 else 40,
+        'height': 40 if rng.random() > 0.5 else 200
     } for _ in range(50)]
 
     trees = [{
-        'x': random.random() * WORLD_WIDTH,
-        'y': random.random() * WORLD_HEIGHT,
+        'x': rng.random() * WORLD_WIDTH,
+        'y': rng.random() * WORLD_HEIGHT,
         'radius': 240,
         'hp': 5
     } for _ in range(200)]
@@ -133,63 +854,229 @@ def spawn_world_objects():
     return rocks, walls, trees
 
 
-def main(map_path=None):
-    pygame.init()
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    clock = pygame.time.Clock()
+def find_bullet_hits(enemies, bullets):
+    """Return (enemy index, bullet index) hits found through a per-tick hash grid.
 
-    # Load map
-    rocks, walls, trees, player_start = load_map(map_path)
-    if not rocks and not walls and not trees:
-        rocks, walls, trees = spawn_world_objects()
-
-    player = {
-        'x': player_start['x'],
-        'y': player_start['y'],
-        'radius': 20,
-        'hp': 100,
-        'angle': 0
-    }
+    Each zombie takes the earliest bullet touching it that no earlier zombie
+    has used, exactly like find_bullet_hits_brute().
+    """
+    if not enemies or not bullets:
+        return []
+    size = max(e['radius'] for e in enemies) + 4
+    grid = {}
+    for i, b in enumerate(bullets):
+        grid.setdefault((int(b['x'] // size), int(b['y'] // size)), []).append(i)
 
-    bullets = []
-    enemies = []
+    spent = set()
+    hits = []
+    for ei, e in enumerate(enemies):
+        cx = int(e['x'] // size)
+        cy = int(e['y'] // size)
+        reach = e['radius'] + 4
+        best = None
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                for bi in grid.get((gx, gy), ()):
+                    if (best is None or bi < best) and bi not in spent:
+                        b = bullets[bi]
+                        if math.hypot(e['x'] - b['x'], e['y'] - b['y']) < reach:
+                            best = bi
+        if best is not None:
+            spent.add(best)
+            hits.append((ei, best))
+    return hits
 
-    last_shot = 0
-    bullets_fired = 0
-    is_reloading = False
-    reload_timer = 0
 
-    wave = 1
-    zombies_killed = 0
-    zombies_to_next_wave = random.randint(10, 15)
-    score = 0
-    game_over = False
-    spawn_timer = 0
+def find_bullet_hits_brute(enemies, bullets):
+    """Reference O(enemies x bullets) version of find_bullet_hits()."""
+    spent = set()
+    hits = []
+    for ei, e in enumerate(enemies):
+        for bi, b in enumerate(bullets):
+            if bi not in spent and math.hypot(e['x'] - b['x'], e['y'] - b['y']) < e['radius'] + 4:
+                spent.add(bi)
+                hits.append((ei, bi))
+                break
+    return hits
 
-    other_players = {}
-    net = WebSocketClient()
-    try:
-        net.connect()
-    except Exception as e:
-        print("Network disabled:", e)
-        net = None
-    def spawn_enemy():
+
+class World:
+    """Headless game state and rules; main() only feeds it input and draws it.
+
+    ``step(dt, inputs)`` advances the simulation by ``dt`` milliseconds;
+    movement is scaled so a step of ``TICK_MS`` moves things by their speed.
+    ``inputs`` is a dict with optional ``up``/``down``/``left``/``right``/``fire``
+    flags and the aim ``angle`` in radians.
+    """
+
+    def __init__(self, rocks=(), walls=(), trees=(), player_start=None, rng=None):
+        self.rng = rng or random.Random()
+        self.obstacles = Obstacles(rocks, walls, trees)
+        # (x0, y0, x1, y1) of the playing field, or None for an endless world
+        self.bounds = (0, 0, WORLD_WIDTH, WORLD_HEIGHT)
+        # how from_map() built the terrain, so a client can build the same one
+        self.map_path = None
+        self.seed = None
+        start = player_start or {'x': WORLD_WIDTH // 2, 'y': WORLD_HEIGHT // 2}
+        self.player = {
+            'x': start['x'],
+            'y': start['y'],
+            'radius': 20,
+            'hp': 100,
+            'angle': 0
+        }
+        self.bullets = []
+        self.enemies = []
+        self.next_id = 1
+        # FlowField per chased player, keyed by id() of the player dict
+        self.flow_fields = {}
+
+        self.time = 0
+        # fraction of a TICK_MS covered by the current step
+        self.motion = 1.0
+        self.last_shot = 0
+        self.bullets_fired = 0
+        self.is_reloading = False
+        self.reload_timer = 0
+
+        self.wave = 1
+        self.zombies_killed = 0
+        self.zombies_to_next_wave = self.rng.randint(10, 15)
+        self.score = 0
+        self.game_over = False
+        self.spawn_timer = 0
+        self.spawn_interval = SPAWN_INTERVAL
+
+    @classmethod
+    def from_map(cls, map_path=None, rng=None, endless=False, seed=None):
+        """Build a world from a map file, or a random one if it has no objects.
+
+        Random worlds are generated chunk by chunk around the player by
+        world_chunks.py from ``seed``, drawn from rng if not given;
+        ``endless`` lifts their edges.
+        """
+        import world_chunks
+        rng = rng or random.Random()
+        rocks, walls, trees, player_start = load_map(map_path)
+        endless = endless and not (rocks or walls or trees)
+        generated = not rocks and not walls and not trees
+        if generated:
+            if seed is None:
+                seed = rng.getrandbits(64)
+            bounds = None if endless else world_chunks.WORLD_BOUNDS
+            rocks, walls, trees = world_chunks.chunked_layers(seed, bounds)
+        world = cls(rocks, walls, trees, player_start, rng)
+        world.map_path = map_path
+        if generated:
+            world.seed = seed
+        if endless:
+            world.bounds = None
+        return world
+
+    def restart(self):
+        self.player['hp'] = 100
+        self.player['x'] = WORLD_WIDTH // 2
+        self.player['y'] = WORLD_HEIGHT // 2
+        self.score = 0
+        self.bullets = []
+        self.enemies = []
+        self.game_over = False
+        self.wave = 1
+        self.zombies_killed = 0
+        self.zombies_to_next_wave = self.rng.randint(10, 15)
+
+    def step(self, dt, inputs=None):
+        inputs = inputs or {}
+        self.time += dt
+        self.motion = dt / TICK_MS
+        self.player['angle'] = inputs.get('angle', self.player['angle'])
+        if self.game_over:
+            return
+        self.update_player(dt, inputs)
+        self.update_world(dt)
+
+    def update_player(self, dt, inputs):
+        """Move the player and run their gun for one step."""
+        self.move_player(inputs)
+        if inputs.get('fire'):
+            self.fire()
+
+        if self.is_reloading:
+            self.reload_timer -= dt
+            if self.reload_timer <= 0:
+                self.is_reloading = False
+                self.bullets_fired = 0
+
+    def update_world(self, dt):
+        """Advance bullets, spawning and zombies for one step."""
+        self.update_bullets()
+
+        self.spawn_timer += dt
+        if self.spawn_timer >= self.spawn_delay():
+            self.spawn_timer = 0
+            self.spawn_enemy()
+
+        self.update_enemies()
+
+    def is_blocked(self, x, y):
+        return self.obstacles.blocks(x, y, self.player['radius'])
+
+    def move_player(self, inputs):
+        player = self.player
+        speed = PLAYER_SPEED * self.motion
+        new_x = player['x']
+        new_y = player['y']
+        if inputs.get('up'):
+            new_y -= speed
+        if inputs.get('down'):
+            new_y += speed
+        if inputs.get('left'):
+            new_x -= speed
+        if inputs.get('right'):
+            new_x += speed
+
+        if not self.is_blocked(new_x, player['y']):
+            player['x'] = new_x
+        if not self.is_blocked(player['x'], new_y):
+            player['y'] = new_y
+
+    def fire(self):
+        if self.is_reloading or self.time - self.last_shot < FIRE_RATE:
+            return
+        player = self.player
+        muzzle_x = player['x'] + math.cos(player['angle']) * (player['radius'] + 15)
+        muzzle_y = player['y'] + math.sin(player['angle']) * (player['radius'] + 15)
+        self.add_bullet({
+            'x': muzzle_x,
+            'y': muzzle_y,
+            'dx': math.cos(player['angle']) * BULLET_SPEED,
+            'dy': math.sin(player['angle']) * BULLET_SPEED
+        })
+        self.last_shot = self.time
+        self.bullets_fired += 1
+        if self.bullets_fired >= MAGAZINE_SIZE:
+            self.is_reloading = True
+            self.reload_timer = RELOAD_TIME
+
+    def spawn_enemy(self):
+        rng = self.rng
+        player = self.player
         buffer = 400
-        side = random.randint(0, 3)
+        side = rng.randint(0, 3)
         if side == 0:
-            x = player['x'] + random.random() * SCREEN_WIDTH - SCREEN_WIDTH / 2
+            x = player['x'] + rng.random() * SCREEN_WIDTH - SCREEN_WIDTH / 2
             y = player['y'] - buffer
         elif side == 1:
             x = player['x'] + buffer
-            y = player['y'] + random.random() * SCREEN_HEIGHT - SCREEN_HEIGHT / 2
+            y = player['y'] + rng.random() * SCREEN_HEIGHT - SCREEN_HEIGHT / 2
         elif side == 2:
-            x = player['x'] + random.random() * SCREEN_WIDTH - SCREEN_WIDTH / 2
+            x = player['x'] + rng.random() * SCREEN_WIDTH - SCREEN_WIDTH / 2
             y = player['y'] + buffer
         else:
             x = player['x'] - buffer
-            y = player['y'] + random.random() * SCREEN_HEIGHT - SCREEN_HEIGHT / 2
+            y = player['y'] + rng.random() * SCREEN_HEIGHT - SCREEN_HEIGHT / 2
 
-        r = random.random()
+        r = rng.random()
         if r < 0.6:
             enemy = {'x': x, 'y': y, 'radius': 25, 'speed': 1.0, 'hp': 1}
         elif r < 0.85:
@@ -198,255 +1085,670 @@ def main(map_path=None):
             enemy = {'x': x, 'y': y, 'radius': 40, 'speed': 3.0, 'hp': 0.5}
         else:
             enemy = {'x': x, 'y': y, 'radius': 35, 'speed': 0.6, 'hp': 3}
-        enemies.append(enemy)
-
-    def is_blocked(x, y):
-        for r in rocks:
-            d = math.hypot(r['x'] - x, r['y'] - y)
-            if d < ROCK_RADIUS + player['radius']:
-                return True
-        for w in walls:
-            if (x + player['radius'] > w['x'] and x - player['radius'] < w['x'] + w['width'] and
-                    y + player['radius'] > w['y'] and y - player['radius'] < w['y'] + w['height']):
-                return True
-        for t in trees:
-            d = math.hypot(t['x'] - x, t['y'] - y)
-            if d < t['radius'] * 0.25 + player['radius']:
-                return True
-        return False
+        self.add_enemy(enemy)
+        return enemy
 
-    running = True
-    while running:
-        dt = clock.tick(60)
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == pygame.KEYDOWN and event.key == pygame.K_r and game_over:
-                # restart
-                player['hp'] = 100
-                player['x'] = WORLD_WIDTH // 2
-                player['y'] = WORLD_HEIGHT // 2
-                score = 0
-                bullets.clear()
-                enemies.clear()
-                game_over = False
-                wave = 1
-                zombies_killed = 0
-                zombies_to_next_wave = random.randint(10, 15)
-
-        keys = pygame.key.get_pressed()
-        mx, my = pygame.mouse.get_pos()
-        player['angle'] = math.atan2(my - SCREEN_HEIGHT / 2, mx - SCREEN_WIDTH / 2)
+    def new_id(self):
+        """Return a fresh id for a bullet or zombie."""
+        eid = self.next_id
+        self.next_id += 1
+        return eid
 
-        if net:
-            net.send({"type": "state", "player": player, "bullets": bullets, "zombies": enemies})
-            msg = net.recv()
-            if msg and msg.get("type") == "world":
-                other_players = msg["world"]["players"]
-                enemies = msg["world"]["zombies"]
-                bullets = msg["world"]["bullets"]
-                if net.id is None:
-                    net.id = msg["id"]
-        if not game_over:
-            new_x = player['x']
-            new_y = player['y']
-            if keys[pygame.K_w]:
-                new_y -= PLAYER_SPEED
-            if keys[pygame.K_s]:
-                new_y += PLAYER_SPEED
-            if keys[pygame.K_a]:
-                new_x -= PLAYER_SPEED
-            if keys[pygame.K_d]:
-                new_x += PLAYER_SPEED
-
-            if not is_blocked(new_x, player['y']):
-                player['x'] = new_x
-            if not is_blocked(player['x'], new_y):
-                player['y'] = new_y
-
-            if pygame.mouse.get_pressed()[0]:
-                now = pygame.time.get_ticks()
-                if not is_reloading and now - last_shot >= FIRE_RATE:
-                    muzzle_x = player['x'] + math.cos(player['angle']) * (player['radius'] + 15)
-                    muzzle_y = player['y'] + math.sin(player['angle']) * (player['radius'] + 15)
-                    bullets.append({
-                        'x': muzzle_x,
-                        'y': muzzle_y,
-                        'dx': math.cos(player['angle']) * BULLET_SPEED,
-                        'dy': math.sin(player['angle']) * BULLET_SPEED
-                    })
-                    last_shot = now
-                    bullets_fired += 1
-                    if bullets_fired >= MAGAZINE_SIZE:
-                        is_reloading = True
-                        reload_timer = RELOAD_TIME
-
-            if is_reloading:
-                reload_timer -= dt
-                if reload_timer <= 0:
-                    is_reloading = False
-                    bullets_fired = 0
-
-            # update bullets
-            for b in bullets[:]:
-                b['x'] += b['dx']
-                b['y'] += b['dy']
-                if b['x'] < -1000 or b['x'] > WORLD_WIDTH + 1000 or b['y'] < -1000 or b['y'] > WORLD_HEIGHT + 1000:
-                    bullets.remove(b)
-                    continue
-                hit = False
-                for r in rocks:
-                    if math.hypot(r['x'] - b['x'], r['y'] - b['y']) < ROCK_RADIUS + 4:
-                        r['hp'] -= 1
-                        bullets.remove(b)
-                        if r['hp'] <= 0:
-                            rocks.remove(r)
-                        hit = True
-                        break
-                if hit:
-                    continue
-                for t in trees:
-                    if math.hypot(t['x'] - b['x'], t['y'] - b['y']) < t['radius'] + 4:
-                        t['hp'] -= 1
-                        bullets.remove(b)
-                        if t['hp'] <= 0:
-                            trees.remove(t)
-                        hit = True
-                        break
-
-            # update enemies
-            spawn_timer += dt
-            if spawn_timer >= 1000:
-                spawn_timer = 0
-                spawn_enemy()
-
-            for e in enemies[:]:
-                dx = player['x'] - e['x']
-                dy = player['y'] - e['y']
-                dist = math.hypot(dx, dy)
-                blocked = False
-                for r in rocks:
-                    if math.hypot(e['x'] - r['x'], e['y'] - r['y']) < e['radius'] + ROCK_RADIUS:
-                        blocked = True
-                        break
-                for w in walls:
-                    if (e['x'] + e['radius'] > w['x'] and e['x'] - e['radius'] < w['x'] + w['width'] and
-                            e['y'] + e['radius'] > w['y'] and e['y'] - e['radius'] < w['y'] + w['height']):
-                        blocked = True
-                        break
-                if not blocked and dist > 0:
-                    e['x'] += (dx / dist) * e['speed']
-                    e['y'] += (dy / dist) * e['speed']
-
-                if dist < e['radius'] + player['radius']:
-                    enemies.remove(e)
-                    player['hp'] -= 10
-                    if player['hp'] <= 0:
-                        game_over = True
-                    continue
+    def add_bullet(self, b):
+        if 'id' not in b:
+            b['id'] = self.new_id()
+        self.bullets.append(b)
+
+    def add_enemy(self, e):
+        if 'id' not in e:
+            e['id'] = self.new_id()
+        self.enemies.append(e)
 
-                for b in bullets[:]:
-                    if math.hypot(e['x'] - b['x'], e['y'] - b['y']) < e['radius'] + 4:
-                        e['hp'] -= 1
-                        bullets.remove(b)
-                        if e['hp'] <= 0:
-                            enemies.remove(e)
-                            score += 10
-                            zombies_killed += 1
-                            if zombies_killed >= zombies_to_next_wave:
-                                wave += 1
-                                zombies_killed = 0
-                                zombies_to_next_wave = random.randint(10, 15)
-                        break
-
-        camera_x = player['x'] - SCREEN_WIDTH // 2
-        camera_y = player['y'] - SCREEN_HEIGHT // 2
-        screen.fill((34, 165, 47))
-
-        # Draw world bounds background
-        map_left = max(0, -camera_x)
-        map_top = max(0, -camera_y)
-        map_right = min(WORLD_WIDTH - camera_x, SCREEN_WIDTH)
-        map_bottom = min(WORLD_HEIGHT - camera_y, SCREEN_HEIGHT)
-        pygame.draw.rect(screen, (34, 165, 47), (map_left, map_top, map_right - map_left, map_bottom - map_top))
-
-        for t in trees:
-            tx = t['x'] - camera_x
-            ty = t['y'] - camera_y
-            # canopy
-            pygame.draw.circle(screen, (34, 139, 34), (int(tx), int(ty)), int(t['radius']), 0)
-            # trunk
-            pygame.draw.circle(screen, (92, 64, 51), (int(tx), int(ty)), int(t['radius'] * 0.25))
-
-        for w in walls:
-            rect = pygame.Rect(w['x'] - camera_x, w['y'] - camera_y, w['width'], w['height'])
-            pygame.draw.rect(screen, (139, 90, 43), rect)
-            pygame.draw.rect(screen, (0, 0, 0), rect, 1)
-
-        for r in rocks:
-            pygame.draw.circle(screen, (100, 100, 100), (int(r['x'] - camera_x), int(r['y'] - camera_y)), ROCK_RADIUS)
-            pygame.draw.circle(screen, (0, 0, 0), (int(r['x'] - camera_x), int(r['y'] - camera_y)), ROCK_RADIUS, 1)
-
-        for b in bullets:
-            pygame.draw.circle(screen, (255, 165, 0), (int(b['x'] - camera_x), int(b['y'] - camera_y)), 4)
-        for pid, p in other_players.items():
-            if net and net.id == int(pid):
+    def positions(self, kind):
+        """Return the 'bullets' or 'enemies' positions on_screen() blends from: {id: (x, y)}."""
+        return {e['id']: (e['x'], e['y']) for e in getattr(self, kind) if 'id' in e}
+
+    def on_screen(self, kind, previous, alpha, camera_x, camera_y):
+        """Yield (entity, x, y) for the 'bullets' or 'enemies' in view of the camera.
+
+        Positions are blended from ``previous``, a positions() result or None,
+        by ``alpha``; entities are culled by their radius, 4 for bullets.
+        """
+        for item, x, y in _blend(getattr(self, kind), previous or {}, alpha):
+            if _on_screen(x, y, item.get('radius', 4), camera_x, camera_y):
+                yield item, x, y
+
+    def bullet_area(self):
+        """The box (x0, y0, x1, y1) outside which bullets are dropped."""
+        if self.bounds is None:
+            x, y = self.player['x'], self.player['y']
+            return x - BULLET_RANGE, y - BULLET_RANGE, x + BULLET_RANGE, y + BULLET_RANGE
+        x0, y0, x1, y1 = self.bounds
+        return x0 - 1000, y0 - 1000, x1 + 1000, y1 + 1000
+
+    def update_bullets(self):
+        obstacles = self.obstacles
+        bullets = self.bullets
+        motion = self.motion
+        x0, y0, x1, y1 = self.bullet_area()
+        for b in bullets[:]:
+            b['x'] += b['dx'] * motion
+            b['y'] += b['dy'] * motion
+            if b['x'] < x0 or b['x'] > x1 or b['y'] < y0 or b['y'] > y1:
+                bullets.remove(b)
                 continue
-            pygame.draw.circle(screen, (0, 0, 255), (int(p["x"] - camera_x), int(p["y"] - camera_y)), player["radius"])
-
-        for e in enemies:
-            color = (0, 255, 0)
-            if e['speed'] > 1.5 and e['radius'] <= 20:
-                color = (255, 255, 0)
-            elif e['radius'] >= 35 and e['speed'] < 1:
-                color = (128, 0, 128)
-            elif e['radius'] >= 40:
-                color = (255, 255, 255)
-            pygame.draw.circle(screen, color, (int(e['x'] - camera_x), int(e['y'] - camera_y)), int(e['radius']))
-            pygame.draw.circle(screen, (0, 0, 0), (int(e['x'] - camera_x), int(e['y'] - camera_y)), int(e['radius']), 1)
+            r = obstacles.rock_at(b['x'], b['y'], 4)
+            if r is not None:
+                obstacles.damage(obstacles.rocks, r)
+                bullets.remove(b)
+                continue
+            t = obstacles.tree_at(b['x'], b['y'], 4)
+            if t is not None:
+                obstacles.damage(obstacles.trees, t)
+                bullets.remove(b)
+
+    def target_for(self, e):
+        """Return the player a zombie chases."""
+        return self.player
+
+    def hurt_player(self, player):
+        """Apply a zombie's contact damage to a player."""
+        player['hp'] -= 10
+        if player['hp'] <= 0:
+            self.game_over = True
+
+    def flow_field(self, player):
+        """Return the FlowField leading to player, following where they stand now."""
+        field = self.flow_fields.get(id(player))
+        if field is None:
+            field = self.flow_fields[id(player)] = FlowField(self.obstacles)
+        field.update(player['x'], player['y'])
+        return field
+
+    def enemy_blocked(self, x, y, radius):
+        """True if a zombie at (x, y) would overlap a rock or wall."""
+        obstacles = self.obstacles
+        return (obstacles.rock_at(x, y, radius) is not None or
+                obstacles.wall_at(x, y, radius) is not None)
+
+    def move_enemy(self, e, x, y):
+        """Move a zombie to (x, y), sliding along any rock or wall in the way."""
+        r = e['radius']
+        # a zombie already overlapping something is let through so it cannot get stuck
+        if not self.enemy_blocked(x, y, r) or self.enemy_blocked(e['x'], e['y'], r):
+            e['x'] = x
+            e['y'] = y
+        elif not self.enemy_blocked(x, e['y'], r):
+            e['x'] = x
+        elif not self.enemy_blocked(e['x'], y, r):
+            e['y'] = y
+
+    def update_enemies(self):
+        fields = {}
+        survivors = []
+        motion = self.motion
+        for e in self.enemies:
+            player = self.target_for(e)
+            field = fields.get(id(player))
+            if field is None:
+                field = fields[id(player)] = self.flow_field(player)
+            dx = player['x'] - e['x']
+            dy = player['y'] - e['y']
+            dist = math.hypot(dx, dy)
+            if dist > 0:
+                waypoint = field.waypoint(e['x'], e['y'])
+                reach = 0
+                if waypoint is not None:
+                    wx = waypoint[0] - e['x']
+                    wy = waypoint[1] - e['y']
+                    reach = math.hypot(wx, wy)
+                if reach > 0:
+                    dx, dy = wx, wy
+                    step = e['speed'] * motion / reach
+                else:
+                    # no waypoint, or standing right on it: head straight for the player
+                    step = e['speed'] * motion / dist
+                self.move_enemy(e, e['x'] + dx * step, e['y'] + dy * step)
+
+            if dist < e['radius'] + player['radius']:
+                self.hurt_player(player)
+                continue
+            survivors.append(e)
+
+        hits = find_bullet_hits(survivors, self.bullets)
+        if hits:
+            spent = set()
+            killed = set()
+            for ei, bi in hits:
+                e = survivors[ei]
+                e['hp'] -= 1
+                spent.add(bi)
+                if e['hp'] <= 0:
+                    killed.add(ei)
+                    self.kill_enemy()
+            self.bullets = [b for i, b in enumerate(self.bullets) if i not in spent]
+            survivors = [e for i, e in enumerate(survivors) if i not in killed]
+        self.enemies = survivors
+
+    def spawn_delay(self):
+        """Milliseconds between zombie spawns in the current wave."""
+        return max(MIN_SPAWN_INTERVAL, self.spawn_interval * WAVE_SPAWN_SCALE ** (self.wave - 1))
+
+    def kill_enemy(self):
+        """Score a zombie kill and advance the wave when enough have died."""
+        self.score += 10
+        self.zombies_killed += 1
+        if self.zombies_killed >= self.zombies_to_next_wave:
+            self.advance_wave()
+
+    def advance_wave(self):
+        """Start the next wave, which spawns zombies faster."""
+        self.wave += 1
+        self.zombies_killed = 0
+        self.zombies_to_next_wave = self.rng.randint(10, 15)
+
+
+def read_inputs():
+    """Sample keyboard and mouse into a World.step() inputs dict."""
+    keys = pygame.key.get_pressed()
+    mx, my = pygame.mouse.get_pos()
+    return {
+        'up': keys[pygame.K_w],
+        'down': keys[pygame.K_s],
+        'left': keys[pygame.K_a],
+        'right': keys[pygame.K_d],
+        'fire': pygame.mouse.get_pressed()[0],
+        'angle': math.atan2(my - SCREEN_HEIGHT / 2, mx - SCREEN_WIDTH / 2)
+    }
+
+
+TERRAIN_CHUNK_SIZE = 512
+TERRAIN_CACHE_CHUNKS = 16
+
+
+def _draw_tree(surface, t, ox, oy):
+    tx = int(t['x'] - ox)
+    ty = int(t['y'] - oy)
+    # canopy
+    pygame.draw.circle(surface, (34, 139, 34), (tx, ty), int(t['radius']), 0)
+    # trunk
+    pygame.draw.circle(surface, (92, 64, 51), (tx, ty), int(t['radius'] * 0.25))
+
+
+def _draw_wall(surface, w, ox, oy):
+    rect = pygame.Rect(w['x'] - ox, w['y'] - oy, w['width'], w['height'])
+    pygame.draw.rect(surface, (139, 90, 43), rect)
+    pygame.draw.rect(surface, (0, 0, 0), rect, 1)
+
+
+def _draw_rock(surface, r, ox, oy):
+    center = (int(r['x'] - ox), int(r['y'] - oy))
+    pygame.draw.circle(surface, (100, 100, 100), center, ROCK_RADIUS)
+    pygame.draw.circle(surface, (0, 0, 0), center, ROCK_RADIUS, 1)
+
+
+class TerrainCache:
+    """Trees, walls and rocks pre-rendered into world-chunk Surfaces.
+
+    Chunks are built on first sight, kept in a small LRU and dropped when an
+    obstacle overlapping them is damaged or destroyed, so a frame only blits
+    the handful of chunks under the camera however many objects the map has.
+    """
+
+    def __init__(self, obstacles, chunk_size=TERRAIN_CHUNK_SIZE, max_chunks=TERRAIN_CACHE_CHUNKS):
+        self.obstacles = obstacles
+        self.chunk_size = chunk_size
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()
+        obstacles.listeners.append(self.invalidate)
+
+    def invalidate(self, obj):
+        """Forget the chunks an obstacle's bounds overlap."""
+        if 'width' in obj:
+            x0, y0 = obj['x'], obj['y']
+            x1, y1 = x0 + obj['width'], y0 + obj['height']
+        else:
+            reach = obj.get('radius', ROCK_RADIUS)
+            x0, y0 = obj['x'] - reach, obj['y'] - reach
+            x1, y1 = obj['x'] + reach, obj['y'] + reach
+        size = self.chunk_size
+        for cx in range(int(x0 // size), int(x1 // size) + 1):
+            for cy in range(int(y0 // size), int(y1 // size) + 1):
+                self.chunks.pop((cx, cy), None)
+
+    def _render_chunk(self, cx, cy):
+        size = self.chunk_size
+        surface = pygame.Surface((size, size))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        surface.fill((34, 165, 47))
+        ox = cx * size
+        oy = cy * size
+        half = size / 2
+        center_x = ox + half
+        center_y = oy + half
+        # sort so objects straddling chunk edges stack the same way on both sides
+        layers = ((self.obstacles.trees, _draw_tree),
+                  (self.obstacles.walls, _draw_wall),
+                  (self.obstacles.rocks, _draw_rock))
+        for grid, draw in layers:
+            for obj in sorted(grid.query(center_x, center_y, half), key=lambda o: (o['y'], o['x'])):
+                draw(surface, obj, ox, oy)
+        return surface
+
+    def draw(self, screen, camera_x, camera_y):
+        size = self.chunk_size
+        chunks = self.chunks
+        for cx in range(int(camera_x // size), int((camera_x + SCREEN_WIDTH) // size) + 1):
+            for cy in range(int(camera_y // size), int((camera_y + SCREEN_HEIGHT) // size) + 1):
+                key = (cx, cy)
+                surface = chunks.get(key)
+                if surface is None:
+                    surface = chunks[key] = self._render_chunk(cx, cy)
+                    if len(chunks) > self.max_chunks:
+                        chunks.popitem(last=False)
+                else:
+                    chunks.move_to_end(key)
+                screen.blit(surface, (round(cx * size - camera_x), round(cy * size - camera_y)))
+
+
+GUN_ANGLE_STEPS = 128
+TEXT_CACHE_SIZE = 64
+OVERLAY_REFRESH = 250  # milliseconds between profiler overlay updates
+
+
+def zombie_color(e):
+    """Pick the body colour that identifies a zombie archetype."""
+    if e['speed'] > 1.5 and e['radius'] <= 20:
+        return (255, 255, 0)
+    elif e['radius'] >= 35 and e['speed'] < 1:
+        return (128, 0, 128)
+    elif e['radius'] >= 40:
+        return (255, 255, 255)
+    return (0, 255, 0)
+
+
+class RenderAssets:
+    """Fonts, HUD text and sprites built once and reused every frame."""
+
+    def __init__(self):
+        self.font = pygame.font.SysFont(None, 24)
+        self.big_font = pygame.font.SysFont(None, 48)
+        self.small_font = pygame.font.SysFont("monospace", 12)
+        self.texts = OrderedDict()  # least recently drawn first
+        self.sprites = {}
+        self.guns = [self._make_gun(i * 360 / GUN_ANGLE_STEPS) for i in range(GUN_ANGLE_STEPS)]
+
+    @staticmethod
+    def _make_gun(degrees):
+        gun_surf = pygame.Surface((30, 10), pygame.SRCALPHA)
+        pygame.draw.rect(gun_surf, (0, 0, 0), gun_surf.get_rect(), border_radius=4)
+        return pygame.transform.rotate(gun_surf, -degrees)
+
+    def text(self, value, color=(255, 255, 255), big=False):
+        """Return the rendered Surface for a string, memoized by value.
+
+        The least recently drawn string is dropped when the cache is full,
+        so a changing score does not push out the labels drawn every frame.
+        """
+        key = (value, color, big)
+        texts = self.texts
+        surf = texts.get(key)
+        if surf is None:
+            if len(texts) >= TEXT_CACHE_SIZE:
+                texts.popitem(last=False)
+            font = self.big_font if big else self.font
+            surf = texts[key] = font.render(value, True, color)
+        else:
+            texts.move_to_end(key)
+        return surf
+
+    def gun(self, angle):
+        """Return the gun sprite pre-rotated to the nearest quantized angle."""
+        step = round(angle / (2 * math.pi) * GUN_ANGLE_STEPS) % GUN_ANGLE_STEPS
+        return self.guns[step]
+
+    def circle(self, radius, color, outline=0):
+        """Return a circle sprite centred at (radius, radius)."""
+        key = (radius, color, outline)
+        surf = self.sprites.get(key)
+        if surf is None:
+            surf = pygame.Surface((radius * 2 + 1, radius * 2 + 1), pygame.SRCALPHA)
+            pygame.draw.circle(surf, color, (radius, radius), radius)
+            if outline:
+                pygame.draw.circle(surf, (0, 0, 0), (radius, radius), radius, outline)
+            self.sprites[key] = surf
+        return surf
+
+    def zombie(self, e):
+        """Return the outlined sprite for a zombie's archetype."""
+        return self.circle(int(e['radius']), zombie_color(e), 1)
+
+
+def _blend(items, previous, alpha):
+    """Yield (item, x, y), moved back towards the item's previous-tick position by 1 - alpha."""
+    for item in items:
+        x, y = item['x'], item['y']
+        before = previous.get(item.get('id'))
+        if before is not None:
+            x = before[0] + (x - before[0]) * alpha
+            y = before[1] + (y - before[1]) * alpha
+        yield item, x, y
+
+
+def _on_screen(x, y, radius, camera_x, camera_y):
+    return (camera_x - radius <= x <= camera_x + SCREEN_WIDTH + radius and
+            camera_y - radius <= y <= camera_y + SCREEN_HEIGHT + radius)
+
+
+class Renderer:
+    """Draws a World around its player plus the HUD.
+
+    Call ``remember()`` before each simulation step; ``draw(alpha=...)`` then
+    places the player, bullets and zombies that fraction of the way from
+    their previous to their current positions. With a ``profiler`` set each
+    layer is timed as its own phase.
+    """
+
+    def __init__(self, screen, world, profiler=None):
+        self.screen = screen
+        self.world = world
+        self.terrain = TerrainCache(world.obstacles)
+        self.assets = RenderAssets()
+        self.previous = None
+        self.profiler = profiler
+        self.show_profile = False
+        self.overlay = []
+        self.overlay_due = 0
+
+    def remember(self):
+        """Record the positions the next draw() interpolates from."""
+        world = self.world
+        self.previous = ((world.player['x'], world.player['y']),
+                         world.positions('bullets'), world.positions('enemies'))
+
+    def draw(self, other_players=None, own_id=None, alpha=1.0):
+        screen = self.screen
+        world = self.world
+        player = world.player
+        prof = self.profiler
+        px, py = player['x'], player['y']
+        if self.previous is None or alpha >= 1:
+            bullets_before = enemies_before = None
+        else:
+            (ox, oy), bullets_before, enemies_before = self.previous
+            px = ox + (px - ox) * alpha
+            py = oy + (py - oy) * alpha
+        camera_x = px - SCREEN_WIDTH // 2
+        camera_y = py - SCREEN_HEIGHT // 2
+        self.terrain.draw(screen, camera_x, camera_y)
+        if prof:
+            prof.lap('render.terrain')
+
+        assets = self.assets
+        bullet = assets.circle(4, (255, 165, 0))
+        screen.blits([(bullet, (int(x - camera_x) - 4, int(y - camera_y) - 4))
+                      for _, x, y in world.on_screen('bullets', bullets_before, alpha, camera_x, camera_y)],
+                     False)
+        if prof:
+            prof.lap('render.bullets')
+        other_players = other_players or {}
+        other = assets.circle(player['radius'], (0, 0, 255))
+        screen.blits([(other, (int(p["x"] - camera_x) - player['radius'], int(p["y"] - camera_y) - player['radius']))
+                      for pid, p in other_players.items()
+                      if own_id != int(pid) and _on_screen(p["x"], p["y"], player["radius"], camera_x, camera_y)],
+                     False)
+        if prof:
+            prof.lap('render.players')
+
+        batch = []
+        for e, x, y in world.on_screen('enemies', enemies_before, alpha, camera_x, camera_y):
+            r = int(e['radius'])
+            batch.append((assets.zombie(e), (int(x - camera_x) - r, int(y - camera_y) - r)))
+        screen.blits(batch, False)
+        if prof:
+            prof.lap('render.zombies')
+            prof.count('bullets', len(world.bullets))
+            prof.count('zombies', len(world.enemies))
+            prof.count('drawn', len(batch))
+            prof.count('players', len(other_players))
 
         # Draw player
         player_center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
         pygame.draw.circle(screen, (218, 178, 140), player_center, player['radius'])
-        gun_rect = pygame.Rect(0, 0, 30, 10)
-        gun_rect.center = player_center
-        gun_surf = pygame.Surface(gun_rect.size, pygame.SRCALPHA)
-        pygame.draw.rect(gun_surf, (0, 0, 0), gun_surf.get_rect(), border_radius=4)
-        rotated = pygame.transform.rotate(gun_surf, -math.degrees(player['angle']))
-        rot_rect = rotated.get_rect(center=player_center)
-        screen.blit(rotated, rot_rect.topleft)
+        rotated = assets.gun(player['angle'])
+        screen.blit(rotated, rotated.get_rect(center=player_center))
         pygame.draw.circle(screen, (0, 0, 0), player_center, player['radius'], 2)
 
         # UI
-        font = pygame.font.SysFont(None, 24)
         pygame.draw.rect(screen, (255, 0, 0), (20, 20, 200, 20))
         pygame.draw.rect(screen, (50, 205, 50), (20, 20, max(0, 200 * (player['hp'] / 100)), 20))
         pygame.draw.rect(screen, (0, 0, 0), (20, 20, 200, 20), 1)
-        score_surf = font.render(f"Score: {score}", True, (255, 255, 255))
-        wave_surf = font.render(f"Wave: {wave}", True, (255, 255, 255))
-        screen.blit(score_surf, (20, 50))
-        screen.blit(wave_surf, (20, 80))
-        if is_reloading:
-            reload_surf = font.render("RELOADING...", True, (255, 255, 0))
+        screen.blit(assets.text(f"Score: {world.score}"), (20, 50))
+        screen.blit(assets.text(f"Wave: {world.wave}"), (20, 80))
+        if world.is_reloading:
+            reload_surf = assets.text("RELOADING...", (255, 255, 0))
             screen.blit(reload_surf, (SCREEN_WIDTH // 2 - reload_surf.get_width() // 2, SCREEN_HEIGHT - 50))
-        if game_over:
-            over_font = pygame.font.SysFont(None, 48)
-            over_surf = over_font.render("Game Over", True, (255, 255, 255))
-            over_rect = over_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 20))
-            screen.blit(over_surf, over_rect)
-            score_surf = over_font.render(f"Score: {score}", True, (255, 255, 255))
-            score_rect = score_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 30))
-            screen.blit(score_surf, score_rect)
-            info_surf = font.render("Press R to restart", True, (255, 255, 255))
-            info_rect = info_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 70))
-            screen.blit(info_surf, info_rect)
+        if world.game_over:
+            over_surf = assets.text("Game Over", big=True)
+            screen.blit(over_surf, over_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 20)))
+            score_surf = assets.text(f"Score: {world.score}", big=True)
+            screen.blit(score_surf, score_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 30)))
+            info_surf = assets.text("Press R to restart")
+            screen.blit(info_surf, info_surf.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 70)))
+        if prof:
+            prof.lap('render.hud')
+            if self.show_profile:
+                self.draw_overlay(prof)
+                prof.lap('render.overlay')
+
+    def draw_overlay(self, prof):
+        """Draw the profiler's percentiles in the top right corner, refreshed a few times a second."""
+        now = pygame.time.get_ticks()
+        if now >= self.overlay_due:
+            self.overlay_due = now + OVERLAY_REFRESH
+            font = self.assets.small_font
+            self.overlay = [font.render(line, True, (255, 255, 255), (0, 0, 0))
+                            for line in prof.report_lines()]
+        y = 10
+        for surf in self.overlay:
+            self.screen.blit(surf, (SCREEN_WIDTH - surf.get_width() - 10, y))
+            y += surf.get_height()
 
+
+def apply_snapshot(world, client, msg, authoritative=False):
+    """Copy a server world snapshot into the local world; return the other players."""
+    snapshot = msg["world"]
+    players = dict(snapshot["players"])
+    # copies, since the network thread keeps updating the snapshot's own dicts
+    world.enemies = [dict(e) for e in snapshot["zombies"]]
+    world.bullets = [dict(b) for b in snapshot["bullets"]]
+    if client.id is None:
+        client.id = msg["id"]
+        # keep our entity ids apart from other clients'
+        world.next_id = max(world.next_id, client.id << 20)
+    if authoritative:
+        own = players.pop(str(client.id), None)
+        if own:
+            world.player.update(x=own['x'], y=own['y'], hp=own['hp'])
+        for key in ('wave', 'score', 'game_over'):
+            if key in msg:
+                setattr(world, key, msg[key])
+    return players
+
+
+def main(map_path=None, world_cls=World, send_rate=NET_SEND_RATE, host="localhost", port=8765,
+         room=None, tick_rate=TICK_RATE, fps=RENDER_FPS, profile_path=None, profile_format='json',
+         record_path=None, endless=False):
+    """Run the game; with a room name the server owns the simulation and only inputs are sent.
+
+    Against a room the terrain is built from the map or seed the server
+    sends on joining and kept in step with the damage it reports. The local
+    player is predicted from the inputs and everything else is interpolated
+    between snapshots; see prediction.py.
+
+    The world steps at a fixed ``tick_rate`` whatever the frame rate, running
+    up to MAX_CATCH_UP_TICKS steps per frame, and frames are drawn between
+    the last two steps. F3 toggles the frame profiler overlay; with
+    ``profile_path`` every frame is profiled and written there on exit. With
+    ``record_path`` the session is recorded for replay.py. ``endless`` makes
+    a random world without edges.
+    """
+    if pygame is None:
+        sys.exit("Pygame is required to play: pip install pygame")
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    clock = pygame.time.Clock()
+
+    authoritative = room is not None
+    client = WebSocketClient(host, port, path="/" + (room or ""))
+    welcome = None
+    try:
+        client.connect()
+        if authoritative:
+            welcome = client.wait_for("room")
+    except Exception as e:
+        print("Network disabled:", e)
+        client.close()
+
+    seed = random.randrange(1 << 63)
+    terrain_seed = None
+    if welcome:
+        # the room's terrain, not ours
+        map_path, terrain_seed, endless = welcome['map'], welcome['seed'], welcome['endless']
+        if map_path and not os.path.exists(map_path):
+            print(f"The room's map {map_path} is not here; obstacles will not match the server's")
+    world = world_cls.from_map(map_path, rng=random.Random(seed), endless=endless, seed=terrain_seed)
+    if welcome:
+        world.obstacles.apply_changes(welcome['obstacles'])
+    recorder = None
+    if record_path:
+        from replay import Recorder
+        recorder = Recorder(record_path, seed, 1000 / tick_rate, map_path, world_cls is not World,
+                            world.bounds is None)
+    prof = FrameProfiler(record=profile_path is not None)
+    prof.watch(world, 'update_bullets', 'simulate.bullets')
+    prof.watch(world, 'update_enemies', 'simulate.enemies')
+    if profile_path:
+        prof.enable()
+    renderer = Renderer(screen, world, prof)
+
+    other_players = {}
+    snapshot_tick = None
+    tick_ms = 1000 / tick_rate
+    if authoritative:
+        from prediction import Interpolation, Prediction
+        prediction = Prediction(world, tick_ms)
+        interpolation = Interpolation()
+    lag = 0.0
+    net = NetworkThread(client, send_rate).start() if client.sock else None
+
+    running = True
+    while running:
+        prof.start_frame()
+        dt = clock.tick(fps)
+        prof.lap('wait')
+        lag = min(lag + dt, tick_ms * MAX_CATCH_UP_TICKS)
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_r and world.game_over \
+                    and not (authoritative and net):
+                if recorder:
+                    recorder.restart()
+                world.restart()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                renderer.show_profile = not renderer.show_profile
+                if not profile_path:
+                    prof.toggle()
+
+        inputs = read_inputs()
+        prof.lap('input')
+
+        if net:
+            world.player['angle'] = inputs['angle']
+            for msg in net.received():
+                if msg.get("type") == "obstacles":
+                    world.obstacles.apply_changes(msg['changes'])
+            msg = net.latest()
+            if msg:
+                if recorder:
+                    recorder.snapshot(msg)
+                if authoritative:
+                    players = prediction.apply_snapshot(client, msg)
+                    interpolation.add(pygame.time.get_ticks(), players, world.enemies, world.bullets)
+                else:
+                    other_players = apply_snapshot(world, client, msg)
+                    snapshot_tick = msg.get("tick")
+            prof.lap('network.recv')
+
+        alpha = 1.0
+        if authoritative and net:
+            world.time += dt
+            other_players, world.enemies, world.bullets = interpolation.sample(pygame.time.get_ticks())
+            while lag >= tick_ms:
+                renderer.remember()
+                prediction.step(inputs)
+                lag -= tick_ms
+            alpha = lag / tick_ms
+        else:
+            while lag >= tick_ms:
+                renderer.remember()
+                if recorder:
+                    recorder.step(world, tick_ms, inputs)
+                else:
+                    world.step(tick_ms, inputs)
+                lag -= tick_ms
+            alpha = lag / tick_ms
+        prof.lap('simulate')
+
+        if net and net.send_due():
+            state = prediction.message() if authoritative else state_message(world, snapshot_tick)
+            if state:
+                net.submit(state)
+            prof.lap('network.send')
+
+        renderer.draw(other_players, client.id, alpha)
         pygame.display.flip()
+        prof.lap('flip')
 
+    if net:
+        net.stop()
+    if recorder:
+        recorder.close()
     pygame.quit()
+    if profile_path:
+        prof.dump(profile_path, profile_format)
 
 
 if __name__ == '__main__':
-    map_file = sys.argv[1] if len(sys.argv) > 1 else None
-    main(map_file)
-
+    parser = argparse.ArgumentParser(description="Zombie Survival Arena")
+    parser.add_argument('map', nargs='?', help="path to a JSON map file")
+    parser.add_argument('--numpy', action='store_true',
+                        help="simulate bullets and zombies with the NumPy array backend")
+    parser.add_argument('--send-rate', type=float, default=NET_SEND_RATE,
+                        help="state updates sent to the server per second")
+    parser.add_argument('--host', default="localhost", help="game server host")
+    parser.add_argument('--port', type=int, default=8765, help="game server port")
+    parser.add_argument('--authoritative', action='store_true',
+                        help="let game_server.py run the simulation and only send inputs")
+    parser.add_argument('--room', help="room to join on an authoritative server (implies --authoritative)")
+    parser.add_argument('--tick-rate', type=float, default=TICK_RATE, help="simulation steps per second")
+    parser.add_argument('--fps', type=int, default=RENDER_FPS, help="frame rate cap for drawing")
+    parser.add_argument('--profile', metavar='PATH', help="profile every frame and write the records to PATH")
+    parser.add_argument('--profile-format', choices=PROFILE_FORMATS, default='json',
+                        help="write --profile records as plain JSON or a Chrome trace")
+    parser.add_argument('--record', metavar='PATH', help="record the session for replay.py")
+    parser.add_argument('--endless', action='store_true', help="a random world without edges")
+    args = parser.parse_args()
+    world_cls = World
+    if args.numpy:
+        from entity_store import ArrayWorld
+        world_cls = ArrayWorld
+    room = args.room
+    if args.authoritative and room is None:
+        room = "default"
+    if args.record and room is not None:
+        parser.error("--record needs the local simulation, not --authoritative or --room")
+    main(args.map, world_cls, args.send_rate, args.host, args.port, room, args.tick_rate, args.fps,
+         args.profile, args.profile_format, args.record, args.endless)